@@ -12,17 +12,11 @@
 # 1. PYTHONPATH
 # 2. Handler path
 # 3. Config path. The json configuration file path.
+# 4... Optional. Extra arguments of the handler, e.g. --serial-requests
 
 if [ "$#" -ge 3 ]
 then
-    if [ "$#" -eq 3 ]
-    then
-        source /opt/venv_multinet/bin/activate; PYTHONPATH=$1 python $2 --json-config $3
-    fi
-    if [ "$#" -eq 4 ] && [ "$4" == "--serial-requests" ]
-    then
-        source /opt/venv_multinet/bin/activate; PYTHONPATH=$1 python $2 --json-config $3 $4
-    fi
+    source /opt/venv_multinet/bin/activate; PYTHONPATH=$1 python $2 --json-config $3 "${@:4}"
 else
     echo "Invalid number of arguments."
     exit 1
@@ -0,0 +1,72 @@
+"""
+Master / Worker REST servers
+"""
+
+import os
+
+__version__ = '1.0'
+
+# The servers keep their PID files in the deployed Multinet directory, so that
+# the cleanup of a deployment only touches the processes it started
+DEPLOY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The machines extract the deployed Multinet directory under this directory
+REMOTE_DEPLOY_ROOT = '/tmp'
+
+
+def remote_deploy_dir(multinet_base_dir):
+    """Returns the path a Multinet directory is deployed to on the machines,
+    the directory of the same name under REMOTE_DEPLOY_ROOT
+
+    Args:
+      multinet_base_dir (str): The local Multinet directory, the
+        'multinet_base_dir' of the deploy configuration
+
+    Returns:
+      str: The remote path
+
+    Raises:
+      ValueError: If the directory has no name of its own, e.g. '/'
+    """
+    name = os.path.basename(os.path.normpath(multinet_base_dir))
+    if name in ('', '.', '..', os.sep):
+        raise ValueError('Invalid multinet_base_dir {0}'.format(
+            multinet_base_dir))
+    return os.path.join(REMOTE_DEPLOY_ROOT, name)
+
+
+def pid_file_path(role, port, base_dir=DEPLOY_DIR):
+    """Returns the path of the PID file of a master or worker server
+
+    Args:
+      role (str): The role of the server, 'master' or 'worker'
+      port (int): The REST port of the server
+      base_dir (str): The Multinet directory the server runs from
+
+    Returns:
+      str: The path of the PID file
+    """
+    return os.path.join(base_dir, '{0}_{1}.pid'.format(role, port))
+
+
+def write_pid_file(role, port):
+    """Writes the PID of the current process to its PID file
+
+    Args:
+      role (str): The role of the server, 'master' or 'worker'
+      port (int): The REST port of the server
+    """
+    with open(pid_file_path(role, port), 'w') as pid_file:
+        pid_file.write('{0}\n'.format(os.getpid()))
+
+
+def remove_pid_file(role, port):
+    """Removes the PID file of the current process, if it exists
+
+    Args:
+      role (str): The role of the server, 'master' or 'worker'
+      port (int): The REST port of the server
+    """
+    try:
+        os.remove(pid_file_path(role, port))
+    except OSError:
+        pass
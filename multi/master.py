@@ -12,8 +12,11 @@ to manage the distributed topologies
 """
 
 import bottle
+import json
 import logging
+import multi
 import util.multinet_requests as m_util
+import util.tracing
 import time
 
 # We must define logging level separately because this module runs
@@ -38,6 +41,13 @@ def init():
       group_size (int): The number of switches in a gorup for gradual bootup
       group_delay (int): The delay between the bootup of each group
       hosts_per_switch (int): The number of hosts connected to each switch
+      stitch (dict): Optional. Stitch the worker topologies with tunnels,
+                     with the 'pattern' ('linear' or 'ring'), the
+                     'tunnel_type' ('vxlan' or 'gre') and optionally the
+                     'tunnel_ip_list' of the workers
+      partitioning (dict): Optional. Split 'total_switches' among the
+                           workers in proportion to their 'weights', or to
+                           their CPU cores and memory if 'weights' is 'auto'
 
     Returns:
         requests.models.Response: An HTTP Response with the aggregated
@@ -47,13 +57,95 @@ def init():
     logging.info('[ip list] {0}'.format(WORKER_IP_LIST))
     data = bottle.request.json
     logging.info('[init] topology type: {0}'.format(data['topo']['topo_type']))
+    if 'stitch' in data['topo']:
+        # Fail before the topologies are built
+        m_util.stitching_neighbours(
+            data['topo']['stitch'].get('tunnel_ip_list', WORKER_IP_LIST),
+            data['topo']['stitch'].get('pattern', 'linear'))
+    per_worker_data = None
+    if 'partitioning' in data['topo']:
+        per_worker_data = partition_topology(data)
     reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST, 'init',
-                                data)
+                                data, per_worker_data)
 
     stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200 and 'stitch' in data['topo']:
+        stat, bod = stitch_topologies(data, reqs)
     return bottle.HTTPResponse(status=stat, body=bod)
 
 
+def partition_topology(data):
+    """
+    Split the global number of switches among the workers according to the
+    partitioning configuration. With 'auto' weights, the CPU cores and the
+    memory of every worker are queried from its 'get_stats' endpoint.
+
+    Args:
+      data (dict): The 'init' request data
+
+    Returns:
+      list: The 'topo_size' and 'switch_offset' of every worker
+    """
+    partitioning = data['topo']['partitioning']
+    weights = partitioning.get('weights', 'auto')
+    if weights == 'auto':
+        reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                    'get_stats',
+                                    {'is_serial': data.get('is_serial',
+                                                           False)})
+        weights = m_util.capacity_weights([json.loads(r['text'])
+                                           for r in reqs])
+    if len(weights) != len(WORKER_IP_LIST):
+        raise ValueError('Expected one partitioning weight per worker.')
+    partition = m_util.partition_switches(
+        int(partitioning['total_switches']), weights)
+    logging.info('[init] topology partition: {0}'.format(partition))
+    return partition
+
+
+def stitch_topologies(data, init_responses):
+    """
+    Compute the tunnels between the edge switches of the neighbouring
+    worker topologies, as reported in the 'init' responses, and broadcast
+    them to the 'stitch' endpoint of the workers
+
+    Args:
+      data (dict): The 'init' request data
+      init_responses (list): The 'init' responses of the workers
+
+    Returns:
+      status (int): The aggregate status code
+      body (list): The list of all the responses text
+    """
+    stitch_conf = data['topo']['stitch']
+    edge_switches = [json.loads(r['text'])['edge_switches']
+                     for r in init_responses]
+    plan = m_util.tunnel_stitching_plan(
+        stitch_conf.get('tunnel_ip_list', WORKER_IP_LIST),
+        edge_switches,
+        stitch_conf.get('pattern', 'linear'),
+        stitch_conf.get('tunnel_type', 'vxlan'))
+    logging.info('[init] stitching plan: {0}'.format(plan))
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST, 'stitch',
+                                {'tunnels': plan,
+                                 'is_serial': data.get('is_serial', False)})
+    return m_util.aggregate_broadcast_response(reqs)
+
+
+@bottle.route('/health', method='GET')
+def health():
+    """
+    Report the version of the master and whether it is ready to accept
+    commands
+
+    Returns:
+        str: A JSON string with the role, version, readiness and number of
+        workers of the master
+    """
+    return json.dumps({'role': 'master', 'version': multi.__version__,
+                       'ready': True, 'workers': len(WORKER_IP_LIST)})
+
+
 @bottle.route('/start', method='POST')
 def start():
     """
@@ -70,6 +162,104 @@ def start():
     return bottle.HTTPResponse(status=stat, body=bod)
 
 
+@bottle.route('/add_switches', method='POST')
+def add_switches():
+    """
+    Broadcast the POST request to the 'add_switches' endpoint of the workers
+    Aggregate the responses
+
+    Args:
+      count (int): The number of switches to add on every worker
+      rate (float): The number of switches added per second on every worker
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and bodies of the broadcasted requests
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'add_switches', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/remove_switches', method='POST')
+def remove_switches():
+    """
+    Broadcast the POST request to the 'remove_switches' endpoint of the workers
+    Aggregate the responses
+
+    Args:
+      count (int): The number of switches to remove from every worker
+      rate (float): The number of switches removed per second on every worker
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and bodies of the broadcasted requests
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'remove_switches', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/churn_switches', method='POST')
+def churn_switches():
+    """
+    Broadcast the POST request to the 'churn_switches' endpoint of the
+    workers and aggregate the reconnect latencies of the churned switches
+
+    Args:
+      fraction (float): The fraction of the switches churned on every worker
+      rate (float): The number of disconnects per second on every worker
+      duration (float): The duration of the churn in seconds
+      down_time (float): The time in seconds a switch stays disconnected
+      timeout (float): The time in seconds to wait for the reconnects
+
+    Returns:
+        requests.models.Response: An HTTP Response with the churn report of
+        every worker and of the cluster, or the bodies of the broadcasted
+        requests if some worker failed
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'churn_switches', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        bod = json.dumps(m_util.churn_report(
+            [json.loads(r['text']) for r in reqs]))
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/flap_links', method='POST')
+def flap_links():
+    """
+    Broadcast the POST request to the 'flap_links' endpoint of the workers
+    and aggregate the link flap events
+
+    Args:
+      pattern (str): 'random', 'rolling' or 'burst'
+      rate (float): The number of flap events per second on every worker
+      duration (float): The duration of the flapping in seconds
+      down_time (float): The time in seconds a link stays down
+      burst_size (int): The largest number of links of a burst
+
+    Returns:
+        requests.models.Response: An HTTP Response with the link flap events
+        of every worker and the totals of the cluster, or the bodies of the
+        broadcasted requests if some worker failed
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'flap_links', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        bod = json.dumps(m_util.link_flap_report(
+            [json.loads(r['text']) for r in reqs]))
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
 @bottle.route('/detect_hosts', method='POST')
 def detect_hosts():
     """
@@ -104,6 +294,72 @@ def get_switches():
     return bottle.HTTPResponse(status=stat, body=bod)
 
 
+@bottle.route('/get_switch_events', method='POST')
+def get_switch_events():
+    """
+    Broadcast the POST request to the 'get_switch_events' endpoint of the
+    workers
+    Aggregate the responses
+
+    Args:
+      since (dict): The sequence number of the last event seen, keyed by
+      dpid offset
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and bodies of the broadcasted requests
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_switch_events', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/get_connect_times', method='POST')
+def get_connect_times():
+    """
+    Broadcast the POST request to the 'get_connect_times' endpoint of the
+    workers and aggregate the connection times of the switches into a
+    latency distribution
+
+    Returns:
+        requests.models.Response: An HTTP Response with the connect latency
+        report of all the switches, or the bodies of the broadcasted requests
+        if some worker failed
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_connect_times', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        bod = json.dumps(m_util.connect_latency_report(
+            [json.loads(r['text']) for r in reqs]))
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/get_controller_distribution', method='POST')
+def get_controller_distribution():
+    """
+    Broadcast the POST request to the 'get_controller_distribution' endpoint
+    of the workers and aggregate the distribution of the switches over the
+    controllers
+
+    Returns:
+        requests.models.Response: An HTTP Response with the distribution of
+        the switches of every worker and of the cluster, or the bodies of the
+        broadcasted requests if some worker failed
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_controller_distribution', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        bod = json.dumps(m_util.controller_distribution_report(
+            [json.loads(r['text']) for r in reqs]))
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
 @bottle.route('/get_flows', method='POST')
 def get_flows():
     """
@@ -125,6 +381,148 @@ def get_flows():
     return bottle.HTTPResponse(status=stat, body=bod)
 
 
+@bottle.route('/dump_flows', method='POST')
+def dump_flows():
+    """
+    Stream the POST request to the 'dump_flows' endpoint of the workers and
+    pass on the JSON lines of the flows of their switches as they arrive.
+    Up to worker_concurrency workers are dumped at once, one at a time in
+    serial mode.
+
+    Returns:
+        generator: The JSON lines of the workers, and a JSON line with the
+        address and the error of every worker whose dump failed
+    """
+    data = bottle.request.json or {}
+    concurrency = 1 if data.get('is_serial') else int(
+        data.get('worker_concurrency', m_util.STREAM_CONCURRENCY))
+    bottle.response.content_type = 'application/x-ndjson'
+    return m_util.stream_broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                       'dump_flows', data, concurrency)
+
+
+@bottle.route('/get_flow_events', method='POST')
+def get_flow_events():
+    """
+    Broadcast the POST request to the 'get_flow_events' endpoint of the
+    workers
+    Aggregate the responses
+
+    Args:
+      since (dict): The sequence number of the last event seen, keyed by
+      dpid offset
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and bodies of the broadcasted requests
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_flow_events', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/get_flow_latencies', method='POST')
+def get_flow_latencies():
+    """
+    Broadcast the POST request to the 'get_flow_latencies' endpoint of the
+    workers and aggregate the results of the PacketIN to FlowMod benchmark
+
+    Returns:
+        requests.models.Response: An HTTP Response with the latency and
+        throughput report of every worker and of the cluster, or the bodies
+        of the broadcasted requests if some worker failed
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_flow_latencies', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        bod = json.dumps(m_util.flowmod_latency_report(
+            [json.loads(r['text']) for r in reqs]))
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/get_trace', method='POST')
+def get_trace():
+    """
+    Broadcast the POST request to the 'get_trace' endpoint of the workers and
+    merge the spans of the workers with the broadcast spans of the master
+    into a single Chrome trace, with a process for the master and for every
+    worker
+
+    Args:
+      since (dict): The sequence number of the last span seen, keyed by dpid
+      offset and by 'master'
+
+    Returns:
+        requests.models.Response: An HTTP Response with the Chrome trace and
+        the sequence number of the 'last' span of every process, or the
+        bodies of the broadcasted requests if some worker failed
+    """
+    data = bottle.request.json or {}
+    since = data.get('since', {})
+    master_last, master_events = util.tracing.TRACER.events(
+        int(since.get('master', 0)))
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_trace', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    if stat == 200:
+        workers = [json.loads(r['text']) for r in reqs]
+        trace = util.tracing.chrome_trace(
+            [('master', master_events)] +
+            [('worker dpid-{0}'.format(worker['dpid_offset']),
+              worker['events']) for worker in workers])
+        trace['last'] = dict([('master', master_last)] +
+                             [(str(worker['dpid_offset']), worker['last'])
+                              for worker in workers])
+        bod = json.dumps(trace)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/profile', method='POST')
+def profile():
+    """
+    Broadcast the POST request to the 'profile' endpoint of the workers, to
+    profile their next request to an endpoint
+    Aggregate the responses
+
+    Args:
+      endpoint (str): The endpoint to profile
+      mode (str): 'cprofile' or 'sampling'
+      interval_ms (float): The sampling interval
+      sort (str): The sort key of the cProfile report
+      limit (int): The number of functions of the cProfile report
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and bodies of the broadcasted requests
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'profile', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
+@bottle.route('/get_profile', method='POST')
+def get_profile():
+    """
+    Broadcast the POST request to the 'get_profile' endpoint of the workers
+    Aggregate the responses
+
+    Returns:
+        requests.models.Response: An HTTP Response with the aggregated
+        status codes and the profile reports of the workers
+    """
+    data = bottle.request.json
+    reqs = m_util.broadcast_cmd(WORKER_IP_LIST, WORKER_PORT_LIST,
+                                'get_profile', data)
+    stat, bod = m_util.aggregate_broadcast_response(reqs)
+    return bottle.HTTPResponse(status=stat, body=bod)
+
+
 @bottle.route('/stop', method='POST')
 def stop():
     """
@@ -190,7 +588,11 @@ def rest_start():
     WORKER_IP_LIST = runtime_config['worker_ip_list']
     WORKER_PORT_LIST = runtime_config['worker_port_list']
 
-    bottle.run(host=master_ip, port=master_port, debug=True)
+    multi.write_pid_file('master', master_port)
+    try:
+        bottle.run(host=master_ip, port=master_port, debug=True)
+    finally:
+        multi.remove_pid_file('master', master_port)
 
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.DEBUG)
@@ -0,0 +1,447 @@
+#! /usr/bin/python
+
+"""With this module we start a stand-in worker REST server. It implements the
+REST API of the worker without Mininet, replying after a simulated latency
+with responses shaped like the ones of a real worker, so that the master can
+be benchmarked against many workers on a single machine without root."""
+
+import argparse
+import bottle
+import json
+import logging
+import multi
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+
+# The simulated topology of the worker
+STATE = {'topo_size': 0, 'dpid_offset': 0, 'switch_offset': 0,
+         'booted_switches': 0, 'started': False, 'controller': ''}
+# opcode - simulated latency in seconds correspondence, with a 'default'
+LATENCIES = {'default': 0.0}
+JITTER = 0.0
+# Extra bytes of padding added to every response
+PAYLOAD_BYTES = 0
+
+
+def simulated_response(opcode, body=None):
+    """Waits for the simulated latency of an opcode and builds its response
+
+    Args:
+      opcode (str): The REST API endpoint
+      body (dict): The JSON body of the response, None for an empty body
+
+    Returns:
+      str: The response body
+    """
+    latency = LATENCIES.get(opcode, LATENCIES['default'])
+    time.sleep(latency + random.uniform(0, JITTER))
+    if body is None:
+        if not PAYLOAD_BYTES:
+            return ''
+        body = {}
+    if PAYLOAD_BYTES:
+        body['padding'] = 'x' * PAYLOAD_BYTES
+    return json.dumps(body)
+
+
+def switch_names():
+    """Returns the names of the booted switches of the simulated topology
+
+    Returns:
+      list: The switch names
+    """
+    return [str(STATE['switch_offset'] + i)
+            for i in range(STATE['booted_switches'])]
+
+
+@bottle.route('/init', method='POST')
+def init():
+    """
+    Initializes the simulated topology from the same JSON parameters as the
+    worker 'init' endpoint
+    """
+    data = bottle.request.json
+    topo_size = int(data.get('topo_size', data['topo']['topo_size']))
+    dpid_offset = int(data['dpid_offset'])
+    STATE.update({
+        'topo_size': topo_size,
+        'dpid_offset': dpid_offset,
+        'switch_offset': int(data.get('switch_offset',
+                                      dpid_offset * topo_size)),
+        'booted_switches': 0,
+        'started': False,
+        'controller': '{0}:{1}'.format(data['topo']['controller_ip_address'],
+                                       data['topo']['controller_of_port'])})
+    edge_switches = ([str(STATE['switch_offset']),
+                      str(STATE['switch_offset'] + topo_size - 1)]
+                     if topo_size else [])
+    return simulated_response('init', {'dpid_offset': dpid_offset,
+                                       'edge_switches': edge_switches})
+
+
+@bottle.route('/health', method='GET')
+def health():
+    """
+    Reports the stand-in worker as ready
+    """
+    topology = 'started' if STATE['started'] else 'initialized'
+    return json.dumps({'role': 'stub_worker', 'version': multi.__version__,
+                       'ready': True, 'topology': topology})
+
+
+@bottle.route('/start', method='POST')
+def start():
+    """
+    Boots all the switches of the simulated topology
+    """
+    STATE['booted_switches'] = STATE['topo_size']
+    STATE['started'] = True
+    return simulated_response('start')
+
+
+@bottle.route('/stop', method='POST')
+def stop():
+    """
+    Stops the simulated topology
+    """
+    STATE['booted_switches'] = 0
+    STATE['started'] = False
+    return simulated_response('stop')
+
+
+@bottle.route('/add_switches', method='POST')
+def add_switches():
+    """
+    Adds switches to the simulated topology
+    """
+    data = bottle.request.json
+    STATE['booted_switches'] += int(data['count'])
+    dpid_key = 'dpid-{0}'.format(STATE['dpid_offset'])
+    return simulated_response('add_switches',
+                              {dpid_key: STATE['booted_switches']})
+
+
+@bottle.route('/remove_switches', method='POST')
+def remove_switches():
+    """
+    Removes switches from the simulated topology
+    """
+    data = bottle.request.json
+    STATE['booted_switches'] = max(
+        0, STATE['booted_switches'] - int(data['count']))
+    dpid_key = 'dpid-{0}'.format(STATE['dpid_offset'])
+    return simulated_response('remove_switches',
+                              {dpid_key: STATE['booted_switches']})
+
+
+@bottle.route('/churn_switches', method='POST')
+def churn_switches():
+    """
+    Reports every scheduled disconnect of the churn as reconnected, without
+    waiting for the duration of the churn
+    """
+    data = bottle.request.json
+    num_sw = STATE['booted_switches']
+    churned = min(num_sw, max(1, int(round(float(data['fraction']) *
+                                           num_sw)))) if num_sw else 0
+    disconnects = (int(float(data['rate']) * float(data['duration']))
+                   if churned else 0)
+    return simulated_response('churn_switches', {
+        'dpid_offset': STATE['dpid_offset'], 'churned_switches': churned,
+        'disconnects': disconnects, 'skipped': 0,
+        'latencies': [0.01] * disconnects, 'pending': 0,
+        'booted': num_sw, 'connected': num_sw})
+
+
+@bottle.route('/flap_links', method='POST')
+def flap_links():
+    """
+    Reports the links of a linear simulated topology and no flap events,
+    without waiting for the duration of the flapping
+    """
+    return simulated_response('flap_links', {
+        'dpid_offset': STATE['dpid_offset'],
+        'links': max(STATE['booted_switches'] - 1, 0), 'link_downs': 0,
+        'skipped': 0, 'boot_start_time': time.time(), 'events': []})
+
+
+@bottle.route('/get_switches', method='POST')
+def get_switches():
+    """
+    Reports the number of booted switches, all of them connected
+    """
+    data = bottle.request.json or {}
+    dpid_key = 'dpid-{0}'.format(STATE['dpid_offset'])
+    num_sw = STATE['booted_switches']
+    if data.get('connection_status'):
+        return simulated_response('get_switches', {dpid_key: {
+            'booted': num_sw, 'connected': num_sw}})
+    return simulated_response('get_switches', {dpid_key: num_sw})
+
+
+@bottle.route('/get_connect_times', method='POST')
+def get_connect_times():
+    """
+    Reports a start and a connect time for every booted switch
+    """
+    return simulated_response('get_connect_times', {
+        'dpid_offset': STATE['dpid_offset'],
+        'switches': [[name, 0.001 * i, 0.001 * i + 0.01]
+                     for i, name in enumerate(switch_names())]})
+
+
+@bottle.route('/get_controller_distribution', method='POST')
+def get_controller_distribution():
+    """
+    Reports all the booted switches assigned to, connected to and mastered by
+    a single controller
+    """
+    num_sw = STATE['booted_switches']
+    return simulated_response('get_controller_distribution', {
+        'dpid_offset': STATE['dpid_offset'],
+        'controllers': [{'controller': STATE['controller'],
+                         'assigned': num_sw, 'connected': num_sw,
+                         'master': num_sw}]})
+
+
+@bottle.route('/get_switch_events', method='POST')
+def get_switch_events():
+    """
+    Reports a connect event for every booted switch
+    """
+    data = bottle.request.json or {}
+    since = int(data.get('since', {}).get(str(STATE['dpid_offset']), 0))
+    events = [[i + 1, 0.001 * i + 0.01, name, True]
+              for i, name in enumerate(switch_names())][since:]
+    return simulated_response('get_switch_events', {
+        'dpid_offset': STATE['dpid_offset'],
+        'last': events[-1][0] if events else since,
+        'events': events})
+
+
+@bottle.route('/get_trace', method='POST')
+def get_trace():
+    """
+    Reports no trace spans
+    """
+    data = bottle.request.json or {}
+    since = int(data.get('since', {}).get(str(STATE['dpid_offset']), 0))
+    return simulated_response('get_trace', {
+        'dpid_offset': STATE['dpid_offset'], 'last': since, 'events': []})
+
+
+@bottle.route('/get_flows', method='POST')
+def get_flows():
+    """
+    Reports one flow for every booted switch
+    """
+    data = bottle.request.json or {}
+    dpid_key = 'number-of-flows-on-worker-{0}'.format(STATE['dpid_offset'])
+    body = {dpid_key: STATE['booted_switches']}
+    if data.get('per_switch'):
+        body['flows-per-switch'] = dict((name, 1) for name in switch_names())
+    return simulated_response('get_flows', body)
+
+
+@bottle.route('/dump_flows', method='POST')
+def dump_flows():
+    """
+    Streams the table-miss flow of every booted switch, without filtering
+    """
+    simulated_response('dump_flows')
+    bottle.response.content_type = 'application/x-ndjson'
+    return (json.dumps({'dpid_offset': STATE['dpid_offset'], 'switch': name,
+                        'flows': [{'table': 0, 'cookie': 0, 'priority': 0,
+                                   'match': {}, 'actions': 'CONTROLLER',
+                                   'packets': 0, 'bytes': 0,
+                                   'duration': 0.0}]}) + '\n'
+            for name in switch_names())
+
+
+@bottle.route('/get_flow_events', method='POST')
+def get_flow_events():
+    """
+    Reports no flow events
+    """
+    data = bottle.request.json or {}
+    since = int(data.get('since', {}).get(str(STATE['dpid_offset']), 0))
+    return simulated_response('get_flow_events', {
+        'dpid_offset': STATE['dpid_offset'], 'last': since, 'events': []})
+
+
+@bottle.route('/get_flow_latencies', method='POST')
+def get_flow_latencies():
+    """
+    Reports an empty PacketIN to FlowMod benchmark
+    """
+    return simulated_response('get_flow_latencies', {
+        'dpid_offset': STATE['dpid_offset'], 'sent': 0, 'flows': []})
+
+
+@bottle.route('/get_stats', method='POST')
+def get_stats():
+    """
+    Reports the simulated topology along with fixed machine resources
+    """
+    return simulated_response('get_stats', {
+        'topo_size': STATE['topo_size'],
+        'booted_switches': STATE['booted_switches'],
+        'connected_switches': STATE['booted_switches'],
+        'cpu_count': 1, 'mem_total_kb': 1048576, 'mem_used_kb': 0})
+
+
+def no_op_route(opcode):
+    """Registers a POST route that only waits for the simulated latency
+
+    Args:
+      opcode (str): The REST API endpoint
+    """
+    bottle.route('/' + opcode, method='POST')(
+        lambda: simulated_response(opcode))
+
+for _opcode in ['stitch', 'detect_hosts', 'ping_all', 'generate_traffic']:
+    no_op_route(_opcode)
+
+
+@bottle.route('/shutdown', method='POST')
+def shutdown():
+    """
+    Terminates the stand-in worker shortly after the response has been sent
+    """
+    threading.Timer(0.5, os.kill, [os.getpid(), signal.SIGTERM]).start()
+
+
+def parse_latencies(latency_ms, opcode_latencies_ms):
+    """Parses the simulated latencies of the opcodes
+
+    Args:
+      latency_ms (float): The default latency in milliseconds
+      opcode_latencies_ms (str): Comma separated opcode=milliseconds pairs,
+                                 e.g. 'init=200,start=500'
+
+    Returns:
+      dict: opcode - latency in seconds correspondence, with a 'default'
+    """
+    latencies = {'default': latency_ms / 1000.0}
+    for pair in filter(None, (opcode_latencies_ms or '').split(',')):
+        opcode, _, latency = pair.partition('=')
+        latencies[opcode.strip()] = float(latency) / 1000
+    return latencies
+
+
+def launch_stub_workers(count, base_port, host='127.0.0.1', extra_args=()):
+    """Starts stand-in workers as separate processes on consecutive ports
+
+    Args:
+      count (int): The number of workers
+      base_port (int): The port of the first worker
+      host (str): The IP address the workers listen on
+      extra_args (list): Extra command line arguments of every worker, e.g.
+                         the simulated latencies
+
+    Returns:
+      list: The worker processes, in port order
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = multi.DEPLOY_DIR
+    devnull = open(os.devnull, 'w')
+    processes = []
+    for port in range(base_port, base_port + count):
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__),
+             '--rest-host', host, '--rest-port', str(port)] +
+            list(extra_args),
+            env=env, stdout=devnull, stderr=devnull))
+    devnull.close()
+    return processes
+
+
+def stub_cluster_config(conf, count, base_port, master_port,
+                        host='127.0.0.1'):
+    """Builds the configuration of a master that manages stand-in workers
+
+    Args:
+      conf (dict): The configuration whose topology is used
+      count (int): The number of stand-in workers
+      base_port (int): The port of the first worker
+      master_port (int): The port of the master
+      host (str): The IP address of the master and the workers
+
+    Returns:
+      dict: The configuration
+    """
+    cluster_conf = dict(conf)
+    cluster_conf.update({
+        'master_ip': host,
+        'master_port': master_port,
+        'worker_ip_list': [host] * count,
+        'worker_port_list': list(range(base_port, base_port + count))})
+    return cluster_conf
+
+
+def terminate_processes(processes):
+    """Terminates server processes and waits for them to exit
+
+    Args:
+      processes (list): The processes
+    """
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def rest_start():
+    """Starts the stand-in worker REST server"""
+    global LATENCIES, JITTER, PAYLOAD_BYTES
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rest-host',
+                        required=True,
+                        type=str,
+                        dest='rest_host',
+                        action='store',
+                        help='IP address to start the stand-in worker')
+    parser.add_argument('--rest-port',
+                        required=True,
+                        type=str,
+                        dest='rest_port',
+                        action='store',
+                        help='Port number to start the stand-in worker')
+    parser.add_argument('--latency-ms',
+                        type=float,
+                        dest='latency_ms',
+                        default=0.0,
+                        help='Simulated latency of every opcode')
+    parser.add_argument('--opcode-latencies-ms',
+                        type=str,
+                        dest='opcode_latencies_ms',
+                        default='',
+                        help='Simulated latency of specific opcodes, '
+                             'e.g. init=200,start=500')
+    parser.add_argument('--jitter-ms',
+                        type=float,
+                        dest='jitter_ms',
+                        default=0.0,
+                        help='Maximum random latency added to every reply')
+    parser.add_argument('--payload-bytes',
+                        type=int,
+                        dest='payload_bytes',
+                        default=0,
+                        help='Bytes of padding added to every reply')
+    args = parser.parse_args()
+
+    LATENCIES = parse_latencies(args.latency_ms, args.opcode_latencies_ms)
+    JITTER = args.jitter_ms / 1000
+    PAYLOAD_BYTES = args.payload_bytes
+    bottle.run(host=args.rest_host, port=args.rest_port, quiet=True)
+
+if __name__ == '__main__':
+    rest_start()
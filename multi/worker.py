@@ -13,8 +13,19 @@ import argparse
 import bottle
 import json
 import logging
+import multiprocessing
+import multi
+import net.flow_dump
 import net.topologies
+import os
+import signal
+import threading
+import time
+import util.metrics
+import util.profiling
+import util.tracing
 
+from net.emulated import EmulatedMultinet
 from net.multinet import Multinet
 
 # We must define logging level separately because this module runs
@@ -22,6 +33,112 @@ from net.multinet import Multinet
 logging.basicConfig(level=logging.DEBUG)
 
 MININET_TOPO = None
+REST_PORT = None
+# The endpoint whose next request is profiled, the profiler and the report
+# of the last profiled request
+PROFILE = {'endpoint': None, 'profiler': None, 'report': None}
+
+
+def topology_value(function):
+    """Returns a function that reads a value of the current topology object
+    at scrape time, 0 when there is no topology
+
+    Args:
+        function (callable): Reads the value from the topology object
+
+    Returns:
+        callable: The reader of the value
+    """
+    return lambda: function(MININET_TOPO) if MININET_TOPO is not None else 0
+
+# The topology values are read when the metrics are scraped, so that they
+# add no work to the topology operations
+SWITCHES = util.metrics.Gauge('multinet_switches',
+                              'The switches of the topology by state',
+                              ['state'])
+SWITCHES.labels('built').set_function(
+    topology_value(lambda topo: len(topo.switches)))
+SWITCHES.labels('started').set_function(
+    topology_value(lambda topo: topo.booted_switches))
+# The switches seen connected by the connection monitor. Without the monitor,
+# e.g. for 'user' switches or if it failed to start, every switch is polled,
+# so a scrape of a started topology costs one command per switch
+SWITCHES.labels('connected').set_function(
+    topology_value(lambda topo: topo.get_connected_switches()
+                   if topo._started else 0))
+HOSTS = util.metrics.Gauge('multinet_hosts', 'The hosts of the topology')
+# Emulated topologies have no hosts
+HOSTS.set_function(topology_value(lambda topo: len(getattr(topo, 'hosts',
+                                                           []))))
+LINKS = util.metrics.Gauge('multinet_links', 'The links of the topology')
+LINKS.set_function(topology_value(lambda topo: len(topo.links)))
+TRAFFIC_PACKETS = util.metrics.Counter(
+    'multinet_traffic_packets_total',
+    'The packets sent by the traffic generation of the topology')
+TRAFFIC_PACKETS.set_function(
+    topology_value(lambda topo: topo.traffic_packets))
+TRAFFIC_SEND_ERRORS = util.metrics.Counter(
+    'multinet_traffic_send_errors_total',
+    'The failed packet sends of the traffic generation of the topology')
+TRAFFIC_SEND_ERRORS.set_function(
+    topology_value(lambda topo: topo.traffic_send_errors))
+FLOWS = util.metrics.Gauge('multinet_flows',
+                           'The flows of the switches at the last sample')
+FLOW_SAMPLES = util.metrics.Counter('multinet_flow_samples_total',
+                                    'The samples of the flows of the switches')
+PHASE_DURATION = util.metrics.Histogram(
+    'multinet_phase_duration_seconds',
+    'The duration of the init, start and stop phases of the topology',
+    ['phase'], buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800))
+REQUEST_DURATION = util.metrics.Histogram(
+    'multinet_request_duration_seconds',
+    'The duration of the REST requests of the worker', ['endpoint'])
+
+
+@bottle.hook('before_request')
+def start_request_timer():
+    """
+    Records the start time of a request
+    """
+    bottle.request.environ['multinet.start_time'] = time.time()
+
+
+@bottle.hook('after_request')
+def observe_request_duration():
+    """
+    Records the duration of a request by the rule of its route, as a metric
+    and as a trace span. Requests that match no route are not recorded.
+    """
+    route = bottle.request.environ.get('bottle.route')
+    start_time = bottle.request.environ.get('multinet.start_time')
+    if route is not None and start_time is not None:
+        end_time = time.time()
+        REQUEST_DURATION.labels(route.rule).observe(end_time - start_time)
+        util.tracing.TRACER.add_span(route.rule, start_time, end_time,
+                                     category='request')
+
+
+@bottle.hook('before_request')
+def start_profiler():
+    """
+    Starts the armed profiler on a request to the profiled endpoint
+    """
+    profiler = PROFILE['profiler']
+    if (profiler is not None and not profiler.running and
+            bottle.request.path == PROFILE['endpoint']):
+        profiler.start()
+
+
+@bottle.hook('after_request')
+def stop_profiler():
+    """
+    Stops the profiler of a profiled request and keeps its report
+    """
+    profiler = PROFILE['profiler']
+    if profiler is not None and profiler.running:
+        PROFILE['report'] = profiler.stop()
+        PROFILE['report']['endpoint'] = PROFILE['endpoint']
+        PROFILE['profiler'] = None
 
 
 @bottle.route(
@@ -36,32 +153,180 @@ def init():
     JSON entries:
         controller_ip_address (str): The IP address of the controller
         controller_of_port (int): The OpenFlow port of the controller
-        switch_type (str): The type of the soft switch used for the emulation
+        switch_type (str): The type of the soft switch used for the emulation,
+                           'emulated' for in-process OpenFlow 1.3 switches
         topo_type (str): The type of the topology
         topo_size (int): The size of the topology
         group_size (int): Size of groups for groupwise bootup
         group_delay (int): Delay in ms before the bootup of each group
         hosts_per_switch (int): The number of hosts per switch
         dpid_offset (int): The dpid offset for this VM
+        topo_params (dict): Optional extra options of the topology type
+        topo_size (int): Optional. The size of the topology of this worker,
+                         overrides the topo_size of the topology configuration
+        switch_offset (int): Optional. The global index of the first switch
+                             of this worker
+        max_topo_size (int): Optional. The size the topology can grow to with
+                             add_switches
+        flow_monitor (bool): Optional. Follow the flow tables of the switches
+                             with OpenFlow flow monitors
+        controllers (list): Optional. The 'ip_address' and 'of_port' of
+                            every controller, instead of
+                            controller_ip_address and controller_of_port
+        controller_assignment (str): Optional. How the switches are assigned
+                                     to the controllers: 'round_robin'
+                                     (default), 'per_worker' or 'all'
+
+    Returns
+        str: A JSON string with the dpid offset and the edge switches of the
+        topology
     """
 
     global MININET_TOPO
+    init_start = time.time()
     data = bottle.request.json
     topo_conf = data['topo']
-    MININET_TOPO = Multinet(
+    topo_class = (EmulatedMultinet if topo_conf['switch_type'] == 'emulated'
+                  else Multinet)
+    MININET_TOPO = topo_class(
         topo_conf['controller_ip_address'],
         int(topo_conf['controller_of_port']),
         topo_conf['switch_type'],
         topo_conf['topo_type'],
-        int(topo_conf['topo_size']),
+        int(data.get('topo_size', topo_conf['topo_size'])),
         int(topo_conf['group_size']),
         int(topo_conf['group_delay']),
         int(topo_conf['hosts_per_switch']),
         int(data['dpid_offset']),
         topo_conf['traffic_generation_duration_ms'],
-        topo_conf['interpacket_delay_ms']
+        topo_conf['interpacket_delay_ms'],
+        topo_params=topo_conf.get('topo_params'),
+        switch_offset=data.get('switch_offset'),
+        max_switches=topo_conf.get('max_topo_size'),
+        flow_monitor=topo_conf.get('flow_monitor', False),
+        controllers=[(controller['ip_address'], int(controller['of_port']))
+                     for controller in topo_conf.get('controllers', [])],
+        controller_assignment=topo_conf.get('controller_assignment',
+                                            'round_robin')
         )
     MININET_TOPO.init_topology()
+    PHASE_DURATION.labels('init').observe(time.time() - init_start)
+    return json.dumps({'dpid_offset': MININET_TOPO._dpid_offset,
+                       'edge_switches': MININET_TOPO.get_edge_switches()})
+
+
+@bottle.route('/health', method='GET')
+def health():
+    """
+    Reports the version of the worker and whether it is ready to accept
+    commands, along with the state of the current topology object.
+
+    Returns
+        str: A JSON string with the role, version, readiness and topology
+        state of the worker
+    """
+    if MININET_TOPO is None:
+        topology = 'none'
+    elif MININET_TOPO._started:
+        topology = 'started'
+    else:
+        topology = 'initialized'
+    return json.dumps({'role': 'worker', 'version': multi.__version__,
+                       'ready': True, 'topology': topology})
+
+
+@bottle.route('/metrics', method='GET')
+def get_metrics():
+    """
+    Reports the counters of the worker in the Prometheus text format, to be
+    scraped during long runs: the switches by state, the hosts and the
+    links of the topology, the packets and the send errors of the traffic
+    generation, the last flow count sample, the durations of the init,
+    start and stop phases and the durations of the requests per endpoint.
+
+    Returns
+        str: The metrics in the Prometheus text format
+    """
+    bottle.response.content_type = 'text/plain; version=0.0.4'
+    return util.metrics.REGISTRY.expose()
+
+
+@bottle.route('/get_trace', method='POST')
+def get_trace():
+    """
+    Gets the spans of the phases of the topology operations and of the
+    requests of the worker, as Chrome trace events. The spans are read
+    incrementally by passing the sequence number of the last span seen.
+
+    JSON entries:
+        since (dict): Optional. The sequence number of the last span seen,
+                      keyed by dpid offset
+
+    Returns
+        str: A JSON string with the dpid offset, the sequence number of the
+        last span and the trace events of the spans after the given sequence
+        number
+    """
+    data = bottle.request.json or {}
+    dpid_offset = (MININET_TOPO._dpid_offset if MININET_TOPO is not None
+                   else None)
+    since = data.get('since', {}).get(str(dpid_offset), 0)
+    last, events = util.tracing.TRACER.events(int(since))
+    return json.dumps({'dpid_offset': dpid_offset, 'last': last,
+                       'events': events})
+
+
+@bottle.route('/profile', method='POST')
+def profile():
+    """
+    Arms the profiling of the next request to an endpoint. The report is
+    read with get_profile after the request.
+
+    JSON entries:
+        endpoint (str): The endpoint to profile, e.g. 'start'
+        mode (str): Optional. 'cprofile' (default) or 'sampling'
+        interval_ms (float): Optional. The sampling interval
+        sort (str): Optional. The sort key of the cProfile report
+        limit (int): Optional. The number of functions of the cProfile
+                     report
+    """
+    data = bottle.request.json
+    PROFILE['profiler'] = util.profiling.Profiler(
+        data.get('mode', 'cprofile'),
+        float(data.get('interval_ms', 5)) / 1000,
+        data.get('sort', 'cumulative'), int(data.get('limit', 50)))
+    PROFILE['endpoint'] = '/' + data['endpoint'].lstrip('/')
+    PROFILE['report'] = None
+
+
+@bottle.route('/get_profile', method='POST')
+def get_profile():
+    """
+    Gets the report of the last profiled request
+
+    Returns
+        str: A JSON string with the dpid offset and the endpoint, the mode,
+        the duration and the profile text of the report, or a None report if
+        the armed endpoint has not been requested yet
+    """
+    return json.dumps({'dpid_offset': (MININET_TOPO._dpid_offset
+                                       if MININET_TOPO is not None else None),
+                       'report': PROFILE['report']})
+
+
+@bottle.route('/stitch', method='POST')
+def stitch():
+    """
+    Sets the tunnels that stitch the current topology to the topologies of
+    the neighbouring workers. Expects the tunnels of all the workers, keyed
+    by dpid offset, as JSON parameter.
+
+    JSON entries:
+        tunnels (dict): The list of tunnels of every worker
+    """
+    data = bottle.request.json
+    MININET_TOPO.set_tunnels(
+        data['tunnels'].get(str(MININET_TOPO._dpid_offset), []))
 
 
 @bottle.route('/start', method='POST')
@@ -70,7 +335,107 @@ def start():
     Calls the start_topology() method of the current topology object to start
     the switches of the topology.
     """
+    start_time = time.time()
     MININET_TOPO.start_topology()
+    PHASE_DURATION.labels('start').observe(time.time() - start_time)
+
+
+@bottle.route('/add_switches', method='POST')
+def add_switches():
+    """
+    Calls the add_switches() method of the current topology object to attach
+    switches, with their hosts and links, to the running topology.
+
+    JSON entries:
+        count (int): The number of switches to add
+        rate (float): The number of switches added per second
+
+    Returns
+        str: A JSON string with dpid_offset/number_of_switches key/value pairs
+    """
+    data = bottle.request.json
+    MININET_TOPO.add_switches(int(data['count']), float(data.get('rate', 0)))
+    dpid_key = 'dpid-{0}'.format(MININET_TOPO._dpid_offset)
+    return json.dumps({dpid_key: len(MININET_TOPO.switches)})
+
+
+@bottle.route('/remove_switches', method='POST')
+def remove_switches():
+    """
+    Calls the remove_switches() method of the current topology object to
+    detach the last switches, with their hosts and links, from the running
+    topology.
+
+    JSON entries:
+        count (int): The number of switches to remove
+        rate (float): The number of switches removed per second
+
+    Returns
+        str: A JSON string with dpid_offset/number_of_switches key/value pairs
+    """
+    data = bottle.request.json
+    MININET_TOPO.remove_switches(int(data['count']),
+                                 float(data.get('rate', 0)))
+    dpid_key = 'dpid-{0}'.format(MININET_TOPO._dpid_offset)
+    return json.dumps({dpid_key: len(MININET_TOPO.switches)})
+
+
+@bottle.route('/churn_switches', method='POST')
+def churn_switches():
+    """
+    Calls the churn_switches() method of the current topology object to
+    disconnect and reconnect a fraction of the switches at a target rate
+    for a duration. Returns when the churn is over.
+
+    JSON entries:
+        fraction (float): The fraction of the started switches to churn
+        rate (float): The number of disconnects per second
+        duration (float): The duration of the churn in seconds
+        down_time (float): Optional. The time in seconds a switch stays
+                           disconnected
+        timeout (float): Optional. The time in seconds to wait for the
+                         switches to reconnect after the churn
+
+    Returns
+        str: A JSON string with the dpid offset, the number of churned
+        switches, disconnects and skipped disconnects, the reconnect
+        latencies, the number of pending reconnects and the number of booted
+        and connected switches
+    """
+    data = bottle.request.json
+    results = MININET_TOPO.churn_switches(
+        float(data['fraction']), float(data['rate']),
+        float(data['duration']), float(data.get('down_time', 0)),
+        float(data.get('timeout', 10)))
+    results['dpid_offset'] = MININET_TOPO._dpid_offset
+    return json.dumps(results)
+
+
+@bottle.route('/flap_links', method='POST')
+def flap_links():
+    """
+    Calls the flap_links() method of the current topology object to bring
+    the switch-to-switch links down and up at a target rate for a duration.
+    Returns when the last link is up again.
+
+    JSON entries:
+        pattern (str): 'random', 'rolling' or 'burst'
+        rate (float): The number of flap events per second
+        duration (float): The duration of the flapping in seconds
+        down_time (float): The time in seconds a link stays down
+        burst_size (int): Optional. The largest number of links of a burst
+
+    Returns
+        str: A JSON string with the dpid offset, the number of links, link
+        downs and skipped events, the boot start time and the timestamped
+        link down and up events
+    """
+    data = bottle.request.json
+    results = MININET_TOPO.flap_links(
+        data['pattern'], float(data['rate']), float(data['duration']),
+        float(data['down_time']), int(data.get('burst_size', 4)))
+    results['dpid_offset'] = MININET_TOPO._dpid_offset
+    return json.dumps(results)
 
 
 @bottle.route('/detect_hosts', method='POST')
@@ -88,33 +453,228 @@ def get_switches():
     Calls the get_switches() method of the current topology object to query the
     current number of switches.
 
+    JSON entries:
+        connection_status (bool): Optional. Also report the number of
+                                  switches connected to the controller
+
     Returns
-        str: A JSON string with dpid_offset/number_of_switches key/value pairs
+        str: A JSON string with dpid_offset/number_of_switches key/value
+        pairs, or dpid_offset/{booted, connected} pairs when the connection
+        status is requested
     """
+    data = bottle.request.json or {}
     dpid_key = 'dpid-{0}'.format(MININET_TOPO._dpid_offset)
     num_sw = MININET_TOPO.get_switches()
+    if data.get('connection_status'):
+        return json.dumps({dpid_key: {
+            'booted': num_sw,
+            'connected': MININET_TOPO.get_connected_switches()}})
     return json.dumps({dpid_key: num_sw})
 
+
+@bottle.route('/get_switch_events', method='POST')
+def get_switch_events():
+    """
+    Calls the get_switch_events() method of the current topology object to
+    get the controller connect and disconnect events of the switches. The
+    events are read incrementally by passing the sequence number of the last
+    event seen.
+
+    JSON entries:
+        since (dict): Optional. The sequence number of the last event seen,
+                      keyed by dpid offset
+
+    Returns
+        str: A JSON string with the dpid offset, the sequence number of the
+        last event and the [sequence number, time, name, connected] of every
+        event after the given sequence number
+    """
+    data = bottle.request.json or {}
+    since = data.get('since', {}).get(str(MININET_TOPO._dpid_offset), 0)
+    events = MININET_TOPO.get_switch_events(int(since))
+    return json.dumps({'dpid_offset': MININET_TOPO._dpid_offset,
+                       'last': events[-1][0] if events else int(since),
+                       'events': events})
+
+@bottle.route('/get_connect_times', method='POST')
+def get_connect_times():
+    """
+    Calls the get_connect_times() method of the current topology object to
+    get the time every switch was started and the time it connected to the
+    controller.
+
+    Returns
+        str: A JSON string with the dpid offset and the [name, start time,
+        connect time] of every started switch
+    """
+    return json.dumps({'dpid_offset': MININET_TOPO._dpid_offset,
+                       'switches': MININET_TOPO.get_connect_times()})
+
+@bottle.route('/get_controller_distribution', method='POST')
+def get_controller_distribution():
+    """
+    Calls the get_controller_distribution() method of the current topology
+    object to get the distribution of the switches over the controllers.
+
+    Returns
+        str: A JSON string with the dpid offset and the controller address
+        and the number of assigned, connected and mastered switches of every
+        controller
+    """
+    return json.dumps({
+        'dpid_offset': MININET_TOPO._dpid_offset,
+        'controllers': MININET_TOPO.get_controller_distribution()})
+
 @bottle.route('/get_flows', method='POST')
 def get_flows():
     """
     Calls the get_flows() method of the current topology object to get the
     current number of flows installed on the switches.
 
+    JSON entries:
+        per_switch (bool): Optional. Also report the number of flows of every
+                           switch, when the flow monitor is enabled
+
     Returns
         str: A JSON string with dpid_offset/number_of_switches key/value pairs
     """
+    data = bottle.request.json or {}
     dpid_key = 'number-of-flows-on-worker-{0}'.format(MININET_TOPO._dpid_offset)
     total_worker_flows = MININET_TOPO.get_flows()
+    FLOWS.set(total_worker_flows)
+    FLOW_SAMPLES.inc()
+    if data.get('per_switch'):
+        return json.dumps({dpid_key: total_worker_flows,
+                           'flows-per-switch': MININET_TOPO.get_flow_counts()})
     return json.dumps({dpid_key: total_worker_flows})
 
+
+@bottle.route('/get_flow_events', method='POST')
+def get_flow_events():
+    """
+    Calls the get_flow_events() method of the current topology object to get
+    the flows added to and deleted from the switches, when the flow monitor
+    is enabled. The events are read incrementally by passing the sequence
+    number of the last event seen.
+
+    JSON entries:
+        since (dict): Optional. The sequence number of the last event seen,
+                      keyed by dpid offset
+
+    Returns
+        str: A JSON string with the dpid offset, the sequence number of the
+        last event and the [sequence number, time, switch, 'added' or
+        'deleted', flow] of every event after the given sequence number
+    """
+    data = bottle.request.json or {}
+    since = data.get('since', {}).get(str(MININET_TOPO._dpid_offset), 0)
+    events = MININET_TOPO.get_flow_events(int(since))
+    return json.dumps({'dpid_offset': MININET_TOPO._dpid_offset,
+                       'last': events[-1][0] if events else int(since),
+                       'events': events})
+
+@bottle.route('/dump_flows', method='POST')
+def dump_flows():
+    """
+    Calls the dump_flows() method of the current topology object to stream
+    the flows of the switches, switch by switch, as JSON lines. The flows
+    are filtered on the worker and every line holds a chunk of the flows of
+    a switch, so neither side keeps the whole dump in memory. The server
+    serves no other request until the stream ends.
+
+    JSON entries:
+        filters (dict): Optional. The filters of the flows, see
+                        net.flow_dump.FlowFilter
+        concurrency (int): Optional. The number of switches dumped at once
+        chunk_size (int): Optional. The largest number of flows of a line
+
+    Returns
+        generator: A JSON line with the dpid offset, the switch and a chunk
+        of its flows, for every chunk. A switch without flows has a single
+        line with no flows.
+    """
+    data = bottle.request.json or {}
+    # The filters are checked before the stream starts
+    flow_filter = net.flow_dump.FlowFilter(data.get('filters'))
+    chunks = MININET_TOPO.dump_flows(
+        flow_filter,
+        int(data.get('concurrency', net.flow_dump.DEFAULT_CONCURRENCY)),
+        int(data.get('chunk_size', net.flow_dump.DEFAULT_CHUNK_SIZE)))
+    dpid_offset = MININET_TOPO._dpid_offset
+    bottle.response.content_type = 'application/x-ndjson'
+    return (json.dumps({'dpid_offset': dpid_offset, 'switch': name,
+                        'flows': flows}) + '\n'
+            for name, flows in chunks)
+
+
+@bottle.route('/get_stats', method='POST')
+def get_stats():
+    """
+    Reports the state of the current topology object along with the memory
+    usage of the worker machine. It can be called before a topology has been
+    initialized, in which case all the topology counters are zero.
+
+    Returns
+        str: A JSON string with the topology size, the number of booted and
+        connected switches, the number of CPU cores and the memory usage of
+        the worker machine
+    """
+    stats = {'topo_size': 0, 'booted_switches': 0, 'connected_switches': 0}
+    if MININET_TOPO is not None:
+        stats['topo_size'] = len(MININET_TOPO.switches)
+        stats['booted_switches'] = MININET_TOPO.get_switches()
+        stats['connected_switches'] = MININET_TOPO.get_connected_switches()
+    stats['cpu_count'] = multiprocessing.cpu_count()
+    stats.update(get_memory_usage())
+    return json.dumps(stats)
+
+
+def get_memory_usage():
+    """
+    Reads the memory usage of the worker machine from /proc/meminfo
+
+    Returns
+        dict: The total and the used memory of the machine in kB
+    """
+    meminfo = {}
+    with open('/proc/meminfo') as meminfo_file:
+        for line in meminfo_file:
+            key, value = line.split(':', 1)
+            meminfo[key] = int(value.split()[0])
+    if 'MemAvailable' in meminfo:
+        mem_available = meminfo['MemAvailable']
+    else:
+        # Older kernels do not report MemAvailable
+        mem_available = (meminfo['MemFree'] + meminfo.get('Buffers', 0) +
+                         meminfo.get('Cached', 0))
+    return {'mem_total_kb': meminfo['MemTotal'],
+            'mem_used_kb': meminfo['MemTotal'] - mem_available}
+
 @bottle.route('/stop', method='POST')
 def stop():
     """
     Calls the stop_topology() method of the current topology object to terminate
     the topology.
     """
+    stop_start = time.time()
     MININET_TOPO.stop_topology()
+    PHASE_DURATION.labels('stop').observe(time.time() - stop_start)
+
+
+@bottle.route('/shutdown', method='POST')
+def shutdown():
+    """
+    Stops the current topology, if any, and terminates the worker process
+    shortly after the response has been sent. A topology that was
+    initialized but not started is stopped as well, since its links already
+    exist. If stopping fails the request fails, so that cleanup deletes the
+    switches itself.
+    """
+    if MININET_TOPO is not None:
+        MININET_TOPO.stop_topology()
+    multi.remove_pid_file('worker', REST_PORT)
+    logging.info('[worker] Shutting down')
+    threading.Timer(0.5, os.kill, [os.getpid(), signal.SIGTERM]).start()
 
 
 @bottle.route('/ping_all', method='POST')
@@ -130,9 +690,29 @@ def generate_traffic():
     """
     Calls the generate_traffic() method of the current topology object to
     generate traffic from the switches.
+
+    JSON entries:
+        benchmark (bool): Optional. Record the send time of every packet to
+                          measure the PacketIN to FlowMod latency
     """
+    data = bottle.request.json or {}
+    MININET_TOPO.generate_traffic(benchmark=bool(data.get('benchmark')))
 
-    MININET_TOPO.generate_traffic()
+
+@bottle.route('/get_flow_latencies', method='POST')
+def get_flow_latencies():
+    """
+    Calls the get_flow_latencies() method of the current topology object to
+    get the results of the last PacketIN to FlowMod benchmark.
+
+    Returns
+        str: A JSON string with the dpid offset, the number of sent packets
+        and the [send time, install time] of every flow installed for a sent
+        packet
+    """
+    results = MININET_TOPO.get_flow_latencies()
+    results['dpid_offset'] = MININET_TOPO._dpid_offset
+    return json.dumps(results)
 
 def rest_start():
     """Starts Mininet REST server"""
@@ -151,7 +731,13 @@ def rest_start():
                         help='Port number to start Mininet REST server')
     args = parser.parse_args()
 
-    bottle.run(host=args.rest_host, port=args.rest_port, debug=True)
+    global REST_PORT
+    REST_PORT = args.rest_port
+    multi.write_pid_file('worker', REST_PORT)
+    try:
+        bottle.run(host=args.rest_host, port=args.rest_port, debug=True)
+    finally:
+        multi.remove_pid_file('worker', REST_PORT)
 
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.DEBUG)
@@ -0,0 +1,1511 @@
+"""
+Emulation of large numbers of OpenFlow 1.3 switches inside the worker
+process, without a datapath per switch
+"""
+
+import collections
+import errno
+import fcntl
+import heapq
+import itertools
+import logging
+import os
+import resource
+import select
+import socket
+import threading
+import time
+
+import net.flow_dump
+import net.multinet
+import net.openflow as of
+import util.tracing
+
+# Names of the reserved ports in the printed flows
+PORT_NAMES = {of.OFPP_IN_PORT: 'IN_PORT', of.OFPP_NORMAL: 'NORMAL',
+              of.OFPP_FLOOD: 'FLOOD', of.OFPP_CONTROLLER: 'CONTROLLER',
+              of.OFPP_LOCAL: 'LOCAL', of.OFPP_ANY: 'ANY'}
+
+
+def mac_from_int(value):
+    """Returns the text of the MAC address with an integer value"""
+    return ':'.join('{0:02x}'.format((value >> shift) & 0xff)
+                    for shift in range(40, -8, -8))
+
+
+def format_flow(flow):
+    """Returns a flow as printed by ovs-ofctl, e.g.
+    'priority=10,dl_src=..,dl_dst=.. actions=FLOOD'
+
+    Args:
+        flow (dict): The flow, see EmulatedSwitch.apply_flow_mod
+
+    Returns:
+        (str): The printed flow
+    """
+    match = flow['match']
+    fields = ['priority={0}'.format(flow['priority'])]
+    if 'in_port' in match:
+        fields.append('in_port={0}'.format(match['in_port']))
+    if 'eth_type' in match:
+        fields.append('dl_type=0x{0:04x}'.format(match['eth_type']))
+    if 'eth_src' in match:
+        fields.append('dl_src={0}'.format(match['eth_src']))
+    if 'eth_dst' in match:
+        fields.append('dl_dst={0}'.format(match['eth_dst']))
+    return 'table={0} cookie=0x{1:x} {2} actions={3}'.format(
+        flow['table_id'], flow['cookie'], ','.join(fields),
+        format_actions(flow))
+
+
+def format_actions(flow):
+    """Returns the actions of a flow as printed by ovs-ofctl, e.g. 'FLOOD'
+
+    Args:
+        flow (dict): The flow, see EmulatedSwitch.apply_flow_mod
+
+    Returns:
+        (str): The printed actions
+    """
+    return ','.join(PORT_NAMES.get(port, 'output:{0}'.format(port))
+                    for port in flow['ports']) or 'drop'
+
+
+def dumped_flows(switch, flow_filter, now):
+    """Returns the flows of a switch that pass the filters of a dump
+
+    Args:
+        switch (EmulatedSwitch): The switch
+        flow_filter (net.flow_dump.FlowFilter): The filters of the dump
+        now (float): The time of the dump
+
+    Returns:
+        (list): The flows, see net.flow_dump.flow_entry
+    """
+    flows = []
+    for flow in switch.flows.values():
+        entry = net.flow_dump.flow_entry(
+            flow['table_id'], flow['cookie'], flow['priority'],
+            dict(flow['match']), format_actions(flow), flow['packet_count'],
+            flow['byte_count'], now - flow['install_time'])
+        if flow_filter(entry):
+            flows.append(entry)
+    return flows
+
+
+class ControllerChannel(object):
+
+    """
+    The connection of an emulated switch to one controller. It completes the
+    handshake, keeps the OpenFlow role of the controller and hands the
+    requests of the controller to the switch. All the methods run on the
+    event loop of the network.
+    """
+
+    def __init__(self, switch, address):
+        """
+        Args:
+            switch (EmulatedSwitch): The switch of the channel
+            address (tuple): The IP address and the port of the controller
+        """
+        self.switch = switch
+        self.address = address
+        self.sock = None
+        self.state = 'stopped'
+        self.role = of.OFPCR_ROLE_EQUAL
+        self._in_buffer = b''
+        self._out_buffer = b''
+        self._writable = False
+
+    def connect(self):
+        """
+        Start a non-blocking connection to the controller
+        """
+        network = self.switch.network
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except socket.error as exc:
+            logging.error('[emulated] Switch {0} cannot connect: {1}'.
+                          format(self.switch.name, exc))
+            network.connection_lost(self)
+            return
+        self.sock.setblocking(0)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.state = 'connecting'
+        self.role = of.OFPCR_ROLE_EQUAL
+        err = self.sock.connect_ex(self.address)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            network.connection_lost(self)
+            return
+        self._writable = True
+        network.register(self, True)
+
+    def close(self):
+        """
+        Close the connection to the controller
+
+        Returns:
+            (bool): Whether the channel was connected
+        """
+        was_connected = self.state == 'connected'
+        if self.sock is not None:
+            self.switch.network.unregister(self)
+            self.sock.close()
+            self.sock = None
+        self.state = 'stopped'
+        self._in_buffer = b''
+        self._out_buffer = b''
+        self._writable = False
+        return was_connected
+
+    def handle_event(self, events):
+        """
+        Handle the readiness of the connection reported by the event loop
+
+        Args:
+            events (int): The epoll events
+        """
+        network = self.switch.network
+        if self.state == 'connecting':
+            if not events & (select.EPOLLOUT | select.EPOLLERR |
+                             select.EPOLLHUP):
+                return
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                network.connection_lost(self)
+                return
+            self.state = 'handshake'
+            self.send_message(of.hello(self.switch.next_xid()))
+            if self.sock is None:
+                return
+        if events & select.EPOLLIN:
+            try:
+                data = self.sock.recv(65536)
+            except socket.error as exc:
+                if exc.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                data = b''
+            if not data:
+                network.connection_lost(self)
+                return
+            messages, self._in_buffer = of.split_messages(self._in_buffer +
+                                                          data)
+            for _, msg_type, xid, msg in messages:
+                self._handle_message(msg_type, xid, msg)
+                if self.sock is None:
+                    return
+        elif events & (select.EPOLLERR | select.EPOLLHUP):
+            network.connection_lost(self)
+            return
+        if events & select.EPOLLOUT:
+            self._flush()
+
+    def send_message(self, data):
+        """
+        Send an OpenFlow message to the controller, queueing what the socket
+        does not accept yet. Messages are dropped while the channel is not
+        connected, like the datapath does.
+
+        Args:
+            data (bytes): The message
+        """
+        if self.sock is None or self.state == 'connecting':
+            return
+        self._out_buffer += data
+        self._flush()
+
+    def _flush(self):
+        """
+        Write the queued messages and wait for the socket to become writable
+        if they do not fit
+        """
+        if self._out_buffer:
+            try:
+                sent = self.sock.send(self._out_buffer)
+            except socket.error as exc:
+                if exc.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    self.switch.network.connection_lost(self)
+                    return
+                sent = 0
+            self._out_buffer = self._out_buffer[sent:]
+        writable = bool(self._out_buffer)
+        if writable != self._writable:
+            self._writable = writable
+            self.switch.network.register(self, writable, modify=True)
+
+    def _handle_message(self, msg_type, xid, msg):
+        """
+        Handle a message received from the controller
+
+        Args:
+            msg_type (int): The OpenFlow message type
+            xid (int): The transaction id
+            msg (bytes): The whole message
+        """
+        switch = self.switch
+        if msg_type == of.OFPT_HELLO:
+            if self.state == 'handshake':
+                self.state = 'connected'
+                switch.network.channel_connected(self)
+        elif msg_type == of.OFPT_ECHO_REQUEST:
+            self.send_message(of.echo_reply(xid, msg[of.OFP_HEADER.size:]))
+        elif msg_type == of.OFPT_FEATURES_REQUEST:
+            self.send_message(of.features_reply(xid, switch.dpid))
+        elif msg_type == of.OFPT_SET_CONFIG:
+            switch.miss_send_len = of.parse_set_config(msg)
+        elif msg_type == of.OFPT_GET_CONFIG_REQUEST:
+            self.send_message(of.get_config_reply(xid, switch.miss_send_len))
+        elif msg_type == of.OFPT_BARRIER_REQUEST:
+            self.send_message(of.barrier_reply(xid))
+        elif msg_type == of.OFPT_ROLE_REQUEST:
+            role, generation_id = of.parse_role(msg)
+            switch.set_role(self, role)
+            self.send_message(of.role_reply(xid, self.role, generation_id))
+        elif msg_type in (of.OFPT_FLOW_MOD, of.OFPT_PACKET_OUT):
+            if self.role == of.OFPCR_ROLE_SLAVE:
+                self.send_message(of.error(xid, of.OFPET_BAD_REQUEST,
+                                           of.OFPBRC_IS_SLAVE, msg))
+            elif msg_type == of.OFPT_FLOW_MOD:
+                switch.apply_flow_mod(of.parse_flow_mod(msg))
+        elif msg_type == of.OFPT_MULTIPART_REQUEST:
+            self.send_message(switch.multipart_reply(xid, msg))
+        elif msg_type in (of.OFPT_ECHO_REPLY, of.OFPT_ERROR,
+                          of.OFPT_EXPERIMENTER):
+            pass
+        else:
+            self.send_message(of.error(xid, of.OFPET_BAD_REQUEST,
+                                       of.OFPBRC_BAD_TYPE, msg))
+
+
+class EmulatedSwitch(object):
+
+    """
+    An OpenFlow 1.3 switch kept in memory. It has a connection to every
+    controller it is assigned to, applies the FlowMods to a single flow
+    table and sends a PacketIN for every emulated packet that a flow sends
+    to the controller. All the methods run on the event loop of the network.
+
+    Flows match on the in_port, eth_type, eth_src and eth_dst fields, other
+    match fields are ignored. Only the output actions of APPLY_ACTIONS
+    instructions are executed.
+    """
+
+    def __init__(self, name, dpid, network):
+        """
+        Args:
+            name (str): The name of the switch
+            dpid (int): The datapath id of the switch
+            network (EmulatedMultinet): The network of the switch
+        """
+        self.name = name
+        self.dpid = dpid
+        self.network = network
+        # The host ports are the ports 1..num_hosts
+        self.num_hosts = 0
+        self.ports = []
+        self.down_ports = set()
+        # (priority, sorted match items) -> flow
+        self.flows = {}
+        self.channels = []
+        self.miss_send_len = of.OFPCML_NO_BUFFER
+        self.packet_ins = 0
+        self.dropped_packets = 0
+        self._flow_order = None
+        self._xid = 0
+
+    def next_xid(self):
+        """Returns a new transaction id for a message the switch initiates"""
+        self._xid = (self._xid + 1) & 0xffffffff
+        return self._xid
+
+    def connect(self, addresses):
+        """
+        Connect to the controllers
+
+        Args:
+            addresses (list): The IP address and the port of every controller
+        """
+        self.channels = [ControllerChannel(self, address)
+                         for address in addresses]
+        for channel in self.channels:
+            channel.connect()
+
+    def close(self):
+        """
+        Close the connections to the controllers
+
+        Returns:
+            (bool): Whether the switch was connected
+        """
+        was_connected = self.connected()
+        for channel in self.channels:
+            channel.close()
+        self.channels = []
+        return was_connected
+
+    def connected(self):
+        """Returns whether the switch is connected to some controller"""
+        return any(channel.state == 'connected' for channel in self.channels)
+
+    def set_role(self, channel, role):
+        """
+        Apply a role request of a controller. A new master turns the current
+        master into a slave.
+
+        Args:
+            channel (ControllerChannel): The channel of the controller
+            role (int): One of the OFPCR_ROLE_* roles
+        """
+        if role == of.OFPCR_ROLE_NOCHANGE:
+            return
+        if role == of.OFPCR_ROLE_MASTER:
+            for other in self.channels:
+                if other is not channel and other.role == of.OFPCR_ROLE_MASTER:
+                    other.role = of.OFPCR_ROLE_SLAVE
+        channel.role = role
+
+    def send_async(self, data):
+        """
+        Send an asynchronous message to the controllers that are not slaves
+
+        Args:
+            data (bytes): The message
+        """
+        for channel in self.channels:
+            if channel.role != of.OFPCR_ROLE_SLAVE:
+                channel.send_message(data)
+
+    def multipart_reply(self, xid, msg):
+        """Returns the answer to a multipart request
+
+        Args:
+            xid (int): The transaction id
+            msg (bytes): The whole message
+
+        Returns:
+            (bytes): The reply messages, or an error
+        """
+        mp_type = of.multipart_type(msg)
+        if mp_type == of.OFPMP_DESC:
+            return of.desc_reply(xid, self.name)
+        if mp_type == of.OFPMP_PORT_DESC:
+            return of.port_desc_reply(xid, self.dpid, self.ports,
+                                      self.down_ports)
+        if mp_type == of.OFPMP_FLOW:
+            return of.flow_stats_reply(xid, list(self.flows.values()),
+                                       time.time())
+        if mp_type == of.OFPMP_AGGREGATE:
+            return of.aggregate_reply(
+                xid, sum(flow['packet_count'] for flow in self.flows.values()),
+                sum(flow['byte_count'] for flow in self.flows.values()),
+                len(self.flows))
+        return of.error(xid, of.OFPET_BAD_REQUEST, of.OFPBRC_BAD_MULTIPART,
+                        msg)
+
+    def apply_flow_mod(self, flow_mod):
+        """
+        Apply a FlowMod to the flow table
+
+        Args:
+            flow_mod (dict): The decoded FlowMod, see of.parse_flow_mod
+        """
+        command = flow_mod['command']
+        match = flow_mod['match']
+        key = (flow_mod['priority'], tuple(sorted(match.items())))
+        now = time.time()
+        if command == of.OFPFC_ADD:
+            flow = dict(flow_mod, ports=of.output_ports(
+                flow_mod['instructions']), packet_count=0, byte_count=0,
+                install_time=now, hit_time=now)
+            added = key not in self.flows
+            self.flows[key] = flow
+            self._flow_order = None
+            if flow['idle_timeout'] or flow['hard_timeout']:
+                self.network.watch_timeouts(self)
+            if added:
+                self.network.flow_changed(self, 'added', flow, now)
+        elif command in (of.OFPFC_MODIFY, of.OFPFC_MODIFY_STRICT):
+            ports = of.output_ports(flow_mod['instructions'])
+            for flow_key in self._matching_keys(
+                    key, match, command == of.OFPFC_MODIFY_STRICT):
+                self.flows[flow_key]['instructions'] = \
+                    flow_mod['instructions']
+                self.flows[flow_key]['ports'] = ports
+        elif command in (of.OFPFC_DELETE, of.OFPFC_DELETE_STRICT):
+            for flow_key in self._matching_keys(
+                    key, match, command == of.OFPFC_DELETE_STRICT):
+                self.remove_flow(flow_key, now)
+
+    def _matching_keys(self, key, match, strict):
+        """Returns the keys of the flows a modify or delete applies to
+
+        Args:
+            key (tuple): The key of the flow of the FlowMod
+            match (dict): The match of the FlowMod
+            strict (bool): Whether only the exact flow applies
+
+        Returns:
+            (list): The flow keys
+        """
+        if strict:
+            return [key] if key in self.flows else []
+        return [flow_key for flow_key, flow in self.flows.items()
+                if all(flow['match'].get(field) == value
+                       for field, value in match.items())]
+
+    def remove_flow(self, key, timestamp):
+        """
+        Remove a flow from the flow table
+
+        Args:
+            key (tuple): The key of the flow
+            timestamp (float): The time of the removal
+        """
+        flow = self.flows.pop(key)
+        self._flow_order = None
+        self.network.flow_changed(self, 'deleted', flow, timestamp)
+
+    def expire_flows(self, now):
+        """
+        Remove the flows whose idle or hard timeout has passed
+
+        Args:
+            now (float): The current time
+
+        Returns:
+            (bool): Whether flows with timeouts remain
+        """
+        remaining = False
+        for key, flow in list(self.flows.items()):
+            if ((flow['hard_timeout'] and
+                 now - flow['install_time'] >= flow['hard_timeout']) or
+                    (flow['idle_timeout'] and
+                     now - flow['hit_time'] >= flow['idle_timeout'])):
+                self.remove_flow(key, now)
+            elif flow['idle_timeout'] or flow['hard_timeout']:
+                remaining = True
+        return remaining
+
+    def lookup(self, fields):
+        """Returns the highest priority flow that matches a packet
+
+        Args:
+            fields (dict): The match fields of the packet
+
+        Returns:
+            (dict): The flow, None on a table miss
+        """
+        if self._flow_order is None:
+            self._flow_order = sorted(self.flows.values(),
+                                      key=lambda flow: -flow['priority'])
+        for flow in self._flow_order:
+            if all(fields.get(field) == value
+                   for field, value in flow['match'].items()):
+                return flow
+        return None
+
+    def receive_packet(self, in_port, src_mac, dst_mac):
+        """
+        Process an ARP packet received on a port, sending a PacketIN if its
+        flow outputs to the controller. Packets without a flow are dropped,
+        as OpenFlow 1.3 switches do without a table-miss flow.
+
+        Args:
+            in_port (int): The port the packet is received on
+            src_mac (str): The source MAC address of the packet
+            dst_mac (str): The destination MAC address of the packet
+        """
+        if not self.connected() or in_port in self.down_ports:
+            self.dropped_packets += 1
+            return
+        data = of.arp_packet(src_mac, dst_mac)
+        flow = self.lookup({'in_port': in_port, 'eth_type': 0x0806,
+                            'eth_src': src_mac, 'eth_dst': dst_mac})
+        if flow is None:
+            self.dropped_packets += 1
+            return
+        flow['packet_count'] += 1
+        flow['byte_count'] += len(data)
+        flow['hit_time'] = time.time()
+        if of.OFPP_CONTROLLER in flow['ports']:
+            reason = (of.OFPR_NO_MATCH if not flow['match'] and
+                      flow['priority'] == 0 else of.OFPR_ACTION)
+            self.send_async(of.packet_in(self.next_xid(), in_port, data,
+                                         reason, flow['table_id'],
+                                         flow['cookie']))
+            self.packet_ins += 1
+
+    def add_port(self, port_no):
+        """
+        Add a port, announcing it to the controller
+
+        Args:
+            port_no (int): The number of the port
+        """
+        self.ports.append(port_no)
+        self._send_port_status(of.OFPPR_ADD, port_no)
+
+    def delete_port(self, port_no):
+        """
+        Delete a port, announcing it to the controller
+
+        Args:
+            port_no (int): The number of the port
+        """
+        if port_no in self.ports:
+            self.ports.remove(port_no)
+        self.down_ports.discard(port_no)
+        self._send_port_status(of.OFPPR_DELETE, port_no)
+
+    def set_port_state(self, port_no, down):
+        """
+        Bring the link of a port down or up, announcing it to the controller
+
+        Args:
+            port_no (int): The number of the port
+            down (bool): Whether the link is down
+        """
+        if down:
+            self.down_ports.add(port_no)
+        else:
+            self.down_ports.discard(port_no)
+        self._send_port_status(of.OFPPR_MODIFY, port_no)
+
+    def _send_port_status(self, reason, port_no):
+        """
+        Announce a change of a port to all the controllers, slaves included
+        """
+        message = of.port_status(self.next_xid(), reason, self.dpid, port_no,
+                                 port_no in self.down_ports)
+        for channel in self.channels:
+            channel.send_message(message)
+
+
+class EmulatedMultinet(object):
+
+    """
+    A topology of emulated OpenFlow 1.3 switches, with the same interface as
+    Multinet. All the switches of the worker run on a single event loop
+    thread that multiplexes their controller connections with epoll, so one
+    machine can present tens of thousands of switches to the controller
+    without a datapath or a process per switch.
+
+    Hosts are not emulated: every switch has a port for every host, the
+    emulated traffic enters the switches from these ports, and the
+    commands that need real hosts are not supported.
+    """
+
+    # Delay in seconds before a switch reconnects to the controller after
+    # its connection is lost
+    RECONNECT_DELAY = 1.0
+    # Interval in seconds of the expiry of the flows with timeouts
+    EXPIRY_INTERVAL = 1.0
+
+    def __init__(self, controller_ip, controller_port, switch_type, topo_type,
+                 num_switches, group_size, group_delay_ms, hosts_per_switch,
+                 dpid_offset, traffic_generation_duration_ms,
+                 interpacket_delay_ms, auto_detect_hosts=False,
+                 topo_params=None, switch_offset=None, max_switches=None,
+                 flow_monitor=False, controllers=None,
+                 controller_assignment='round_robin'):
+        """
+        Takes the same arguments as Multinet. The flow tables are always
+        known, so flow_monitor is ignored.
+        """
+        assignments = net.multinet.CONTROLLER_ASSIGNMENTS
+        if controller_assignment not in assignments:
+            raise ValueError('Unknown controller assignment {0}, expected '
+                             'one of {1}'.format(controller_assignment,
+                                                 ', '.join(assignments)))
+        if max_switches is not None and switch_offset is not None:
+            raise ValueError('A topology cannot grow when its switch offset '
+                             'is given, as with partitioning: remove '
+                             'max_topo_size.')
+        if max_switches is None:
+            max_switches = num_switches
+        self._topo_type = topo_type
+        self._num_switches = num_switches
+        self._dpid_offset = dpid_offset
+        self._group_size = group_size
+        self._group_delay = float(group_delay_ms) / 1000
+        self._hosts_per_switch = hosts_per_switch
+        self.auto_detect_hosts = auto_detect_hosts
+        self._controller_ip = controller_ip
+        self._controller_port = controller_port
+        self._controller_addresses = (
+            [(ip, int(port)) for ip, port in controllers] if controllers
+            else [(controller_ip, controller_port)])
+        self._controller_assignment = controller_assignment
+        self._max_switches = max_switches
+        self.booted_switches = 0
+        self._started = False
+        self._traffic_generation_duration_ms = traffic_generation_duration_ms
+        self._interpacket_delay_ms = interpacket_delay_ms
+        self._topo_params = dict(topo_params) if topo_params else {}
+        if switch_offset is not None:
+            self._topo_params['switch_offset'] = switch_offset
+        elif max_switches != num_switches:
+            # Reserve the names of the switches added at runtime
+            self._topo_params['switch_offset'] = dpid_offset * max_switches
+        self.topo = net.multinet.Multinet.TOPOS[topo_type](
+            k=num_switches, n=hosts_per_switch, dpid=dpid_offset,
+            **self._topo_params)
+        self.switches = []
+        self.nameToNode = {}
+        # [switch, port, switch, port] of every switch-to-switch link
+        self.links = []
+
+        self._boot_start_time = None
+        self._switch_start_times = {}
+        self._switch_connect_times = {}
+        self._connected_switches = set()
+        self._switch_events = collections.deque(
+            maxlen=net.multinet.Multinet.MAX_SWITCH_EVENTS)
+        self._switch_event_seq = itertools.count(1)
+        self._flow_events = collections.deque(
+            maxlen=net.multinet.Multinet.MAX_FLOW_EVENTS)
+        self._flow_event_seq = itertools.count(1)
+        self._total_flows = 0
+        self._benchmark_pending = {}
+        self._benchmark_sent = 0
+        self._flow_latencies = []
+        # name -> reconnect time of the churned switches that have not
+        # reconnected yet
+        self._churn_reconnects = {}
+        self._churn_latencies = []
+        self._link_event_seq = itertools.count(1)
+        # The packets sent by generate_traffic, and the ones sent while
+        # their switch was not connected
+        self.traffic_packets = 0
+        self.traffic_send_errors = 0
+
+        self._poller = None
+        self._fds = {}
+        self._calls = collections.deque()
+        self._timers = []
+        self._timer_seq = itertools.count()
+        self._timed_switches = set()
+        self._wakeup = None
+        self._loop_thread = None
+        self._running = False
+
+    @util.tracing.traced()
+    def init_topology(self):
+        """
+        Create the switches and the ports of the topology
+        """
+        logging.info('[emulated] Initializing topology.')
+        for index, name in enumerate(self.topo.switches()):
+            self._add_switch(name, self.topo.switchHosts(index))
+        for src, dst, params in self.topo.iterLinks(withInfo=True):
+            if src in self.nameToNode and dst in self.nameToNode:
+                self._add_link(self.nameToNode[src], params['port1'],
+                               self.nameToNode[dst], params['port2'])
+        logging.info('[emulated] Topology initialized successfully. '
+                     'Created {0} switches'.format(len(self.switches)))
+
+    def _add_switch(self, name, num_hosts=None):
+        """Returns a new switch with a port for every host
+
+        Args:
+            name (str): The name of the switch
+            num_hosts (int): The number of hosts of the switch (default
+                             hosts_per_switch)
+
+        Returns:
+            (EmulatedSwitch): The switch
+        """
+        switch = EmulatedSwitch(name, int(name), self)
+        if num_hosts is None:
+            num_hosts = self._hosts_per_switch
+        switch.num_hosts = num_hosts
+        switch.ports = list(range(1, num_hosts + 1))
+        self.switches.append(switch)
+        self.nameToNode[name] = switch
+        return switch
+
+    def _add_link(self, switch1, port1, switch2, port2):
+        """
+        Add a link between two switches
+        """
+        switch1.ports.append(port1)
+        switch2.ports.append(port2)
+        self.links.append([switch1, port1, switch2, port2])
+
+    @util.tracing.traced()
+    def start_topology(self):
+        """
+        Start the event loop and connect the switches to the controller,
+        with a gradual bootup.
+        """
+        self._raise_fd_limit(self._max_switches)
+        self._start_loop()
+        logging.info('[emulated] Starting {0} switches'.
+                     format(len(self.switches)))
+        self._boot_start_time = time.time()
+        for ind, switch in enumerate(self.switches):
+            if ind % self._group_size == 0:
+                time.sleep(self._group_delay)
+            self._switch_start_times[switch.name] = time.time()
+            self.call(switch.connect, self.switch_controllers(switch.name))
+            self.booted_switches += 1
+        self._started = True
+        logging.info('[emulated] Topology started successfully. '
+                     'Booted up {0} switches'.format(self.booted_switches))
+        if self.auto_detect_hosts:
+            self.detect_hosts()
+
+    @util.tracing.traced()
+    def stop_topology(self):
+        """
+        Disconnect the switches and stop the event loop
+        """
+        logging.info('[emulated] Halting topology. Disconnecting switches.')
+        self._stop_loop()
+        self.switches = []
+        self.nameToNode = {}
+        self.links = []
+        self._started = False
+        self.booted_switches = 0
+        self._boot_start_time = None
+        self._switch_start_times = {}
+        self._switch_connect_times = {}
+        self._connected_switches = set()
+        self._switch_events.clear()
+        self._flow_events.clear()
+        self._total_flows = 0
+        self._churn_reconnects = {}
+        logging.info('[emulated] Topology halted successfully')
+
+    def switch_controllers(self, name):
+        """Returns the controllers a switch connects to, according to the
+        controller assignment
+
+        Args:
+            name (str): The name of the switch
+
+        Returns:
+            (list): The (IP address, OpenFlow port) of the controllers
+        """
+        return [self._controller_addresses[index]
+                for index in net.multinet.assign_controllers(
+                    len(self._controller_addresses),
+                    self._controller_assignment, int(name),
+                    self._dpid_offset)]
+
+    def get_controller_distribution(self):
+        """Returns the distribution of the switches over the controllers
+
+        Returns:
+            (list): The 'controller' address, the number of 'assigned'
+                    switches, and the number of switches 'connected' to it
+                    and whose 'master' it is, of every controller
+        """
+        index = dict((address, i)
+                     for i, address in enumerate(self._controller_addresses))
+        distribution = [{'controller': '{0}:{1}'.format(ip, port),
+                         'assigned': 0, 'connected': 0, 'master': 0}
+                        for ip, port in self._controller_addresses]
+        for switch in list(self.switches):
+            for address in self.switch_controllers(switch.name):
+                distribution[index[address]]['assigned'] += 1
+            for channel in list(switch.channels):
+                if channel.state != 'connected':
+                    continue
+                distribution[index[channel.address]]['connected'] += 1
+                if channel.role == of.OFPCR_ROLE_MASTER:
+                    distribution[index[channel.address]]['master'] += 1
+        return distribution
+
+    @staticmethod
+    def _raise_fd_limit(num_switches):
+        """
+        Raise the limit of open files of the process up to its hard limit,
+        so that every switch can have its connection
+
+        Args:
+            num_switches (int): The number of switches
+        """
+        needed = num_switches + 256
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            new_soft = (needed if hard == resource.RLIM_INFINITY
+                        else min(needed, hard))
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+            if new_soft < needed:
+                logging.warning('[emulated] The open files limit {0} is '
+                                'lower than the {1} switches need'.
+                                format(new_soft, needed))
+
+    def _start_loop(self):
+        """
+        Start the event loop thread, unless it is already running
+        """
+        if self._running:
+            return
+        self._poller = select.epoll()
+        self._wakeup = os.pipe()
+        for fd in self._wakeup:
+            fcntl.fcntl(fd, fcntl.F_SETFL,
+                        fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self._poller.register(self._wakeup[0], select.EPOLLIN)
+        self._running = True
+        self._schedule(self.EXPIRY_INTERVAL, self._expire_flows)
+        self._loop_thread = threading.Thread(target=self._run_loop)
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+
+    def _stop_loop(self):
+        """
+        Stop the event loop thread, closing the connections of the switches
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._wake()
+        self._loop_thread.join()
+        self._loop_thread = None
+        for switch in self.switches:
+            switch.close()
+        self._poller.close()
+        self._poller = None
+        for fd in self._wakeup:
+            os.close(fd)
+        self._wakeup = None
+        self._fds = {}
+        self._calls.clear()
+        self._timers = []
+        self._timed_switches = set()
+
+    def _run_loop(self):
+        """
+        Dispatch the readiness of the connections, the calls of the other
+        threads and the timers until the loop is stopped
+        """
+        while self._running:
+            timeout = -1
+            if self._timers:
+                timeout = max(self._timers[0][0] - time.time(), 0)
+            try:
+                events = self._poller.poll(timeout)
+            except IOError as exc:
+                if exc.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd, event in events:
+                if fd == self._wakeup[0]:
+                    try:
+                        while os.read(fd, 4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                channel = self._fds.get(fd)
+                if channel is not None:
+                    self._dispatch(channel.handle_event, (event,))
+            while self._calls:
+                self._dispatch(*self._calls.popleft())
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, function, args = heapq.heappop(self._timers)
+                self._dispatch(function, args)
+
+    @staticmethod
+    def _dispatch(function, args):
+        """
+        Run a function on the event loop, so that the failure of a single
+        switch does not stop the other switches
+        """
+        try:
+            function(*args)
+        except Exception:
+            logging.exception('[emulated] Error in the event loop')
+
+    def _wake(self):
+        """
+        Interrupt the wait of the event loop
+        """
+        try:
+            os.write(self._wakeup[1], b'x')
+        except OSError as exc:
+            if exc.args[0] != errno.EAGAIN:
+                raise
+
+    def call(self, function, *args):
+        """
+        Run a function on the event loop thread
+
+        Args:
+            function (callable): The function
+            args: The arguments of the function
+        """
+        self._calls.append((function, args))
+        self._wake()
+
+    def _call_and_wait(self, function, *args):
+        """
+        Run a function on the event loop thread and wait for its result. The
+        function runs on the calling thread if the loop is not running.
+
+        Args:
+            function (callable): The function
+            args: The arguments of the function
+
+        Returns:
+            The result of the function, None if it failed
+        """
+        if not self._running:
+            return function(*args)
+        done = threading.Event()
+        result = []
+
+        def run():
+            try:
+                result.append(function(*args))
+            finally:
+                done.set()
+        self.call(run)
+        done.wait()
+        return result[0] if result else None
+
+    def _schedule(self, delay, function, *args):
+        """
+        Run a function on the event loop thread after a delay. Must be called
+        from the event loop thread, or before it starts.
+
+        Args:
+            delay (float): The delay in seconds
+            function (callable): The function
+            args: The arguments of the function
+        """
+        heapq.heappush(self._timers, (time.time() + delay,
+                                      next(self._timer_seq), function, args))
+
+    def register(self, channel, writable, modify=False):
+        """
+        Watch the connection of a controller channel on the event loop
+
+        Args:
+            channel (ControllerChannel): The channel
+            writable (bool): Also wait for the connection to become writable
+            modify (bool): Whether the connection is already watched
+        """
+        fd = channel.sock.fileno()
+        events = select.EPOLLIN | (select.EPOLLOUT if writable else 0)
+        if modify:
+            self._poller.modify(fd, events)
+        else:
+            self._fds[fd] = channel
+            self._poller.register(fd, events)
+
+    def unregister(self, channel):
+        """
+        Stop watching the connection of a controller channel
+
+        Args:
+            channel (ControllerChannel): The channel
+        """
+        fd = channel.sock.fileno()
+        if self._fds.pop(fd, None) is not None:
+            self._poller.unregister(fd)
+
+    def _is_active(self, channel):
+        """Returns whether a channel belongs to a switch of the topology"""
+        switch = channel.switch
+        return (self.nameToNode.get(switch.name) is switch and
+                any(other is channel for other in switch.channels))
+
+    def connection_lost(self, channel):
+        """
+        Close the connection of a controller channel and reconnect it after
+        a delay, if its switch is still part of the topology. The switch
+        disconnects when its last channel does.
+
+        Args:
+            channel (ControllerChannel): The channel
+        """
+        if channel.close() and not channel.switch.connected():
+            self._record_switch_event(channel.switch.name, False, time.time())
+        if self._is_active(channel):
+            self._schedule(self.RECONNECT_DELAY, self._reconnect, channel)
+
+    def _reconnect(self, channel):
+        """
+        Connect a controller channel again, if its switch is still part of
+        the topology and it has not been connected in the meantime
+        """
+        if self._is_active(channel) and channel.sock is None:
+            channel.connect()
+
+    def channel_connected(self, channel):
+        """
+        Record the connection of a switch, when the first of its controller
+        channels completes the handshake
+
+        Args:
+            channel (ControllerChannel): The channel
+        """
+        if sum(1 for other in channel.switch.channels
+               if other.state == 'connected') == 1:
+            self._record_switch_event(channel.switch.name, True, time.time())
+
+    def _record_switch_event(self, name, connected, timestamp):
+        """
+        Record a connect or disconnect of a switch
+        """
+        if name not in self._switch_start_times:
+            return
+        if connected:
+            self._connected_switches.add(name)
+            self._switch_connect_times.setdefault(name, timestamp)
+            reconnect_time = self._churn_reconnects.pop(name, None)
+            if reconnect_time is not None:
+                self._churn_latencies.append(timestamp - reconnect_time)
+        else:
+            self._connected_switches.discard(name)
+        self._switch_events.append([next(self._switch_event_seq),
+                                    timestamp - self._boot_start_time,
+                                    name, connected])
+
+    def churn_switches(self, fraction, rate, duration, down_time=0,
+                       timeout=10):
+        """Disconnect a random fraction of the started switches from the
+        controllers and reconnect them, at a target rate for a duration.
+        Takes the same arguments and returns the same results as
+        Multinet.churn_switches.
+        """
+        names = net.multinet.select_churn_switches(
+            [switch.name for switch in self.switches
+             if switch.name in self._switch_start_times], fraction)
+        self._churn_reconnects = {}
+        self._churn_latencies = []
+        logging.info('[emulated] Churning {0} switches at {1} disconnects '
+                     'per second for {2} seconds'.format(len(names), rate,
+                                                         duration))
+
+        def disconnect(name):
+            self.call(self._disconnect_switch, self.nameToNode[name])
+
+        def reconnect(name):
+            self._churn_reconnects[name] = time.time()
+            self.call(self.nameToNode[name].connect,
+                      self.switch_controllers(name))
+
+        disconnects, skipped = net.multinet.churn_schedule(
+            net.multinet.rolling_selector(names,
+                                          busy=self._churn_reconnects),
+            rate, duration, down_time, disconnect, reconnect)
+        deadline = time.time() + timeout
+        while self._churn_reconnects and time.time() < deadline:
+            time.sleep(0.05)
+        logging.info('[emulated] Churn finished with {0} disconnects'.
+                     format(disconnects))
+        return {'churned_switches': len(names),
+                'disconnects': disconnects,
+                'skipped': skipped,
+                'latencies': list(self._churn_latencies),
+                'pending': len(self._churn_reconnects),
+                'booted': self.booted_switches,
+                'connected': self.get_connected_switches()}
+
+    def flap_links(self, pattern, rate, duration, down_time, burst_size=4):
+        """Bring the switch-to-switch links down and up at a target rate for
+        a duration. Takes the same arguments and returns the same results as
+        Multinet.flap_links. The ports of both switches of a link announce
+        the change with a PORT_STATUS message.
+        """
+        if not self._started:
+            raise ValueError('The topology has not been started.')
+        links = [tuple(link) for link in self.links]
+        select = net.multinet.link_flap_selector(
+            pattern, [(link[0].name, link[2].name) for link in links],
+            burst_size)
+        events = []
+        logging.info('[emulated] Flapping {0} links with the {1} pattern at '
+                     '{2} events per second for {3} seconds'.format(
+                         len(links), pattern, rate, duration))
+
+        def set_link_state(index, up):
+            switch1, port1, switch2, port2 = links[index]
+            self.call(switch1.set_port_state, port1, not up)
+            self.call(switch2.set_port_state, port2, not up)
+            events.append([next(self._link_event_seq),
+                           time.time() - self._boot_start_time,
+                           switch1.name, port1, switch2.name, port2, up])
+
+        link_downs, skipped = net.multinet.churn_schedule(
+            select, rate, duration, down_time,
+            lambda index: set_link_state(index, False),
+            lambda index: set_link_state(index, True))
+        logging.info('[emulated] Link flap finished with {0} link downs'.
+                     format(link_downs))
+        return {'links': len(links), 'link_downs': link_downs,
+                'skipped': skipped, 'boot_start_time': self._boot_start_time,
+                'events': events}
+
+    def _disconnect_switch(self, switch):
+        """
+        Close the connections of a switch to the controllers, without
+        reconnecting them
+        """
+        if switch.close():
+            self._record_switch_event(switch.name, False, time.time())
+
+    def flow_changed(self, switch, kind, flow, timestamp):
+        """
+        Record a flow added to or deleted from a switch, and match the added
+        flows with the packets of the PacketIN to FlowMod benchmark
+
+        Args:
+            switch (EmulatedSwitch): The switch
+            kind (str): 'added' or 'deleted'
+            flow (dict): The flow
+            timestamp (float): The time of the change
+        """
+        self._total_flows += 1 if kind == 'added' else -1
+        if self._boot_start_time is None:
+            return
+        self._flow_events.append([next(self._flow_event_seq),
+                                  timestamp - self._boot_start_time,
+                                  switch.name, kind, format_flow(flow)])
+        if kind == 'added' and self._benchmark_pending:
+            send_time = self._benchmark_pending.pop(
+                (flow['match'].get('eth_src'), flow['match'].get('eth_dst')),
+                None)
+            if send_time is not None:
+                self._flow_latencies.append(
+                    [send_time - self._boot_start_time,
+                     timestamp - self._boot_start_time])
+
+    def watch_timeouts(self, switch):
+        """
+        Expire the flows of a switch that has flows with timeouts
+
+        Args:
+            switch (EmulatedSwitch): The switch
+        """
+        self._timed_switches.add(switch)
+
+    def _expire_flows(self):
+        """
+        Remove the flows whose timeout has passed, every EXPIRY_INTERVAL
+        """
+        now = time.time()
+        for switch in list(self._timed_switches):
+            if not switch.expire_flows(now):
+                self._timed_switches.discard(switch)
+        self._schedule(self.EXPIRY_INTERVAL, self._expire_flows)
+
+    def add_switches(self, count, rate):
+        """
+        Attach switches to the running topology. Every new switch is linked
+        to the last switch of the topology, unless the topology is
+        disconnected. If the topology has been started, the new switches are
+        connected to the controller.
+
+        Args:
+            count (int): The number of switches to add
+            rate (float): The number of switches added per second (0 for
+                          no delay)
+        """
+        if len(self.switches) + count > self._max_switches:
+            raise ValueError('The topology cannot grow beyond {0} switches.'.
+                             format(self._max_switches))
+        delay = 1.0 / rate if rate > 0 else 0
+        logging.info('[emulated] Adding {0} switches.'.format(count))
+        for _ in range(count):
+            index = len(self.switches)
+            switch = self._add_switch(self.topo.switchName(index))
+            if index > 0 and self._topo_type != 'disconnected':
+                last_switch = self.switches[index - 1]
+                port = max(switch.ports) + 1 if switch.ports else 1
+                last_port = max(last_switch.ports) + 1
+                switch.ports.append(port)
+                self.links.append([switch, port, last_switch, last_port])
+                if self._started:
+                    self.call(last_switch.add_port, last_port)
+                else:
+                    last_switch.ports.append(last_port)
+            if self._started:
+                self._switch_start_times[switch.name] = time.time()
+                self.call(switch.connect,
+                          self.switch_controllers(switch.name))
+                self.booted_switches += 1
+            time.sleep(delay)
+        logging.info('[emulated] Topology has {0} switches.'.
+                     format(len(self.switches)))
+
+    def remove_switches(self, count, rate):
+        """
+        Detach the last switches, with their links, from the running
+        topology.
+
+        Args:
+            count (int): The number of switches to remove
+            rate (float): The number of switches removed per second (0 for
+                          no delay)
+        """
+        count = min(count, len(self.switches))
+        delay = 1.0 / rate if rate > 0 else 0
+        logging.info('[emulated] Removing {0} switches.'.format(count))
+        for _ in range(count):
+            switch = self.switches.pop()
+            del self.nameToNode[switch.name]
+            for link in [link for link in self.links
+                         if switch in (link[0], link[2])]:
+                self.links.remove(link)
+                peer, peer_port = ((link[2], link[3]) if link[0] is switch
+                                   else (link[0], link[1]))
+                if self._started:
+                    self.call(peer.delete_port, peer_port)
+                else:
+                    peer.ports.remove(peer_port)
+            if self._started:
+                self.call(self._remove_switch, switch)
+                self.booted_switches -= 1
+            self._switch_start_times.pop(switch.name, None)
+            self._switch_connect_times.pop(switch.name, None)
+            self._connected_switches.discard(switch.name)
+            time.sleep(delay)
+        logging.info('[emulated] Topology has {0} switches.'.
+                     format(len(self.switches)))
+
+    def _remove_switch(self, switch):
+        """
+        Disconnect a removed switch and forget its flows
+        """
+        switch.close()
+        self._timed_switches.discard(switch)
+        self._total_flows -= len(switch.flows)
+        switch.flows = {}
+
+    def get_edge_switches(self):
+        """Returns the switches that connect the topology to the topologies
+        of the neighbouring workers
+
+        Returns:
+            (list): the names of the first and the last switch of the topology
+        """
+        if not self.switches:
+            return []
+        return [self.switches[0].name, self.switches[-1].name]
+
+    def set_tunnels(self, tunnels):
+        """
+        Tunnels need OVS switches, so only an empty list is accepted
+
+        Args:
+            tunnels (list): The tunnels to the neighbouring topologies
+        """
+        if tunnels:
+            raise ValueError('Tunnels are supported only on OVS switches.')
+
+    def host_mac(self, switch_index, host_index):
+        """Returns the MAC address of an emulated host
+
+        Args:
+            switch_index (int): The index of the switch of the host
+            host_index (int): The index of the host on its switch
+
+        Returns:
+            (str): The MAC address
+        """
+        return mac_from_int((self.topo.switch_offset + switch_index) *
+                            self._hosts_per_switch + host_index + 1)
+
+    def detect_hosts(self, ping_cnt=50):
+        """
+        Send a broadcast ARP packet from every emulated host, so that the
+        controller host detector sees the hosts
+
+        Args:
+            ping_cnt: Ignored, a single packet is enough for the emulated
+                      hosts
+        """
+        for switch_index, switch in enumerate(self.switches):
+            for host_index in range(switch.num_hosts):
+                self.call(switch.receive_packet, host_index + 1,
+                          self.host_mac(switch_index, host_index),
+                          'ff:ff:ff:ff:ff:ff')
+        logging.debug('[emulated] Hosts should be visible now')
+
+    def ping_all(self):
+        """
+        All-to-all pinging needs real hosts
+        """
+        raise ValueError('ping_all is not supported with emulated switches.')
+
+    def get_switches(self):
+        """Returns the total number of switches of the topology
+
+        Returns:
+            (int): number of switches in the topology
+        """
+        return self.booted_switches
+
+    def get_connected_switches(self):
+        """Returns the number of switches that are connected to the controller
+
+        Returns:
+            (int): number of switches connected to the controller
+        """
+        return len(self._connected_switches)
+
+    def get_connect_times(self):
+        """Returns the time every started switch was started and the time it
+        first connected to the controller, relative to the start of the
+        topology bootup
+
+        Returns:
+            (list): [name, start time, connect time] of every started switch,
+                    in seconds. The connect time is None if the switch has
+                    not connected yet.
+        """
+        if self._boot_start_time is None:
+            return []
+        connect_times = dict(self._switch_connect_times)
+        times = []
+        for switch in self.switches:
+            start_time = self._switch_start_times.get(switch.name)
+            if start_time is None:
+                continue
+            connect_time = connect_times.get(switch.name)
+            times.append([switch.name, start_time - self._boot_start_time,
+                          None if connect_time is None
+                          else connect_time - self._boot_start_time])
+        return times
+
+    def get_switch_events(self, since=0):
+        """Returns the connect and disconnect events of the switches
+
+        Args:
+            since (int): Return only the events after this sequence number
+
+        Returns:
+            (list): [sequence number, time, name, connected] of every event,
+                    oldest first. The time is relative to the start of the
+                    topology bootup.
+        """
+        return [event for event in list(self._switch_events)
+                if event[0] > since]
+
+    @util.tracing.traced()
+    def get_flows(self):
+        """Returns the number of flows installed on the switches
+
+        Returns:
+            (int): number of flows
+        """
+        return self._total_flows
+
+    def get_flow_counts(self):
+        """Returns the number of flows of every switch
+
+        Returns:
+            (dict): switch name - number of flows correspondence
+        """
+        return dict((switch.name, len(switch.flows))
+                    for switch in self.switches)
+
+    def dump_flows(self, flow_filter,
+                   concurrency=net.flow_dump.DEFAULT_CONCURRENCY,
+                   chunk_size=net.flow_dump.DEFAULT_CHUNK_SIZE):
+        """Returns the flows of the switches that pass a filter, switch by
+        switch and in chunks. The flow tables are in memory, so the switches
+        are read one at a time on the event loop, which keeps serving the
+        controllers between the switches, and concurrency is ignored.
+
+        Args:
+            flow_filter (net.flow_dump.FlowFilter): The filters of the dump
+            concurrency (int): Unused, see Multinet.dump_flows
+            chunk_size (int): The largest number of flows of a chunk
+
+        Returns:
+            (generator): The switch name and a chunk of its flows, see
+                         net.flow_dump.flow_entry. A switch without flows
+                         has a single empty chunk.
+        """
+        for switch in list(self.switches):
+            if not flow_filter.switch_selected(switch.name):
+                continue
+            flows = self._call_and_wait(dumped_flows, switch, flow_filter,
+                                        time.time()) or []
+            for chunk in net.flow_dump.chunked(flows, chunk_size):
+                yield switch.name, chunk
+
+    def get_flow_events(self, since=0):
+        """Returns the flow add and delete events of the switches
+
+        Args:
+            since (int): Return only the events after this sequence number
+
+        Returns:
+            (list): [sequence number, time, switch name, 'added' or
+                    'deleted', flow] of every event, oldest first. The time
+                    is relative to the start of the topology bootup.
+        """
+        return [event for event in list(self._flow_events)
+                if event[0] > since]
+
+    def get_flow_latencies(self):
+        """Returns the results of the last PacketIN to FlowMod benchmark
+
+        Returns:
+            (dict): The number of 'sent' packets and the [send time, install
+                    time] of every 'flows' entry installed for a sent packet,
+                    relative to the start of the topology bootup
+        """
+        return {'sent': self._benchmark_sent,
+                'flows': list(self._flow_latencies)}
+
+    @util.tracing.traced()
+    def generate_traffic(self, benchmark=False):
+        """
+        Traffic generation from switches to controller. Like Multinet, every
+        switch in turn receives an ARP packet on its first host port and the
+        reverse packet on its second host port, for the configured duration.
+
+        Args:
+            benchmark (bool): Record the send time of every packet and match
+                              it with the flow the controller installs for it
+        """
+        logging.info('[emulated] Generating traffic from switches.')
+        if not self._hosts_per_switch > 1:
+            raise AssertionError(
+                '_hosts_per_switch must be at least 2 or greater.')
+        if benchmark:
+            self._benchmark_pending = {}
+            self._benchmark_sent = 0
+            self._flow_latencies = []
+        delay = self._interpacket_delay_ms / 1000.0
+        duration = self._traffic_generation_duration_ms / 1000.0
+        mac_base = self._dpid_offset << 32
+        mac_index = 0
+        switch_index = 0
+        # Only the switches with two hosts or more, e.g. the edge switches of
+        # a fat-tree, send traffic
+        senders = [switch for switch in self.switches if switch.num_hosts > 1]
+        transmission_start = time.time()
+        while time.time() - transmission_start <= duration and senders:
+            src_mac = mac_from_int(mac_base + mac_index + 1)
+            dst_mac = mac_from_int(mac_base + mac_index + 2)
+            mac_index = (mac_index + 2) % 0xfffffffe
+            switch = senders[switch_index % len(senders)]
+            self._send_packet(switch, 1, src_mac, dst_mac, benchmark)
+            time.sleep(delay / 2)
+            self._send_packet(switch, 2, dst_mac, src_mac, benchmark)
+            time.sleep(delay / 2)
+            switch_index += 1
+
+    def _send_packet(self, switch, in_port, src_mac, dst_mac, benchmark):
+        """
+        Emulate a packet received by a switch, recording its send time when
+        benchmarking
+        """
+        if benchmark:
+            self._benchmark_pending[(src_mac, dst_mac)] = time.time()
+            self._benchmark_sent += 1
+        self.traffic_packets += 1
+        if switch.name not in self._connected_switches:
+            self.traffic_send_errors += 1
+        self.call(switch.receive_packet, in_port, src_mac, dst_mac)
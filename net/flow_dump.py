@@ -0,0 +1,224 @@
+"""
+Flow table dumps of the switches, filtered on the worker and streamed in
+chunks
+"""
+
+# The number of switches whose flow tables are dumped at once
+DEFAULT_CONCURRENCY = 8
+# The largest number of flows in a chunk of a dump
+DEFAULT_CHUNK_SIZE = 1000
+
+# The priority ovs-ofctl omits from the flows that have it
+OFP_DEFAULT_PRIORITY = 0x8000
+# The match fields of the ovs-ofctl flows, by their names in the dumps
+OVS_FIELD_NAMES = {'dl_src': 'eth_src', 'dl_dst': 'eth_dst',
+                   'dl_type': 'eth_type'}
+# The fields of the ovs-ofctl flows that are not match fields
+OVS_FLOW_STATS = set(['cookie', 'duration', 'table', 'n_packets', 'n_bytes',
+                      'idle_timeout', 'hard_timeout', 'idle_age', 'hard_age',
+                      'priority', 'reset_counts', 'send_flow_rem',
+                      'check_overlap', 'importance', 'no_packet_counts',
+                      'no_byte_counts'])
+
+
+def parse_int(value):
+    """Returns the integer of a decimal or 0x-prefixed hexadecimal text"""
+    if not isinstance(value, (str, type(u''))):
+        return int(value)
+    return int(value, 0)
+
+
+def flow_entry(table, cookie, priority, match, actions, packets, byte_count,
+               duration):
+    """Returns a dumped flow
+
+    Args:
+        table (int): The table of the flow
+        cookie (int): The cookie of the flow
+        priority (int): The priority of the flow
+        match (dict): The match fields of the flow
+        actions (str): The actions of the flow, as printed by ovs-ofctl
+        packets (int): The packets that hit the flow
+        byte_count (int): The bytes that hit the flow
+        duration (float): The time in seconds since the flow was installed
+
+    Returns:
+        (dict): The flow
+    """
+    return {'table': table, 'cookie': cookie, 'priority': priority,
+            'match': match, 'actions': actions, 'packets': packets,
+            'bytes': byte_count, 'duration': duration}
+
+
+def parse_dump_flows_line(line):
+    """Decodes a line of the output of 'ovs-ofctl dump-flows', e.g.
+    ' cookie=0x0, duration=4.2s, table=0, n_packets=0, n_bytes=0,
+    priority=10,dl_src=..,dl_dst=.. actions=output:1'
+
+    Args:
+        line (str): The line
+
+    Returns:
+        (dict): The flow, see flow_entry, None for the lines that are not
+                flows
+    """
+    line = line.strip()
+    fields, separator, actions = line.partition(' actions=')
+    if not separator:
+        return None
+    stats = {}
+    match = {}
+    for field in fields.replace(', ', ',').replace(' ', ',').split(','):
+        if not field:
+            continue
+        name, _, value = field.partition('=')
+        if name in OVS_FLOW_STATS:
+            stats[name] = value
+        else:
+            name = OVS_FIELD_NAMES.get(name, name)
+            if name == 'eth_type' or name == 'in_port':
+                try:
+                    value = parse_int(value)
+                except ValueError:
+                    pass
+            match[name] = value
+    return flow_entry(int(stats.get('table', 0)),
+                      parse_int(stats.get('cookie', '0')),
+                      int(stats.get('priority', OFP_DEFAULT_PRIORITY)),
+                      match, actions, int(stats.get('n_packets', 0)),
+                      int(stats.get('n_bytes', 0)),
+                      float(stats.get('duration', '0s').rstrip('s')))
+
+
+def chunked(flows, chunk_size):
+    """Returns the flows of a switch in chunks, and a single empty chunk for
+    a switch without flows, so that every dumped switch is reported
+
+    Args:
+        flows (iterable): The flows
+        chunk_size (int): The largest number of flows of a chunk
+
+    Returns:
+        (generator): The lists of flows
+    """
+    chunk = []
+    empty = True
+    for flow in flows:
+        chunk.append(flow)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+            empty = False
+    if chunk or empty:
+        yield chunk
+
+
+class FlowFilter(object):
+
+    """
+    The filters of a flow dump. A flow is dumped if it passes all the given
+    filters:
+        switches (list): The names of the dumped switches
+        table (int): The table of the flow
+        cookie (int): The cookie of the flow, under cookie_mask
+        cookie_mask (int): The bits of the cookie compared, all by default
+        priority (int): The priority of the flow
+        in_port (int): The in_port match field of the flow
+        eth_src (str): The eth_src match field of the flow
+        eth_dst (str): The eth_dst match field of the flow
+        mac (str): The eth_src or the eth_dst match field of the flow
+    The integers may also be given as decimal or 0x-prefixed texts.
+    """
+
+    FILTERS = ['switches', 'table', 'cookie', 'cookie_mask', 'priority',
+               'in_port', 'eth_src', 'eth_dst', 'mac']
+
+    def __init__(self, filters=None):
+        """
+        Args:
+            filters (dict): The filters, see FILTERS
+
+        Raises:
+            ValueError: If a filter is unknown or has an invalid value
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(self.FILTERS)
+        if unknown:
+            raise ValueError('Unknown flow filters {0}, expected some of '
+                             '{1}'.format(', '.join(sorted(unknown)),
+                                          ', '.join(self.FILTERS)))
+        self.switches = (set(str(name) for name in filters['switches'])
+                         if 'switches' in filters else None)
+        self.table = self._int_filter(filters, 'table')
+        self.cookie = self._int_filter(filters, 'cookie')
+        self.cookie_mask = self._int_filter(filters, 'cookie_mask')
+        if self.cookie_mask is None:
+            self.cookie_mask = 0xffffffffffffffff
+        self.priority = self._int_filter(filters, 'priority')
+        self.in_port = self._int_filter(filters, 'in_port')
+        self.eth_src = filters.get('eth_src', '').lower() or None
+        self.eth_dst = filters.get('eth_dst', '').lower() or None
+        self.mac = filters.get('mac', '').lower() or None
+
+    @staticmethod
+    def _int_filter(filters, name):
+        """Returns the integer value of a filter, None if it is not given"""
+        if filters.get(name) is None:
+            return None
+        try:
+            return parse_int(filters[name])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid flow filter {0}={1}'.format(
+                name, filters[name]))
+
+    def switch_selected(self, name):
+        """Returns whether the flows of a switch are dumped"""
+        return self.switches is None or name in self.switches
+
+    def ofctl_spec(self):
+        """Returns the flow argument of 'ovs-ofctl dump-flows' that applies
+        the filters ovs-ofctl supports, so that the bridges only print the
+        flows that may pass. The other filters are applied to the printed
+        flows.
+
+        Returns:
+            (str): The flow argument, empty without such filters
+        """
+        fields = []
+        if self.table is not None:
+            fields.append('table={0}'.format(self.table))
+        if self.cookie is not None:
+            fields.append('cookie=0x{0:x}/0x{1:x}'.format(self.cookie,
+                                                          self.cookie_mask))
+        if self.in_port is not None:
+            fields.append('in_port={0}'.format(self.in_port))
+        if self.eth_src is not None:
+            fields.append('dl_src={0}'.format(self.eth_src))
+        if self.eth_dst is not None:
+            fields.append('dl_dst={0}'.format(self.eth_dst))
+        return ','.join(fields)
+
+    def __call__(self, flow):
+        """Returns whether a flow passes the filters
+
+        Args:
+            flow (dict): The flow, see flow_entry
+        """
+        match = flow['match']
+        if self.table is not None and flow['table'] != self.table:
+            return False
+        if (self.cookie is not None and
+                (flow['cookie'] ^ self.cookie) & self.cookie_mask):
+            return False
+        if self.priority is not None and flow['priority'] != self.priority:
+            return False
+        if self.in_port is not None and match.get('in_port') != self.in_port:
+            return False
+        if self.eth_src is not None and match.get('eth_src') != self.eth_src:
+            return False
+        if self.eth_dst is not None and match.get('eth_dst') != self.eth_dst:
+            return False
+        if self.mac is not None and self.mac not in (match.get('eth_src'),
+                                                     match.get('eth_dst')):
+            return False
+        return True
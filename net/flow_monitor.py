@@ -0,0 +1,219 @@
+"""
+Live flow counts of the OVS bridges, kept up to date from OpenFlow flow
+monitor subscriptions
+"""
+
+import errno
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+
+class FlowMonitor(object):
+
+    """
+    Subscribes to the flow table updates of every bridge with one
+    'ovs-ofctl monitor <bridge> watch:' process per bridge, and keeps the
+    number of flows of every bridge in memory. A single reader thread
+    multiplexes the outputs of all the processes with poll(), so the number
+    of bridges is not bounded by select(). Every added and deleted flow is
+    reported to a callback with the time it was read. ovs-ofctl prints the
+    updates it receives to stderr, so stderr is read along with stdout.
+
+    The flow monitor is a Nicira extension of OpenFlow 1.0, so the bridges
+    must accept OpenFlow10 next to the protocol used by the controller.
+    """
+
+    # Timeout in milliseconds of every poll, after which the bridges added
+    # or removed in the meantime are picked up by the reader thread
+    POLL_TIMEOUT_MS = 100
+
+    def __init__(self, on_event=None, protocol='OpenFlow10'):
+        """
+        Args:
+            on_event (callable): Called from the reader thread with the name
+                                 of a bridge, the event ('added' or
+                                 'deleted'), the flow and the time of the
+                                 event
+            protocol (str): The OpenFlow version used by ovs-ofctl
+        """
+        self._on_event = on_event
+        self._protocol = protocol
+        self._flow_counts = {}
+        self._total_flows = 0
+        # bridge name -> monitor process
+        self._processes = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._reader = None
+
+    def start(self):
+        """
+        Start the reader thread
+        """
+        self._running = True
+        self._reader = threading.Thread(target=self._read_updates)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def stop(self):
+        """
+        Terminate the monitor processes and wait for the reader thread
+        """
+        self._running = False
+        if self._reader is not None:
+            self._reader.join()
+            self._reader = None
+        with self._lock:
+            for process in self._processes.values():
+                self._terminate(process)
+                process.stdout.close()
+            self._processes = {}
+            self._pending = []
+        self._flow_counts = {}
+        self._total_flows = 0
+
+    def add_bridge(self, name):
+        """
+        Start monitoring the flow table of a bridge
+
+        Args:
+            name (str): The name of the bridge
+
+        Raises:
+            OSError: If ovs-ofctl cannot be executed
+        """
+        process = subprocess.Popen(
+            ['ovs-ofctl', '-O', self._protocol, 'monitor', name, 'watch:'],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        with self._lock:
+            self._processes[name] = process
+            self._flow_counts[name] = 0
+            self._pending.append(name)
+
+    def remove_bridge(self, name):
+        """
+        Stop monitoring the flow table of a bridge
+
+        Args:
+            name (str): The name of the bridge
+        """
+        with self._lock:
+            process = self._processes.pop(name, None)
+            self._pending.append(name)
+            self._total_flows -= self._flow_counts.pop(name, 0)
+        if process is not None:
+            self._terminate(process)
+
+    def flow_count(self, name=None):
+        """Returns the number of flows of a bridge, or of all the bridges
+
+        Args:
+            name (str): The name of the bridge, None for all the bridges
+
+        Returns:
+            (int): number of flows
+        """
+        if name is None:
+            return self._total_flows
+        return self._flow_counts.get(name, 0)
+
+    def flow_counts(self):
+        """Returns the number of flows of every bridge
+
+        Returns:
+            (dict): bridge name - number of flows correspondence
+        """
+        return dict(self._flow_counts)
+
+    @staticmethod
+    def _terminate(process):
+        """
+        Terminate a monitor process and reap it
+        """
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+
+    def _read_updates(self):
+        """
+        Read the flow updates of all the monitor processes until the monitor
+        is stopped
+        """
+        poller = select.poll()
+        # fd -> [bridge name, partial line, monitor output]
+        readers = {}
+        while self._running:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                for name in pending:
+                    for fd, reader in list(readers.items()):
+                        if reader[0] == name:
+                            poller.unregister(fd)
+                            reader[2].close()
+                            del readers[fd]
+                    process = self._processes.get(name)
+                    if process is not None:
+                        fd = process.stdout.fileno()
+                        poller.register(fd, select.POLLIN)
+                        readers[fd] = [name, b'', process.stdout]
+            try:
+                events = poller.poll(self.POLL_TIMEOUT_MS)
+            except select.error as exc:
+                if exc.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd, _ in events:
+                if fd not in readers:
+                    continue
+                name = readers[fd][0]
+                try:
+                    chunk = os.read(fd, 65536)
+                except OSError:
+                    chunk = b''
+                if not chunk:
+                    logging.debug('[flow_monitor] Monitor of bridge {0} '
+                                  'exited'.format(name))
+                    poller.unregister(fd)
+                    readers.pop(fd)[2].close()
+                    continue
+                lines = (readers[fd][1] + chunk).split(b'\n')
+                readers[fd][1] = lines.pop()
+                now = time.time()
+                for line in lines:
+                    self._apply_line(name, line.decode('utf-8').strip(), now)
+        for reader in readers.values():
+            reader[2].close()
+
+    def _apply_line(self, name, line, timestamp):
+        """
+        Apply a line of the output of 'ovs-ofctl monitor', e.g.
+        ' event=ADDED table=0 cookie=0 priority=10,dl_src=..,dl_dst=..
+        actions=..'
+
+        Args:
+            name (str): The name of the bridge
+            line (str): The line
+            timestamp (float): The time the line was read
+        """
+        if not line.startswith('event='):
+            return
+        event, _, flow = line.partition(' ')
+        event = event[len('event='):]
+        if event in ('ADDED', 'INITIAL'):
+            delta, kind = 1, 'added'
+        elif event == 'DELETED':
+            delta, kind = -1, 'deleted'
+        else:
+            return
+        with self._lock:
+            if name not in self._flow_counts:
+                return
+            self._flow_counts[name] += delta
+            self._total_flows += delta
+        if self._on_event is not None:
+            self._on_event(name, kind, flow, timestamp)
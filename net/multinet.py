@@ -21,9 +21,226 @@ import itertools
 import net.topologies
 import socket
 import struct
+import subprocess
+import collections
+import net.flow_dump
+import net.flow_monitor
+import net.ovsdb_monitor
+import random
+import re
+import util.tracing
 
 logging.basicConfig(level=logging.DEBUG)
 
+# The MAC address fields of a flow, as printed by ovs-ofctl
+FLOW_MAC_FIELD = re.compile(r'(dl_src|dl_dst)=([0-9a-f:]{17})')
+
+# The policies that assign the switches to the controllers
+CONTROLLER_ASSIGNMENTS = ['round_robin', 'per_worker', 'all']
+
+# The patterns of the link flaps
+LINK_FLAP_PATTERNS = ['random', 'rolling', 'burst']
+
+
+def assign_controllers(num_controllers, assignment, switch_index,
+                       dpid_offset):
+    """Returns the controllers a switch connects to
+
+    Args:
+        num_controllers (int): The number of controllers
+        assignment (str): 'round_robin' to spread the switches over the
+                          controllers by their global index, 'per_worker' to
+                          connect all the switches of a worker to one
+                          controller, 'all' to connect every switch to all
+                          the controllers, which elect the master of the
+                          switch with OpenFlow roles
+        switch_index (int): The global index of the switch
+        dpid_offset (int): The dpid offset of the worker
+
+    Returns:
+        (list): The indices of the controllers
+    """
+    if assignment == 'all':
+        return list(range(num_controllers))
+    if assignment == 'per_worker':
+        return [dpid_offset % num_controllers]
+    return [switch_index % num_controllers]
+
+
+def select_churn_switches(names, fraction):
+    """Returns a random sample of the switches to churn
+
+    Args:
+        names (list): The names of the started switches
+        fraction (float): The fraction of the switches to churn, in (0, 1]
+
+    Returns:
+        (list): The names of the sampled switches, at least one if there are
+                started switches
+
+    Raises:
+        ValueError: If the fraction is out of range
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError('The churn fraction must be in (0, 1].')
+    count = min(len(names), max(1, int(round(fraction * len(names)))))
+    return random.sample(names, count)
+
+
+def rolling_selector(items, busy=()):
+    """Returns a churn_schedule selector that takes the items in turn,
+    skipping the ones that are down or busy
+
+    Args:
+        items (list): The items to churn
+        busy (container): The items that cannot be taken down yet, e.g. the
+                          switches that are still reconnecting
+
+    Returns:
+        (callable): The selector
+    """
+    position = [0]
+
+    def select(down):
+        for offset in xrange(len(items)):
+            item = items[(position[0] + offset) % len(items)]
+            if item not in down and item not in busy:
+                position[0] = (position[0] + offset + 1) % len(items)
+                return [item]
+        return []
+    return select
+
+
+def random_selector(items):
+    """Returns a churn_schedule selector that takes a random item that is
+    not down
+
+    Args:
+        items (list): The items to churn
+
+    Returns:
+        (callable): The selector
+    """
+    def select(down):
+        candidates = [item for item in items if item not in down]
+        return [random.choice(candidates)] if candidates else []
+    return select
+
+
+def burst_selector(endpoints, burst_size):
+    """Returns a churn_schedule selector of correlated link failures, that
+    takes up to burst_size links of a random switch at once, as the failure
+    of a line card would
+
+    Args:
+        endpoints (list): The names of the two switches of every link. The
+                          links are the indices in this list.
+        burst_size (int): The largest number of links taken at once
+
+    Returns:
+        (callable): The selector
+    """
+    switch_links = collections.defaultdict(list)
+    for index, (switch1, switch2) in enumerate(endpoints):
+        switch_links[switch1].append(index)
+        switch_links[switch2].append(index)
+    switches = sorted(switch_links)
+
+    def select(down):
+        candidates = [switch for switch in switches
+                      if any(index not in down
+                             for index in switch_links[switch])]
+        if not candidates:
+            return []
+        links = [index for index in switch_links[random.choice(candidates)]
+                 if index not in down]
+        return links[:burst_size]
+    return select
+
+
+def link_flap_selector(pattern, endpoints, burst_size):
+    """Returns the churn_schedule selector of a link flap pattern
+
+    Args:
+        pattern (str): 'random' to flap a random link at a time, 'rolling'
+                       to flap the links in turn, 'burst' to flap up to
+                       burst_size links of a random switch at once
+        endpoints (list): The names of the two switches of every link. The
+                          links are the indices in this list.
+        burst_size (int): The largest number of links of a burst
+
+    Returns:
+        (callable): The selector
+
+    Raises:
+        ValueError: If the pattern is unknown
+    """
+    if pattern not in LINK_FLAP_PATTERNS:
+        raise ValueError('Unknown link flap pattern {0}, expected one of '
+                         '{1}'.format(pattern, ', '.join(LINK_FLAP_PATTERNS)))
+    if pattern == 'rolling':
+        return rolling_selector(list(xrange(len(endpoints))))
+    if pattern == 'random':
+        return random_selector(list(xrange(len(endpoints))))
+    return burst_selector(endpoints, max(1, burst_size))
+
+
+def churn_schedule(select, rate, duration, down_time, disconnect, reconnect):
+    """Takes items down at a target rate for a duration and brings every
+    item up again after a down time. The items of every event are chosen by
+    a selector, and an event is skipped when the selector finds none.
+    Returns after the last item is up.
+
+    Args:
+        select (callable): Returns the list of items to take down, given the
+                           set of the items that are down
+        rate (float): The number of events per second
+        duration (float): The time in seconds events are scheduled for
+        down_time (float): The time in seconds an item stays down
+        disconnect (callable): Takes the given item down
+        reconnect (callable): Brings the given item up
+
+    Returns:
+        (tuple): The number of items taken down and of skipped events
+
+    Raises:
+        ValueError: If the rate is not positive
+    """
+    if rate <= 0:
+        raise ValueError('The churn rate must be positive.')
+    interval = 1.0 / rate
+    start = time.time()
+    end = start + duration
+    # (up time, item) of the items that are down, in up time order
+    down = collections.deque()
+    down_items = set()
+    slots = 0
+    skipped = 0
+    taken = 0
+    while True:
+        now = time.time()
+        while down and down[0][0] <= now:
+            _, item = down.popleft()
+            down_items.discard(item)
+            reconnect(item)
+        due = start + slots * interval
+        if due >= end and not down:
+            return taken, skipped
+        if due < end and due <= now:
+            slots += 1
+            items = select(down_items)
+            if not items:
+                skipped += 1
+            for item in items:
+                disconnect(item)
+                down.append((time.time() + down_time, item))
+                down_items.add(item)
+            taken += len(items)
+            continue
+        wake = min(due if due < end else float('inf'),
+                   down[0][0] if down else float('inf'))
+        time.sleep(max(wake - time.time(), 0))
+
 
 class Multinet(mininet.net.Mininet):
 
@@ -37,10 +254,14 @@ class Multinet(mininet.net.Mininet):
     name - class correspondence for the topologies
     """
     TOPOS = {
-        'disconnected': net.topologies.DisconnectedTopo,
-        'linear': net.topologies.LinearTopo,
-        'ring': net.topologies.RingTopo,
-        'mesh': net.topologies.MeshTopo
+        'disconnected': net.topologies.CompactDisconnectedTopo,
+        'linear': net.topologies.CompactLinearTopo,
+        'ring': net.topologies.CompactRingTopo,
+        'mesh': net.topologies.CompactMeshTopo,
+        'fat_tree': net.topologies.FatTreeTopo,
+        'torus': net.topologies.TorusTopo,
+        'random_regular': net.topologies.RandomRegularTopo,
+        'partial_mesh': net.topologies.DegreeBoundedMeshTopo
     }
 
     """
@@ -51,10 +272,18 @@ class Multinet(mininet.net.Mininet):
         'user': mininet.node.UserSwitch
     }
 
+    # The number of switch connect and disconnect events kept in memory
+    MAX_SWITCH_EVENTS = 100000
+    # The number of flow add and delete events kept in memory
+    MAX_FLOW_EVENTS = 1000000
+
     def __init__(self, controller_ip, controller_port, switch_type, topo_type,
                  num_switches, group_size, group_delay_ms, hosts_per_switch,
                  dpid_offset, traffic_generation_duration_ms,
-                 interpacket_delay_ms, auto_detect_hosts=False):
+                 interpacket_delay_ms, auto_detect_hosts=False,
+                 topo_params=None, switch_offset=None, max_switches=None,
+                 flow_monitor=False, controllers=None,
+                 controller_assignment='round_robin'):
         """
         Call the super constructor and initialize any extra properties we want to user
 
@@ -74,7 +303,30 @@ class Multinet(mininet.net.Mininet):
             interpacket_delay_ms (int): The interval of time between 2
                                         Packet_IN transmissions
             auto_detect_hosts (bool): Enable or disable automatic host detection
+            topo_params (dict): Extra options of the topology type, such as
+                                the arity of a fat-tree
+            switch_offset (int): The global index of the first switch of this
+                                 worker, when the workers have topologies of
+                                 different sizes (default dpid_offset *
+                                 num_switches)
+            max_switches (int): The number of switches the topology can grow
+                                to at runtime (default num_switches). Cannot
+                                be combined with switch_offset.
+            flow_monitor (bool): Follow the flow tables of the switches with
+                                 OpenFlow flow monitors instead of dumping
+                                 them on every get_flows
+            controllers (list): The (IP address, OpenFlow port) of every
+                                controller, instead of controller_ip and
+                                controller_port
+            controller_assignment (str): How the switches are assigned to the
+                                         controllers, one of
+                                         CONTROLLER_ASSIGNMENTS
         """
+        if controller_assignment not in CONTROLLER_ASSIGNMENTS:
+            raise ValueError('Unknown controller assignment {0}, expected '
+                             'one of {1}'.format(
+                                 controller_assignment,
+                                 ', '.join(CONTROLLER_ASSIGNMENTS)))
         self.__network_mask_bits = 16
         self.__base_network = '10.0.0.0'
         self.__network_ip_range = long(2 ** (32 - self.__network_mask_bits))
@@ -89,6 +341,18 @@ class Multinet(mininet.net.Mininet):
         else:
             error('Worker Mininet network is out of range.')
             raise ValueError('Worker Mininet network is out of range.')
+        if max_switches is not None and switch_offset is not None:
+            raise ValueError('A topology cannot grow when its switch offset '
+                             'is given, as with partitioning: remove '
+                             'max_topo_size.')
+        if max_switches is None:
+            max_switches = num_switches
+        # The host IPs start after the dpid offset and must not overflow
+        # into the network of the next worker, see hostIP
+        if (dpid_offset + max_switches * hosts_per_switch >
+                self.__network_ip_range - 2):
+            raise ValueError('The hosts of the worker do not fit in its '
+                             'Mininet network.')
 
         self._topo_type = topo_type
         self._num_switches = num_switches
@@ -99,9 +363,49 @@ class Multinet(mininet.net.Mininet):
         self.auto_detect_hosts = auto_detect_hosts
         self._controller_ip = controller_ip
         self._controller_port = controller_port
+        self._controller_addresses = (
+            [(ip, int(port)) for ip, port in controllers] if controllers
+            else [(controller_ip, controller_port)])
+        self._controller_assignment = controller_assignment
+        self._max_switches = max_switches
         self.booted_switches = 0
+        self._started = False
         self._traffic_generation_duration_ms = traffic_generation_duration_ms
         self._interpacket_delay_ms = interpacket_delay_ms
+        self._topo_params = dict(topo_params) if topo_params else {}
+        if switch_offset is not None:
+            self._topo_params['switch_offset'] = switch_offset
+        elif max_switches != num_switches:
+            # Reserve the names of the switches added at runtime
+            self._topo_params['switch_offset'] = dpid_offset * max_switches
+        self._tunnels = []
+        self._boot_start_time = None
+        self._switch_start_times = {}
+        self._switch_connect_times = {}
+        self._connected_switches = set()
+        self._switch_events = collections.deque(maxlen=self.MAX_SWITCH_EVENTS)
+        self._switch_event_seq = itertools.count(1)
+        self._ovsdb_monitor = None
+        self._flow_monitor_enabled = flow_monitor
+        self._flow_monitor = None
+        self._flow_events = collections.deque(maxlen=self.MAX_FLOW_EVENTS)
+        self._flow_event_seq = itertools.count(1)
+        # The flow monitor is an OpenFlow 1.0 Nicira extension
+        self._switch_protocols = ('OpenFlow10,OpenFlow13' if flow_monitor
+                                  else 'OpenFlow13')
+        # (source MAC, destination MAC) -> send time of the benchmark packets
+        # that have not produced a flow yet
+        self._benchmark_pending = {}
+        self._benchmark_sent = 0
+        self._flow_latencies = []
+        # name -> reconnect time of the churned switches that have not
+        # reconnected yet
+        self._churn_reconnects = {}
+        self._churn_latencies = []
+        self._link_event_seq = itertools.count(1)
+        # The packets sent by generate_traffic and the failed sends
+        self.traffic_packets = 0
+        self.traffic_send_errors = 0
 
         super(
             Multinet,
@@ -110,7 +414,8 @@ class Multinet(mininet.net.Mininet):
                 self._topo_type](
                 k=self._num_switches,
                 n=self._hosts_per_switch,
-                dpid=self._dpid_offset),
+                dpid=self._dpid_offset,
+                **self._topo_params),
             switch=self.SWITCH_CLASSES[switch_type],
             host=mininet.node.Host,
             controller=mininet.node.RemoteController,
@@ -128,6 +433,7 @@ class Multinet(mininet.net.Mininet):
             waitConnected=False)
         self.ipBaseNum += self._dpid_offset
 
+    @util.tracing.traced('build_from_topo')
     def buildFromTopo(self, topo=None):
         """
         Build mininet from a topology object
@@ -144,52 +450,77 @@ class Multinet(mininet.net.Mininet):
         info('*** Creating network\n')
 
         if not self.controllers and self.controller:
-            # Add a default controller
-            info('*** Adding controller\n')
-            try:
-                classes = self.controller
-                if not isinstance(classes, list):
-                    classes = [classes]
-                for i, cls in enumerate(classes):
-                    # Allow Controller objects because nobody understands partial()
-                    if isinstance(cls, mininet.node.Controller):
-                        self.addController(controller=cls,
-                                           ip=self._controller_ip,
-                                           port=self._controller_port)
-                    else:
-                        self.addController(name='c{0}'.format(i),
-                                           controller=cls,
-                                           ip=self._controller_ip,
-                                           port=self._controller_port)
-            except:
-                self.addController(name='c{0}'.format(i), controller=mininet.node.DefaultController)
-
-        info('*** Adding hosts:\n')
-        for hostName in topo.hosts():
-            kwargs_host = topo.nodeInfo(hostName)
-            self.addHost(hostName, **kwargs_host)
-            info(hostName + ' ')
-
-        info('\n*** Adding switches:\n')
-        for switchName in topo.switches():
-            # A bit ugly: add batch parameter if appropriate
-            params = topo.nodeInfo(switchName)
-            cls = params.get('cls', self.switch)
-            params['dpid'] = None
-            params['protocols'] = 'OpenFlow13'
-            #if hasattr(cls, 'batchStartup'):
-            #    params.setdefault('batch', True)
-            self.addSwitch(switchName, **params)
-            info(switchName + ' ')
-
-        info('\n*** Adding links:\n')
-        for srcName, dstName, params in topo.links(
-                sort=True, withInfo=True):
-            self.addLink(**params)
-            info('(%s, %s) ' % (srcName, dstName))
+            # Add a controller for every configured controller address
+            info('*** Adding controllers\n')
+            for i, (ip, port) in enumerate(self._controller_addresses):
+                try:
+                    self.addController(name='c{0}'.format(i),
+                                       controller=self.controller,
+                                       ip=ip, port=port)
+                except:
+                    self.addController(name='c{0}'.format(i), controller=mininet.node.DefaultController)
+
+        # The topology generates its nodes and links lazily, so the spans
+        # include the generation
+        with util.tracing.span('add_hosts'):
+            info('*** Adding hosts:\n')
+            if hasattr(topo, 'hostIndices'):
+                for i, j in topo.hostIndices():
+                    hostName = topo.hostName(i, j)
+                    kwargs_host = topo.nodeInfo(hostName)
+                    kwargs_host.setdefault('ip', self.hostIP(i, j))
+                    self.addHost(hostName, **kwargs_host)
+                    info(hostName + ' ')
+            else:
+                # Topo based topologies take the next address of the network
+                for hostName in topo.hosts():
+                    kwargs_host = topo.nodeInfo(hostName)
+                    self.addHost(hostName, **kwargs_host)
+                    info(hostName + ' ')
+
+        with util.tracing.span('add_switches'):
+            info('\n*** Adding switches:\n')
+            for switchName in topo.switches():
+                # A bit ugly: add batch parameter if appropriate
+                params = topo.nodeInfo(switchName)
+                cls = params.get('cls', self.switch)
+                params['dpid'] = None
+                params['protocols'] = self._switch_protocols
+                #if hasattr(cls, 'batchStartup'):
+                #    params.setdefault('batch', True)
+                self.addSwitch(switchName, **params)
+                info(switchName + ' ')
+
+        with util.tracing.span('add_links'):
+            info('\n*** Adding links:\n')
+            # Stream the links instead of sorting them, the port numbers are
+            # already part of the link parameters
+            for srcName, dstName, params in topo.iterLinks(withInfo=True):
+                self.addLink(**params)
+                info('(%s, %s) ' % (srcName, dstName))
 
         info('\n')
 
+    def hostIP(self, i, j):
+        """
+        Returns the address of a host, derived from the index of its switch
+        and its own index, so that the hosts of the switches added and
+        removed at runtime reuse the addresses of the worker network
+
+        Args:
+            i (int): The index of the switch of the host
+            j (int): The index of the host among the hosts of the switch
+
+        Returns:
+            str: The address of the host, with its prefix length
+        """
+        return '{0}/{1}'.format(
+            mininet.util.ipAdd(i * self._hosts_per_switch + j + 1,
+                               prefixLen=self.prefixLen,
+                               ipBaseNum=self.ipBaseNum),
+            self.prefixLen)
+
+    @util.tracing.traced()
     def init_topology(self):
         """
         Init the topology
@@ -201,6 +532,7 @@ class Multinet(mininet.net.Mininet):
                      'Booted up {0} switches'.format(self._num_switches))
 
 
+    @util.tracing.traced()
     def start_topology(self):
         """
         Start controller and switches.
@@ -209,29 +541,42 @@ class Multinet(mininet.net.Mininet):
         info = logging.info
         if not self.built:
             self.build()
-        info('*** Starting controller\n')
-        for controller in self.controllers:
-            info(controller.name + ' ')
-            controller.start()
-        info('\n')
+        with util.tracing.span('start_controllers'):
+            info('*** Starting controller\n')
+            for controller in self.controllers:
+                info(controller.name + ' ')
+                controller.start()
+            info('\n')
         info('*** Starting %s switches\n' % len(self.switches))
 
-        for ind, switch in enumerate(self.switches):
-            if ind % self._group_size == 0:
-                time.sleep(self._group_delay)
-            logging.debug('[mininet] Starting switch with index {0}'.
-                          format(ind + 1))
-            info(switch.name + ' ')
-            switch.start(self.controllers)
-            self.booted_switches += 1
+        self._boot_start_time = time.time()
+        with util.tracing.span('start_monitors'):
+            self.start_ovsdb_monitor()
+            self.start_flow_monitor()
+        with util.tracing.span('start_switches'):
+            for ind, switch in enumerate(self.switches):
+                if ind % self._group_size == 0:
+                    time.sleep(self._group_delay)
+                logging.debug('[mininet] Starting switch with index {0}'.
+                              format(ind + 1))
+                info(switch.name + ' ')
+                # The start time is recorded first, so that the monitor never
+                # sees a switch connect before it is started
+                self._switch_start_times[switch.name] = time.time()
+                switch.start(self.switch_controllers(switch.name))
+                if self._flow_monitor is not None:
+                    self._flow_monitor.add_bridge(switch.name)
+                self.booted_switches += 1
+        self._started = True
 
         started = {}
-        for swclass, switches in itertools.groupby(
-                sorted(self.switches, key=type), type):
-            switches = tuple(switches)
-            if hasattr(swclass, 'batchStartup'):
-                success = swclass.batchStartup(switches)
-                started.update({s: s for s in success})
+        with util.tracing.span('batch_startup'):
+            for swclass, switches in itertools.groupby(
+                    sorted(self.switches, key=type), type):
+                switches = tuple(switches)
+                if hasattr(swclass, 'batchStartup'):
+                    success = swclass.batchStartup(switches)
+                    started.update({s: s for s in success})
         info('\n')
         if self.waitConn:
             self.waitConnected()
@@ -240,6 +585,9 @@ class Multinet(mininet.net.Mininet):
                      'Booted up {0} switches'.format(self._num_switches))
         time.sleep(self._group_delay * 2)
 
+        if self._tunnels:
+            self.add_tunnels()
+
         if self.auto_detect_hosts:
             self.detect_hosts(ping_cnt=50)
 
@@ -267,12 +615,348 @@ class Multinet(mininet.net.Mininet):
         """
         return self.booted_switches
 
+    def get_connected_switches(self):
+        """Returns the number of switches that are connected to the controller
+
+        Returns:
+            (int): number of switches connected to the controller
+        """
+        if self._ovsdb_monitor is not None:
+            return len(self._connected_switches)
+        return sum(1 for switch in self.switches if switch.connected())
+
+    def get_connect_times(self):
+        """Returns the time every started switch was started and the time it
+        was first seen connected to the controller, relative to the start of
+        the topology bootup
+
+        Returns:
+            (list): [name, start time, connect time] of every started switch,
+                    in seconds. The connect time is None if the switch has
+                    not connected yet.
+        """
+        if self._boot_start_time is None:
+            return []
+        connect_times = dict(self._switch_connect_times)
+        times = []
+        for switch in self.switches:
+            start_time = self._switch_start_times.get(switch.name)
+            if start_time is None:
+                continue
+            connect_time = connect_times.get(switch.name)
+            times.append([switch.name, start_time - self._boot_start_time,
+                          None if connect_time is None
+                          else connect_time - self._boot_start_time])
+        return times
+
+    def get_switch_events(self, since=0):
+        """Returns the connect and disconnect events of the switches
+
+        Args:
+            since (int): Return only the events after this sequence number
+
+        Returns:
+            (list): [sequence number, time, name, connected] of every event,
+                    oldest first. The time is relative to the start of the
+                    topology bootup.
+        """
+        return [event for event in list(self._switch_events)
+                if event[0] > since]
+
+    def start_ovsdb_monitor(self):
+        """
+        Start following the controller connection state of the switches
+        through an OVSDB monitor, unless it is already running. Only OVS
+        switches report their connection state through OVSDB.
+        """
+        if (not issubclass(self.switch, mininet.node.OVSSwitch) or
+                self._ovsdb_monitor is not None):
+            return
+        monitor = net.ovsdb_monitor.OvsdbMonitor(
+            on_change=self._on_switch_state_change)
+        try:
+            monitor.start()
+        except OSError as exc:
+            logging.error('[mininet] Could not start the OVSDB monitor: '
+                          '{0}'.format(exc))
+            return
+        self._ovsdb_monitor = monitor
+
+    def stop_ovsdb_monitor(self):
+        """
+        Stop following the controller connection state of the switches
+        """
+        if self._ovsdb_monitor is not None:
+            self._ovsdb_monitor.stop()
+            self._ovsdb_monitor = None
+
+    def _on_switch_state_change(self, name, connected, timestamp):
+        """
+        Record a connect or disconnect of a switch of the topology, reported
+        by the OVSDB monitor. The monitor also reports the bridges of other
+        workers on the same machine, which are ignored.
+
+        Args:
+            name (str): The name of the switch
+            connected (bool): Whether the switch is connected
+            timestamp (float): The time of the change
+        """
+        if name not in self._switch_start_times:
+            return
+        if connected:
+            self._connected_switches.add(name)
+            self._switch_connect_times.setdefault(name, timestamp)
+            self._record_reconnect(name, timestamp)
+        else:
+            self._connected_switches.discard(name)
+        self._switch_events.append([next(self._switch_event_seq),
+                                    timestamp - self._boot_start_time,
+                                    name, connected])
+
+    def _record_reconnect(self, name, timestamp):
+        """
+        Record the reconnect latency of a churned switch that connected
+
+        Args:
+            name (str): The name of the switch
+            timestamp (float): The time the switch connected
+        """
+        reconnect_time = self._churn_reconnects.pop(name, None)
+        if reconnect_time is not None:
+            self._churn_latencies.append(timestamp - reconnect_time)
+
+    def churn_switches(self, fraction, rate, duration, down_time=0,
+                       timeout=10):
+        """Disconnect a random fraction of the started switches from the
+        controllers and reconnect them, at a target rate for a duration. The
+        reconnect latency of a switch is the time from its reconnect until
+        it is seen connected again.
+
+        Args:
+            fraction (float): The fraction of the started switches to churn,
+                              in (0, 1]
+            rate (float): The number of disconnects per second
+            duration (float): The time in seconds disconnects are scheduled
+                              for
+            down_time (float): The time in seconds a switch stays
+                               disconnected
+            timeout (float): The time in seconds to wait for the switches to
+                             reconnect after the last reconnect
+
+        Returns:
+            (dict): The number of 'churned_switches', of 'disconnects' and of
+                    'skipped' disconnect slots, the reconnect 'latencies' in
+                    seconds, the number of reconnects still 'pending' after
+                    the timeout and the number of 'booted' and 'connected'
+                    switches
+
+        Raises:
+            ValueError: If the switches are not OVS switches or the fraction
+                        or the rate is out of range
+        """
+        if not issubclass(self.switch, mininet.node.OVSSwitch):
+            raise ValueError('Churn is supported only on OVS switches.')
+        names = select_churn_switches(
+            [switch.name for switch in self.switches
+             if switch.name in self._switch_start_times], fraction)
+        self._churn_reconnects = {}
+        self._churn_latencies = []
+        logging.info('[mininet] Churning {0} switches at {1} disconnects per '
+                     'second for {2} seconds'.format(len(names), rate,
+                                                     duration))
+
+        def disconnect(name):
+            switch = self.nameToNode[name]
+            switch.vsctl('del-controller', switch.name)
+
+        def reconnect(name):
+            switch = self.nameToNode[name]
+            targets = ['{0}:{1}:{2}'.format(controller.protocol,
+                                            controller.IP(), controller.port)
+                       for controller in self.switch_controllers(name)]
+            self._churn_reconnects[name] = time.time()
+            switch.vsctl('set-controller', switch.name, *targets)
+
+        # Without the monitor the reconnects are only seen after the
+        # schedule, so the switches are not skipped while reconnecting
+        disconnects, skipped = churn_schedule(
+            rolling_selector(names, busy=(self._churn_reconnects
+                                          if self._ovsdb_monitor is not None
+                                          else ())),
+            rate, duration, down_time, disconnect, reconnect)
+        deadline = time.time() + timeout
+        while self._churn_reconnects and time.time() < deadline:
+            if self._ovsdb_monitor is None:
+                for name in list(self._churn_reconnects):
+                    if self.nameToNode[name].connected():
+                        self._record_reconnect(name, time.time())
+            time.sleep(0.05)
+        logging.info('[mininet] Churn finished with {0} disconnects'.
+                     format(disconnects))
+        return {'churned_switches': len(names),
+                'disconnects': disconnects,
+                'skipped': skipped,
+                'latencies': list(self._churn_latencies),
+                'pending': len(self._churn_reconnects),
+                'booted': self.booted_switches,
+                'connected': self.get_connected_switches()}
+
+    def flap_links(self, pattern, rate, duration, down_time, burst_size=4):
+        """Bring the switch-to-switch links down and up at a target rate for
+        a duration, to measure the topology convergence of the controller.
+        Both interfaces of a link are taken down and up together.
+
+        Args:
+            pattern (str): One of LINK_FLAP_PATTERNS, see link_flap_selector
+            rate (float): The number of flap events per second
+            duration (float): The time in seconds events are scheduled for
+            down_time (float): The time in seconds a link stays down
+            burst_size (int): The largest number of links of a 'burst' event
+
+        Returns:
+            (dict): The number of switch-to-switch 'links', of 'link_downs'
+                    and of 'skipped' events, the 'boot_start_time' and the
+                    [sequence number, time, switch, port, switch, port, up]
+                    of every link 'events' entry, with the time relative to
+                    the boot start time
+
+        Raises:
+            ValueError: If the topology has not been started or the pattern
+                        or the rate is out of range
+        """
+        if not self._started:
+            raise ValueError('The topology has not been started.')
+        links = [link for link in self.links
+                 if isinstance(link.intf1.node, mininet.node.Switch) and
+                 isinstance(link.intf2.node, mininet.node.Switch)]
+        select = link_flap_selector(
+            pattern, [(link.intf1.node.name, link.intf2.node.name)
+                      for link in links], burst_size)
+        events = []
+        logging.info('[mininet] Flapping {0} links with the {1} pattern at '
+                     '{2} events per second for {3} seconds'.format(
+                         len(links), pattern, rate, duration))
+
+        def set_link_state(index, up):
+            link = links[index]
+            status = 'up' if up else 'down'
+            link.intf1.ifconfig(status)
+            link.intf2.ifconfig(status)
+            events.append([next(self._link_event_seq),
+                           time.time() - self._boot_start_time,
+                           link.intf1.node.name,
+                           link.intf1.node.ports[link.intf1],
+                           link.intf2.node.name,
+                           link.intf2.node.ports[link.intf2], up])
+
+        link_downs, skipped = churn_schedule(
+            select, rate, duration, down_time,
+            lambda index: set_link_state(index, False),
+            lambda index: set_link_state(index, True))
+        logging.info('[mininet] Link flap finished with {0} link downs'.
+                     format(link_downs))
+        return {'links': len(links), 'link_downs': link_downs,
+                'skipped': skipped, 'boot_start_time': self._boot_start_time,
+                'events': events}
+
+    def switch_controllers(self, name):
+        """Returns the controllers a switch connects to, according to the
+        controller assignment
+
+        Args:
+            name (str): The name of the switch
+
+        Returns:
+            (list): The controller nodes
+        """
+        return [self.controllers[index] for index in assign_controllers(
+            len(self.controllers), self._controller_assignment, int(name),
+            self._dpid_offset)]
+
+    def get_controller_distribution(self):
+        """Returns the distribution of the switches over the controllers
+
+        Returns:
+            (list): The 'controller' address, the number of 'assigned'
+                    switches, and the number of switches 'connected' to it
+                    and whose 'master' it is, of every controller. The last
+                    two are None without the OVSDB monitor.
+        """
+        assigned = [0] * len(self._controller_addresses)
+        for switch in self.switches:
+            for index in assign_controllers(
+                    len(assigned), self._controller_assignment,
+                    int(switch.name), self._dpid_offset):
+                assigned[index] += 1
+        states = None
+        if self._ovsdb_monitor is not None:
+            states = self._ovsdb_monitor.controller_states(
+                set(switch.name for switch in self.switches))
+        distribution = []
+        for index, (ip, port) in enumerate(self._controller_addresses):
+            state = (states.get('tcp:{0}:{1}'.format(ip, port),
+                                {'connected': 0, 'master': 0})
+                     if states is not None else
+                     {'connected': None, 'master': None})
+            distribution.append({'controller': '{0}:{1}'.format(ip, port),
+                                 'assigned': assigned[index],
+                                 'connected': state['connected'],
+                                 'master': state['master']})
+        return distribution
+
+    def get_edge_switches(self):
+        """Returns the switches that connect the topology to the topologies
+        of the neighbouring workers
+
+        Returns:
+            (list): the names of the first and the last switch of the topology
+        """
+        if not self.switches:
+            return []
+        return [self.switches[0].name, self.switches[-1].name]
+
+    def set_tunnels(self, tunnels):
+        """Set the tunnels to the topologies of the neighbouring workers.
+        The tunnels are added when the switches are started, or immediately
+        if the topology has already been started.
+
+        Args:
+            tunnels (list): dicts with the 'switch' where the tunnel is added,
+                            the 'remote_ip' of the tunnel, its 'key' and its
+                            'tunnel_type' ('vxlan' or 'gre')
+        """
+        self._tunnels = tunnels
+        if self.booted_switches > 0:
+            self.add_tunnels()
+
+    @util.tracing.traced()
+    def add_tunnels(self):
+        """
+        Add a tunnel port on the edge switches for every configured tunnel
+        """
+        for tunnel in self._tunnels:
+            switch = self.nameToNode[tunnel['switch']]
+            if not isinstance(switch, mininet.node.OVSSwitch):
+                raise ValueError('Tunnels are supported only on OVS switches.')
+            port = '{0}{1}'.format(tunnel['tunnel_type'][:3], tunnel['key'])
+            logging.info('[mininet] Adding {0} tunnel {1} from switch {2} to '
+                         '{3}'.format(tunnel['tunnel_type'], port, switch.name,
+                                      tunnel['remote_ip']))
+            switch.vsctl('add-port', switch.name, port,
+                         '--', 'set', 'interface', port,
+                         'type={0}'.format(tunnel['tunnel_type']),
+                         'options:remote_ip={0}'.format(tunnel['remote_ip']),
+                         'options:key={0}'.format(tunnel['key']))
+
+    @util.tracing.traced()
     def stop_topology(self):
         """
         Stops the topology
         """
 
         logging.info('[mininet] Halting topology. Terminating switches.')
+        self.stop_ovsdb_monitor()
+        self.stop_flow_monitor()
         for h in self.hosts:
             h.sendInt()
         mininet.clean.cleanup()
@@ -280,11 +964,127 @@ class Multinet(mininet.net.Mininet):
         self.hosts = []
         self.links = []
         self.controllers = []
+        self._tunnels = []
         self.built = False
+        self._started = False
         self.booted_switches = 0
+        self._boot_start_time = None
+        self._switch_start_times = {}
+        self._switch_connect_times = {}
+        self._connected_switches = set()
+        self._switch_events.clear()
+        self._flow_events.clear()
+        self._churn_reconnects = {}
         logging.info('[mininet] Topology halted successfully')
 
 
+    def add_switches(self, count, rate):
+        """
+        Attach switches, with their hosts, to the running topology. Every new
+        switch is linked to the last switch of the topology, unless the
+        topology is disconnected. If the topology has been started, the new
+        switches are connected to the controller.
+
+        Args:
+            count (int): The number of switches to add
+            rate (float): The number of switches added per second (0 for
+                          no delay)
+        """
+        if len(self.switches) + count > self._max_switches:
+            raise ValueError('The topology cannot grow beyond {0} switches.'.
+                             format(self._max_switches))
+        delay = 1.0 / rate if rate > 0 else 0
+        logging.info('[mininet] Adding {0} switches.'.format(count))
+        for _ in xrange(count):
+            index = len(self.switches)
+            switch = self.addSwitch(self.topo.switchName(index), dpid=None,
+                                    protocols=self._switch_protocols)
+            for host_index in xrange(self._hosts_per_switch):
+                host = self.addHost(self.topo.hostName(index, host_index),
+                                    ip=self.hostIP(index, host_index))
+                self.addLink(host, switch, port1=0, port2=host_index + 1)
+                host.configDefault()
+            if index > 0 and self._topo_type != 'disconnected':
+                last_switch = self.switches[index - 1]
+                link = self.addLink(switch, last_switch)
+                if self._started:
+                    last_switch.attach(link.intf2)
+            if self._started:
+                self._switch_start_times[switch.name] = time.time()
+                switch.start(self.switch_controllers(switch.name))
+                if self._flow_monitor is not None:
+                    self._flow_monitor.add_bridge(switch.name)
+                self.booted_switches += 1
+            time.sleep(delay)
+        logging.info('[mininet] Topology has {0} switches.'.
+                     format(len(self.switches)))
+
+    def remove_switches(self, count, rate):
+        """
+        Detach the last switches, with their hosts and links, from the
+        running topology.
+
+        Args:
+            count (int): The number of switches to remove
+            rate (float): The number of switches removed per second (0 for
+                          no delay)
+        """
+        count = min(count, len(self.switches))
+        delay = 1.0 / rate if rate > 0 else 0
+        logging.info('[mininet] Removing {0} switches.'.format(count))
+        for _ in xrange(count):
+            switch = self.switches.pop()
+            # The hosts of the last switch are the last hosts, if it has any
+            hosts = [host for host in
+                     self.hosts[len(self.hosts) - self._hosts_per_switch:]
+                     if host.connectionsTo(switch)]
+            del self.hosts[len(self.hosts) - len(hosts):]
+
+            removed_links = set()
+            for intf in switch.intfList():
+                if intf.link is None:
+                    continue
+                removed_links.add(intf.link)
+                peer = (intf.link.intf2 if intf.link.intf1 is intf
+                        else intf.link.intf1)
+                if peer.node is not switch and peer.node in self.switches:
+                    if self._started:
+                        peer.node.detach(peer)
+                    self._forget_intf(peer.node, peer)
+            self.links = [link for link in self.links
+                          if link not in removed_links]
+
+            if self._flow_monitor is not None:
+                self._flow_monitor.remove_bridge(switch.name)
+            switch.stop(deleteIntfs=True)
+            self._switch_start_times.pop(switch.name, None)
+            self._switch_connect_times.pop(switch.name, None)
+            self._connected_switches.discard(switch.name)
+            if self._started:
+                self.booted_switches -= 1
+            for host in hosts:
+                host.terminate()
+                del self.nameToNode[host.name]
+            del self.nameToNode[switch.name]
+            time.sleep(delay)
+        logging.info('[mininet] Topology has {0} switches.'.
+                     format(len(self.switches)))
+
+    @staticmethod
+    def _forget_intf(node, intf):
+        """
+        Remove an interface from the interfaces known to a node, after the
+        peer interface of its veth pair is deleted.
+
+        Args:
+            node (mininet.node.Node): The node of the interface
+            intf (mininet.link.Intf): The interface to remove
+        """
+        port = node.ports.pop(intf, None)
+        if port is not None:
+            node.intfs.pop(port, None)
+            node.nameToIntf.pop(intf.name, None)
+
     def ping_all(self):
         """
         All-to-all host pinging used for testing.
@@ -292,10 +1092,13 @@ class Multinet(mininet.net.Mininet):
         self.pingAll(timeout=None)
 
 
+    @util.tracing.traced()
     def get_flows(self):
         """
         Getting flows from switches
         """
+        if self._flow_monitor is not None:
+            return self._flow_monitor.flow_count()
         logging.info('[get_flows] Getting flows from switches.')
         flow_number_total = 0
         t_start = time.time()
@@ -310,6 +1113,171 @@ class Multinet(mininet.net.Mininet):
         return flow_number_total
 
 
+    def get_flow_counts(self):
+        """Returns the number of flows of every switch, as followed by the
+        flow monitor
+
+        Returns:
+            (dict): switch name - number of flows correspondence, empty if
+                    the flow monitor is not running
+        """
+        if self._flow_monitor is None:
+            return {}
+        return self._flow_monitor.flow_counts()
+
+    def dump_flows(self, flow_filter,
+                   concurrency=net.flow_dump.DEFAULT_CONCURRENCY,
+                   chunk_size=net.flow_dump.DEFAULT_CHUNK_SIZE):
+        """Returns the flows of the switches that pass a filter, switch by
+        switch and in chunks. Up to concurrency 'ovs-ofctl dump-flows'
+        processes run at once, and the output of every switch is read and
+        decoded as it is consumed, so only the pipes of the running
+        processes hold flows that were not yet consumed. The filters that
+        ovs-ofctl supports are applied by ovs-ofctl.
+
+        Args:
+            flow_filter (net.flow_dump.FlowFilter): The filters of the dump
+            concurrency (int): The number of switches dumped at once
+            chunk_size (int): The largest number of flows of a chunk
+
+        Returns:
+            (generator): The switch name and a chunk of its flows, see
+                         net.flow_dump.flow_entry. A switch without flows
+                         has a single empty chunk.
+        """
+        names = iter([switch.name for switch in self.switches
+                      if flow_filter.switch_selected(switch.name)])
+        command = ['ovs-ofctl', '-O', 'OpenFlow13', 'dump-flows']
+        spec = flow_filter.ofctl_spec()
+        running = collections.deque()
+
+        def start_next():
+            name = next(names, None)
+            if name is not None:
+                running.append((name, subprocess.Popen(
+                    command + [name] + ([spec] if spec else []),
+                    stdout=subprocess.PIPE, universal_newlines=True)))
+
+        for _ in range(max(concurrency, 1)):
+            start_next()
+        try:
+            while running:
+                name, process = running[0]
+                flows = (net.flow_dump.parse_dump_flows_line(line)
+                         for line in process.stdout)
+                for chunk in net.flow_dump.chunked(
+                        (flow for flow in flows
+                         if flow is not None and flow_filter(flow)),
+                        chunk_size):
+                    yield name, chunk
+                running.popleft()
+                process.stdout.close()
+                if process.wait() != 0:
+                    logging.warning('[dump_flows] Cannot dump the flows of '
+                                    'switch {0}'.format(name))
+                start_next()
+        finally:
+            for _, process in running:
+                if process.poll() is None:
+                    process.terminate()
+                process.stdout.close()
+                process.wait()
+
+    def get_flow_events(self, since=0):
+        """Returns the flow add and delete events of the switches
+
+        Args:
+            since (int): Return only the events after this sequence number
+
+        Returns:
+            (list): [sequence number, time, switch name, 'added' or
+                    'deleted', flow] of every event, oldest first. The time
+                    is relative to the start of the topology bootup.
+        """
+        return [event for event in list(self._flow_events)
+                if event[0] > since]
+
+    def start_flow_monitor(self):
+        """
+        Start following the flow tables of the switches, if the flow monitor
+        is enabled. The switches are added to the monitor as they start.
+        Only OVS switches support flow monitors.
+        """
+        if (not self._flow_monitor_enabled or self._flow_monitor is not None
+                or not issubclass(self.switch, mininet.node.OVSSwitch)):
+            return
+        self._flow_monitor = net.flow_monitor.FlowMonitor(
+            on_event=self._on_flow_event)
+        self._flow_monitor.start()
+
+    def stop_flow_monitor(self):
+        """
+        Stop following the flow tables of the switches
+        """
+        if self._flow_monitor is not None:
+            self._flow_monitor.stop()
+            self._flow_monitor = None
+
+    def _on_flow_event(self, name, kind, flow, timestamp):
+        """
+        Record a flow added to or deleted from a switch, reported by the flow
+        monitor
+
+        Args:
+            name (str): The name of the switch
+            kind (str): 'added' or 'deleted'
+            flow (str): The flow, as printed by ovs-ofctl
+            timestamp (float): The time of the event
+        """
+        self._flow_events.append([next(self._flow_event_seq),
+                                  timestamp - self._boot_start_time,
+                                  name, kind, flow])
+        if kind == 'added' and self._benchmark_pending:
+            match = dict(FLOW_MAC_FIELD.findall(flow))
+            send_time = self._benchmark_pending.pop(
+                (match.get('dl_src'), match.get('dl_dst')), None)
+            if send_time is not None:
+                self._flow_latencies.append(
+                    [send_time - self._boot_start_time,
+                     timestamp - self._boot_start_time])
+
+    def get_flow_latencies(self):
+        """Returns the results of the last PacketIN to FlowMod benchmark
+
+        Returns:
+            (dict): The number of 'sent' packets and the [send time, install
+                    time] of every 'flows' entry installed for a sent packet,
+                    relative to the start of the topology bootup
+        """
+        return {'sent': self._benchmark_sent,
+                'flows': list(self._flow_latencies)}
+
+    def _send_arp_packet(self, host, src_mac, dst_mac, benchmark):
+        """
+        Send an ARP packet from a host, recording its send time when
+        benchmarking
+
+        Args:
+            host (mininet.node.Host): The host that sends the packet
+            src_mac (str): The source MAC address of the packet
+            dst_mac (str): The destination MAC address of the packet
+            benchmark (bool): Record the send time of the packet
+        """
+        send_time = time.time()
+        try:
+            host.sendCmd('sudo mz -a {0} -b {1} -t arp'.format(src_mac,
+                                                               dst_mac))
+        except (AssertionError, OSError, IOError) as exc:
+            # sendCmd asserts that the host is not busy with a command
+            self.traffic_send_errors += 1
+            logging.debug('[mininet] Host {0} could not send a packet: {1}'.
+                          format(host.name, exc))
+            return
+        self.traffic_packets += 1
+        if benchmark:
+            self._benchmark_pending[(src_mac, dst_mac)] = send_time
+            self._benchmark_sent += 1
+
     def generate_mac_address_pairs(self, current_mac):
         """
         Generated tuple of source/destination mac addresses
@@ -332,9 +1300,15 @@ class Multinet(mininet.net.Mininet):
         dest_mac = ':'.join(''.join(pair) for pair in zip(*[iter(hex(int(generated_mac, 16) + 2))]*2))[6:]
         return source_mac, dest_mac
 
-    def generate_traffic(self):
+    @util.tracing.traced()
+    def generate_traffic(self, benchmark=False):
         """
         Traffic generation from switches to controller
+
+        Args:
+            benchmark (bool): Record the send time of every packet and match
+                              it with the flow the controller installs for
+                              it. Requires the flow monitor.
         """
 
         logging.info('[mininet] Generating traffic from switches.')
@@ -342,6 +1316,13 @@ class Multinet(mininet.net.Mininet):
         if not self._hosts_per_switch>1:
             raise AssertionError(
                 '_hosts_per_switch must be at least 2 or greater.')
+        if benchmark:
+            if self._flow_monitor is None:
+                raise ValueError('The PacketIN to FlowMod benchmark requires '
+                                 'the flow monitor.')
+            self._benchmark_pending = {}
+            self._benchmark_sent = 0
+            self._flow_latencies = []
         traffic_transmission_delay = self._interpacket_delay_ms / 1000
         traffic_transmission_interval = \
             self._traffic_generation_duration_ms / 1000
@@ -368,14 +1349,14 @@ class Multinet(mininet.net.Mininet):
             # The above sequence has as a result to trigger ODL controller to
             # respond with 2 FlowMod messages in order to establish a datapath
             # between the 2 hosts
-            self.hosts[host_index].sendCmd(
-                'sudo mz -a {0} -b {1} -t arp'.format(src_mac, dst_mac))
+            self._send_arp_packet(self.hosts[host_index], src_mac, dst_mac,
+                                  benchmark)
             # We break transmission delay and we place a delay between the
             # transmission of the 2 Gratuitous ARP messages in order to avoid
             # bursts of messages
             time.sleep(traffic_transmission_delay/2)
-            self.hosts[host_index + 1].sendCmd(
-                'sudo mz -a {0} -b {1} -t arp'.format(dst_mac, src_mac))
+            self._send_arp_packet(self.hosts[host_index + 1], dst_mac,
+                                  src_mac, benchmark)
             time.sleep(traffic_transmission_delay/2)
             host_index += self._hosts_per_switch
 
@@ -390,8 +1371,8 @@ class Multinet(mininet.net.Mininet):
                 # The minimum controller hard_timeout is 1 second.
                 # Retransmission using the init_mac must start after the
                 # minimum hard_timeout interval
-                if (time.time - transmission_start) < 1:
-                    time.sleep(1 - (time.time - transmission_start))
+                if (time.time() - transmission_start) < 1:
+                    time.sleep(1 - (time.time() - transmission_start))
         # Cleanup hosts console outputs and write flags after finishing
         # transmission
         for host in self.hosts:
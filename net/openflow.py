@@ -0,0 +1,629 @@
+"""
+Encoding and decoding of the OpenFlow 1.3 messages used by the embedded sink
+controller and the emulated switches
+"""
+
+import struct
+
+OFP_VERSION = 0x04
+OFP_HEADER = struct.Struct('!BBHI')
+
+"""
+message types
+"""
+OFPT_HELLO = 0
+OFPT_ERROR = 1
+OFPT_ECHO_REQUEST = 2
+OFPT_ECHO_REPLY = 3
+OFPT_EXPERIMENTER = 4
+OFPT_FEATURES_REQUEST = 5
+OFPT_FEATURES_REPLY = 6
+OFPT_GET_CONFIG_REQUEST = 7
+OFPT_GET_CONFIG_REPLY = 8
+OFPT_SET_CONFIG = 9
+OFPT_PACKET_IN = 10
+OFPT_FLOW_REMOVED = 11
+OFPT_PORT_STATUS = 12
+OFPT_PACKET_OUT = 13
+OFPT_FLOW_MOD = 14
+OFPT_MULTIPART_REQUEST = 18
+OFPT_MULTIPART_REPLY = 19
+OFPT_BARRIER_REQUEST = 20
+OFPT_BARRIER_REPLY = 21
+OFPT_ROLE_REQUEST = 24
+OFPT_ROLE_REPLY = 25
+
+"""
+multipart types
+"""
+OFPMP_DESC = 0
+OFPMP_FLOW = 1
+OFPMP_AGGREGATE = 2
+OFPMP_TABLE = 3
+OFPMP_PORT_DESC = 13
+
+"""
+flow mod commands
+"""
+OFPFC_ADD = 0
+OFPFC_MODIFY = 1
+OFPFC_MODIFY_STRICT = 2
+OFPFC_DELETE = 3
+OFPFC_DELETE_STRICT = 4
+
+"""
+controller roles
+"""
+OFPCR_ROLE_NOCHANGE = 0
+OFPCR_ROLE_EQUAL = 1
+OFPCR_ROLE_MASTER = 2
+OFPCR_ROLE_SLAVE = 3
+
+"""
+reserved ports, groups and buffers
+"""
+OFPP_IN_PORT = 0xfffffff8
+OFPP_NORMAL = 0xfffffffa
+OFPP_FLOOD = 0xfffffffb
+OFPP_CONTROLLER = 0xfffffffd
+OFPP_LOCAL = 0xfffffffe
+OFPP_ANY = 0xffffffff
+OFPG_ANY = 0xffffffff
+OFP_NO_BUFFER = 0xffffffff
+OFPCML_NO_BUFFER = 0xffff
+
+OFPR_NO_MATCH = 0
+OFPR_ACTION = 1
+
+OFPPR_ADD = 0
+OFPPR_DELETE = 1
+OFPPR_MODIFY = 2
+OFPPS_LINK_DOWN = 1
+OFPPC_PORT_DOWN = 1
+
+OFPMPF_REPLY_MORE = 1
+OFPFF_SEND_FLOW_REM = 1
+
+OFPET_BAD_REQUEST = 1
+OFPBRC_BAD_TYPE = 1
+OFPBRC_BAD_MULTIPART = 2
+OFPBRC_IS_SLAVE = 10
+
+"""
+match fields of the OpenFlow basic OXM class, with their lengths
+"""
+OFPMT_OXM = 1
+OFPXMC_OPENFLOW_BASIC = 0x8000
+OXM_IN_PORT = 0
+OXM_ETH_DST = 3
+OXM_ETH_SRC = 4
+OXM_ETH_TYPE = 5
+OXM_FIELD_LENGTHS = {OXM_IN_PORT: 4, OXM_ETH_DST: 6, OXM_ETH_SRC: 6,
+                     OXM_ETH_TYPE: 2}
+OXM_FIELD_NAMES = {OXM_IN_PORT: 'in_port', OXM_ETH_DST: 'eth_dst',
+                   OXM_ETH_SRC: 'eth_src', OXM_ETH_TYPE: 'eth_type'}
+OXM_FIELDS = dict((name, field) for field, name in OXM_FIELD_NAMES.items())
+
+OFPIT_APPLY_ACTIONS = 4
+OFPAT_OUTPUT = 0
+
+FEATURES_REPLY = struct.Struct('!QIBB2xII')
+PACKET_IN = struct.Struct('!IHBBQ')
+FLOW_MOD = struct.Struct('!QQBBHHHIIIH2x')
+MULTIPART = struct.Struct('!HH4x')
+ROLE = struct.Struct('!I4xQ')
+PORT = struct.Struct('!I4x6s2x16sIIIIIIII')
+ACTION_OUTPUT = struct.Struct('!HHIH6x')
+INSTRUCTION_ACTIONS = struct.Struct('!HH4x')
+AGGREGATE_REPLY = struct.Struct('!QQI4x')
+FLOW_STATS = struct.Struct('!HBxIIHHHH4xQQQ')
+# The largest body of a multipart reply, which must fit in the 16 bit length
+# of the message
+MAX_MULTIPART_BODY = 60000
+
+
+def message(msg_type, xid, body=b''):
+    """Returns an OpenFlow 1.3 message
+
+    Args:
+        msg_type (int): The message type
+        xid (int): The transaction id
+        body (bytes): The body of the message
+
+    Returns:
+        (bytes): The message
+    """
+    return OFP_HEADER.pack(OFP_VERSION, msg_type, OFP_HEADER.size + len(body),
+                           xid) + body
+
+
+def split_messages(buf):
+    """Splits a stream buffer into complete OpenFlow messages
+
+    Args:
+        buf (bytes): The received bytes
+
+    Returns:
+        (tuple): The list of (version, type, xid, message) tuples of the
+                 complete messages and the bytes of the incomplete message
+                 that follows them
+    """
+    messages = []
+    offset = 0
+    while len(buf) - offset >= OFP_HEADER.size:
+        version, msg_type, length, xid = OFP_HEADER.unpack_from(buf, offset)
+        if length < OFP_HEADER.size:
+            raise ValueError('Invalid OpenFlow message length {0}'.
+                             format(length))
+        if len(buf) - offset < length:
+            break
+        messages.append((version, msg_type, xid, buf[offset:offset + length]))
+        offset += length
+    return messages, buf[offset:]
+
+
+def mac_to_bytes(mac):
+    """Returns the bytes of a MAC address, e.g. '00:00:00:00:00:01'"""
+    return struct.pack('!6B', *[int(octet, 16) for octet in mac.split(':')])
+
+
+def mac_from_bytes(data):
+    """Returns the text of the MAC address of 6 bytes"""
+    return ':'.join('{0:02x}'.format(octet)
+                    for octet in struct.unpack('!6B', data))
+
+
+def pack_match(fields):
+    """Returns an OXM match, padded to a multiple of 8 bytes
+
+    Args:
+        fields (dict): field name - value correspondence, with 'in_port' and
+                       'eth_type' as ints and 'eth_src' and 'eth_dst' as MAC
+                       address texts
+
+    Returns:
+        (bytes): The match
+    """
+    oxms = b''
+    for name in ('in_port', 'eth_type', 'eth_src', 'eth_dst'):
+        if name not in fields:
+            continue
+        field = OXM_FIELDS[name]
+        length = OXM_FIELD_LENGTHS[field]
+        if length == 6:
+            value = mac_to_bytes(fields[name])
+        elif length == 4:
+            value = struct.pack('!I', fields[name])
+        else:
+            value = struct.pack('!H', fields[name])
+        oxms += struct.pack('!HBB', OFPXMC_OPENFLOW_BASIC, field << 1,
+                            length) + value
+    length = 4 + len(oxms)
+    return (struct.pack('!HH', OFPMT_OXM, length) + oxms +
+            b'\0' * ((length + 7) // 8 * 8 - length))
+
+
+def parse_match(data, offset):
+    """Decodes an OXM match
+
+    Args:
+        data (bytes): The message
+        offset (int): The offset of the match in the message
+
+    Returns:
+        (tuple): The dict of the known fields and the offset after the
+                 padding of the match
+    """
+    _, length = struct.unpack_from('!HH', data, offset)
+    fields = {}
+    position = offset + 4
+    while position < offset + length:
+        oxm_class, field_mask, oxm_length = struct.unpack_from('!HBB', data,
+                                                               position)
+        field = field_mask >> 1
+        value = data[position + 4:position + 4 + oxm_length]
+        if (oxm_class == OFPXMC_OPENFLOW_BASIC and
+                not field_mask & 1 and field in OXM_FIELD_NAMES):
+            if OXM_FIELD_LENGTHS[field] == 6:
+                fields[OXM_FIELD_NAMES[field]] = mac_from_bytes(value)
+            elif OXM_FIELD_LENGTHS[field] == 4:
+                fields[OXM_FIELD_NAMES[field]] = struct.unpack('!I', value)[0]
+            else:
+                fields[OXM_FIELD_NAMES[field]] = struct.unpack('!H', value)[0]
+        position += 4 + oxm_length
+    return fields, offset + (length + 7) // 8 * 8
+
+
+def hello(xid):
+    """Returns a HELLO message"""
+    return message(OFPT_HELLO, xid)
+
+
+def echo_request(xid, data=b''):
+    """Returns an ECHO_REQUEST message"""
+    return message(OFPT_ECHO_REQUEST, xid, data)
+
+
+def echo_reply(xid, data=b''):
+    """Returns an ECHO_REPLY message, echoing the data of the request"""
+    return message(OFPT_ECHO_REPLY, xid, data)
+
+
+def features_request(xid):
+    """Returns a FEATURES_REQUEST message"""
+    return message(OFPT_FEATURES_REQUEST, xid)
+
+
+def features_reply(xid, dpid, n_tables=1, n_buffers=0, capabilities=0):
+    """Returns a FEATURES_REPLY message
+
+    Args:
+        xid (int): The transaction id of the request
+        dpid (int): The datapath id of the switch
+        n_tables (int): The number of flow tables
+        n_buffers (int): The number of packet buffers
+        capabilities (int): The capabilities bitmap
+
+    Returns:
+        (bytes): The message
+    """
+    return message(OFPT_FEATURES_REPLY, xid,
+                   FEATURES_REPLY.pack(dpid, n_buffers, n_tables, 0,
+                                       capabilities, 0))
+
+
+def parse_features_reply(data):
+    """Returns the datapath id of a FEATURES_REPLY message"""
+    return FEATURES_REPLY.unpack_from(data, OFP_HEADER.size)[0]
+
+
+def set_config(xid, miss_send_len=OFPCML_NO_BUFFER):
+    """Returns a SET_CONFIG message"""
+    return message(OFPT_SET_CONFIG, xid, struct.pack('!HH', 0, miss_send_len))
+
+
+def get_config_reply(xid, miss_send_len=OFPCML_NO_BUFFER):
+    """Returns a GET_CONFIG_REPLY message"""
+    return message(OFPT_GET_CONFIG_REPLY, xid,
+                   struct.pack('!HH', 0, miss_send_len))
+
+
+def parse_set_config(data):
+    """Returns the miss_send_len of a SET_CONFIG message"""
+    return struct.unpack_from('!HH', data, OFP_HEADER.size)[1]
+
+
+def barrier_reply(xid):
+    """Returns a BARRIER_REPLY message"""
+    return message(OFPT_BARRIER_REPLY, xid)
+
+
+def error(xid, err_type, code, data=b''):
+    """Returns an ERROR message, with the start of the offending message"""
+    return message(OFPT_ERROR, xid,
+                   struct.pack('!HH', err_type, code) + data[:64])
+
+
+def role_request(xid, role, generation_id=0):
+    """Returns a ROLE_REQUEST message
+
+    Args:
+        xid (int): The transaction id
+        role (int): One of the OFPCR_ROLE_* roles
+        generation_id (int): The generation id of the master election
+
+    Returns:
+        (bytes): The message
+    """
+    return message(OFPT_ROLE_REQUEST, xid, ROLE.pack(role, generation_id))
+
+
+def role_reply(xid, role, generation_id=0):
+    """Returns a ROLE_REPLY message"""
+    return message(OFPT_ROLE_REPLY, xid, ROLE.pack(role, generation_id))
+
+
+def parse_role(data):
+    """Returns the role and the generation id of a ROLE_REQUEST or
+    ROLE_REPLY message"""
+    return ROLE.unpack_from(data, OFP_HEADER.size)
+
+
+def output_instructions(ports, max_len=OFPCML_NO_BUFFER):
+    """Returns an APPLY_ACTIONS instruction that outputs to ports
+
+    Args:
+        ports (list): The output ports
+        max_len (int): The bytes of a packet sent to the controller port
+
+    Returns:
+        (bytes): The instruction, empty to drop
+    """
+    if not ports:
+        return b''
+    actions = b''.join(ACTION_OUTPUT.pack(OFPAT_OUTPUT, ACTION_OUTPUT.size,
+                                          port, max_len) for port in ports)
+    return INSTRUCTION_ACTIONS.pack(OFPIT_APPLY_ACTIONS,
+                                    INSTRUCTION_ACTIONS.size + len(actions)) + \
+        actions
+
+
+def flow_mod(xid, match, ports, priority=0, idle_timeout=0, hard_timeout=0,
+             command=OFPFC_ADD, cookie=0, table_id=0,
+             buffer_id=OFP_NO_BUFFER):
+    """Returns a FLOW_MOD message
+
+    Args:
+        xid (int): The transaction id
+        match (dict): The match fields, see pack_match
+        ports (list): The output ports of the flow, empty to drop
+        priority (int): The priority of the flow
+        idle_timeout (int): The idle timeout of the flow in seconds
+        hard_timeout (int): The hard timeout of the flow in seconds
+        command (int): One of the OFPFC_* commands
+        cookie (int): The cookie of the flow
+        table_id (int): The flow table
+        buffer_id (int): The buffered packet to apply the flow to
+
+    Returns:
+        (bytes): The message
+    """
+    return message(OFPT_FLOW_MOD, xid,
+                   FLOW_MOD.pack(cookie, 0, table_id, command, idle_timeout,
+                                 hard_timeout, priority, buffer_id, OFPP_ANY,
+                                 OFPG_ANY, 0) +
+                   pack_match(match) + output_instructions(ports))
+
+
+def parse_flow_mod(data):
+    """Decodes a FLOW_MOD message
+
+    Args:
+        data (bytes): The message
+
+    Returns:
+        (dict): The 'command', 'priority', 'idle_timeout', 'hard_timeout',
+                'cookie', 'table_id', 'flags', 'match' and the
+                'instructions' bytes
+    """
+    (cookie, _, table_id, command, idle_timeout, hard_timeout, priority,
+     _, _, _, flags) = FLOW_MOD.unpack_from(data, OFP_HEADER.size)
+    match, offset = parse_match(data, OFP_HEADER.size + FLOW_MOD.size)
+    return {'command': command, 'priority': priority,
+            'idle_timeout': idle_timeout, 'hard_timeout': hard_timeout,
+            'cookie': cookie, 'table_id': table_id, 'flags': flags,
+            'match': match, 'instructions': data[offset:]}
+
+
+def output_ports(instructions):
+    """Returns the output ports of the APPLY_ACTIONS instructions of a flow
+
+    Args:
+        instructions (bytes): The instructions of the flow
+
+    Returns:
+        (list): The output ports, in action order
+    """
+    ports = []
+    offset = 0
+    while offset + INSTRUCTION_ACTIONS.size <= len(instructions):
+        inst_type, inst_length = INSTRUCTION_ACTIONS.unpack_from(instructions,
+                                                                 offset)
+        if inst_length < INSTRUCTION_ACTIONS.size:
+            break
+        if inst_type == OFPIT_APPLY_ACTIONS:
+            position = offset + INSTRUCTION_ACTIONS.size
+            while position + 4 <= offset + inst_length:
+                action_type, action_length = struct.unpack_from(
+                    '!HH', instructions, position)
+                if action_length < 4:
+                    break
+                if action_type == OFPAT_OUTPUT:
+                    ports.append(ACTION_OUTPUT.unpack_from(instructions,
+                                                           position)[2])
+                position += action_length
+        offset += inst_length
+    return ports
+
+
+def packet_in(xid, in_port, data, reason=OFPR_NO_MATCH, table_id=0,
+              cookie=0, buffer_id=OFP_NO_BUFFER):
+    """Returns a PACKET_IN message
+
+    Args:
+        xid (int): The transaction id
+        in_port (int): The port the packet was received on
+        data (bytes): The packet
+        reason (int): The reason the packet is sent to the controller
+        table_id (int): The flow table that was looked up
+        cookie (int): The cookie of the flow that sent the packet
+        buffer_id (int): The buffer of the packet
+
+    Returns:
+        (bytes): The message
+    """
+    return message(OFPT_PACKET_IN, xid,
+                   PACKET_IN.pack(buffer_id, len(data), reason, table_id,
+                                  cookie) +
+                   pack_match({'in_port': in_port}) + b'\0\0' + data)
+
+
+def parse_packet_in(data):
+    """Decodes a PACKET_IN message
+
+    Args:
+        data (bytes): The message
+
+    Returns:
+        (dict): The 'buffer_id', 'reason', 'in_port', 'eth_src' and 'eth_dst'
+                of the packet and the packet 'data'
+    """
+    buffer_id, _, reason, _, _ = PACKET_IN.unpack_from(data, OFP_HEADER.size)
+    match, offset = parse_match(data, OFP_HEADER.size + PACKET_IN.size)
+    packet = data[offset + 2:]
+    result = {'buffer_id': buffer_id, 'reason': reason,
+              'in_port': match.get('in_port'), 'data': packet,
+              'eth_src': None, 'eth_dst': None}
+    if len(packet) >= 12:
+        result['eth_dst'] = mac_from_bytes(packet[0:6])
+        result['eth_src'] = mac_from_bytes(packet[6:12])
+    return result
+
+
+def multipart_type(data):
+    """Returns the multipart type of a MULTIPART_REQUEST or MULTIPART_REPLY"""
+    return MULTIPART.unpack_from(data, OFP_HEADER.size)[0]
+
+
+def multipart_reply(xid, mp_type, body=b''):
+    """Returns a single MULTIPART_REPLY message"""
+    return message(OFPT_MULTIPART_REPLY, xid, MULTIPART.pack(mp_type, 0) + body)
+
+
+def multipart_replies(xid, mp_type, entries):
+    """Returns the MULTIPART_REPLY messages of a list of entries, split so
+    that every message fits in the OpenFlow length
+
+    Args:
+        xid (int): The transaction id of the request
+        mp_type (int): The multipart type
+        entries (list): The encoded entries
+
+    Returns:
+        (bytes): The messages, all but the last flagged with REPLY_MORE
+    """
+    bodies = [b'']
+    for entry in entries:
+        if bodies[-1] and len(bodies[-1]) + len(entry) > MAX_MULTIPART_BODY:
+            bodies.append(b'')
+        bodies[-1] += entry
+    return b''.join(
+        message(OFPT_MULTIPART_REPLY, xid,
+                MULTIPART.pack(mp_type, OFPMPF_REPLY_MORE
+                               if i < len(bodies) - 1 else 0) + body)
+        for i, body in enumerate(bodies))
+
+
+def pack_port(dpid, port_no, link_down=False):
+    """Returns the description of a port
+
+    Args:
+        dpid (int): The datapath id of the switch, used for the port name
+                    and MAC address
+        port_no (int): The number of the port
+        link_down (bool): Whether the link of the port is down
+
+    Returns:
+        (bytes): The port description
+    """
+    hw_addr = struct.pack('!HI', dpid & 0xffff, port_no)
+    name = '{0}-eth{1}'.format(dpid, port_no).encode('ascii')[:15]
+    # 10 Gb full-duplex copper, with 10 Gbps current and maximum speed
+    return PORT.pack(port_no, hw_addr, name, 0,
+                     OFPPS_LINK_DOWN if link_down else 0, 0x840, 0x840, 0x840,
+                     0, 10000000, 10000000)
+
+
+def port_desc_reply(xid, dpid, port_numbers, down_ports=()):
+    """Returns the port description MULTIPART_REPLY messages
+
+    Args:
+        xid (int): The transaction id of the request
+        dpid (int): The datapath id of the switch, used for the port names
+                    and MAC addresses
+        port_numbers (list): The numbers of the ports
+        down_ports (set): The numbers of the ports whose link is down
+
+    Returns:
+        (bytes): The messages
+    """
+    return multipart_replies(xid, OFPMP_PORT_DESC,
+                             [pack_port(dpid, port_no, port_no in down_ports)
+                              for port_no in port_numbers])
+
+
+def port_status(xid, reason, dpid, port_no, link_down=False):
+    """Returns a PORT_STATUS message
+
+    Args:
+        xid (int): The transaction id
+        reason (int): One of the OFPPR_* reasons
+        dpid (int): The datapath id of the switch
+        port_no (int): The number of the port
+        link_down (bool): Whether the link of the port is down
+
+    Returns:
+        (bytes): The message
+    """
+    return message(OFPT_PORT_STATUS, xid,
+                   struct.pack('!B7x', reason) +
+                   pack_port(dpid, port_no, link_down))
+
+
+def flow_stats_reply(xid, flows, now):
+    """Returns the flow statistics MULTIPART_REPLY messages
+
+    Args:
+        xid (int): The transaction id of the request
+        flows (list): dicts with the 'priority', 'idle_timeout',
+                      'hard_timeout', 'flags', 'cookie', 'table_id', 'match',
+                      'instructions', 'packet_count', 'byte_count' and
+                      'install_time' of every flow
+        now (float): The current time, for the durations of the flows
+
+    Returns:
+        (bytes): The messages
+    """
+    entries = []
+    for flow in flows:
+        body = pack_match(flow['match']) + flow['instructions']
+        duration = max(now - flow['install_time'], 0)
+        entries.append(FLOW_STATS.pack(
+            FLOW_STATS.size + len(body), flow['table_id'], int(duration),
+            int((duration % 1) * 1e9), flow['priority'],
+            flow['idle_timeout'], flow['hard_timeout'], flow['flags'],
+            flow['cookie'], flow['packet_count'], flow['byte_count']) + body)
+    return multipart_replies(xid, OFPMP_FLOW, entries)
+
+
+def aggregate_reply(xid, packet_count, byte_count, flow_count):
+    """Returns an aggregate flow statistics MULTIPART_REPLY message"""
+    return multipart_reply(xid, OFPMP_AGGREGATE,
+                           AGGREGATE_REPLY.pack(packet_count, byte_count,
+                                                flow_count))
+
+
+def desc_reply(xid, datapath):
+    """Returns a switch description MULTIPART_REPLY message
+
+    Args:
+        xid (int): The transaction id of the request
+        datapath (str): The description of the datapath
+
+    Returns:
+        (bytes): The message
+    """
+    def field(text, size):
+        return text.encode('ascii')[:size - 1].ljust(size, b'\0')
+    return multipart_reply(xid, OFPMP_DESC,
+                           field('Multinet', 256) +
+                           field('Emulated switch', 256) +
+                           field('1.0', 256) + field('None', 32) +
+                           field(datapath, 256))
+
+
+def arp_packet(src_mac, dst_mac):
+    """Returns a gratuitous ARP reply frame, the payload of the generated
+    traffic
+
+    Args:
+        src_mac (str): The source MAC address
+        dst_mac (str): The destination MAC address
+
+    Returns:
+        (bytes): The frame
+    """
+    src, dst = mac_to_bytes(src_mac), mac_to_bytes(dst_mac)
+    return (dst + src + struct.pack('!H', 0x0806) +
+            struct.pack('!HHBBH', 1, 0x0800, 6, 4, 2) +
+            src + b'\0\0\0\0' + dst + b'\0\0\0\0')
@@ -0,0 +1,255 @@
+"""
+Live controller connection state of the OVS bridges, kept up to date from
+long-lived OVSDB monitor subscriptions
+"""
+
+import errno
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+
+class OvsdbMonitor(object):
+
+    """
+    Subscribes to the changes of the Bridge and Controller tables of OVSDB
+    with one 'ovsdb-client monitor' process per table, and keeps the
+    connection state of every bridge in memory. A single reader thread
+    multiplexes the outputs of the processes and updates the state
+    incrementally, so the cost of an update does not depend on the number of
+    bridges. Every connect and disconnect of a bridge is reported to a
+    callback.
+    """
+
+    """
+    table - monitored columns correspondence
+    """
+    TABLES = {
+        'Bridge': ['name', 'controller'],
+        'Controller': ['is_connected', 'role', 'target']
+    }
+
+    def __init__(self, on_change=None, database='Open_vSwitch'):
+        """
+        Args:
+            on_change (callable): Called from the reader thread with the name
+                                  of a bridge, whether it is connected and
+                                  the time of the change
+            database (str): The OVSDB database to monitor
+        """
+        self._on_change = on_change
+        self._database = database
+        self._processes = []
+        self._reader = None
+        # bridge uuid -> [name, controller uuids]
+        self._bridges = {}
+        # controller uuid -> is_connected
+        self._controllers = {}
+        # controller uuid -> [target, role]
+        self._controller_info = {}
+        # controller uuid -> bridge uuid
+        self._controller_bridge = {}
+        self._connected = set()
+
+    def start(self):
+        """
+        Start the monitor processes and the reader thread
+
+        Raises:
+            OSError: If ovsdb-client cannot be executed
+        """
+        for table, columns in sorted(self.TABLES.items()):
+            process = subprocess.Popen(
+                ['ovsdb-client', '--format=json', '--data=json', 'monitor',
+                 self._database, table, ','.join(columns)],
+                stdout=subprocess.PIPE)
+            self._processes.append((table, process))
+        self._reader = threading.Thread(target=self._read_updates)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def stop(self):
+        """
+        Terminate the monitor processes and wait for the reader thread
+        """
+        for _, process in self._processes:
+            if process.poll() is None:
+                process.terminate()
+        for _, process in self._processes:
+            process.wait()
+        if self._reader is not None:
+            self._reader.join()
+            self._reader = None
+        self._processes = []
+
+    def connected_count(self):
+        """Returns the number of bridges with a connected controller
+
+        Returns:
+            (int): number of connected bridges
+        """
+        return len(self._connected)
+
+    def is_connected(self, name):
+        """Returns whether a bridge has a connected controller
+
+        Args:
+            name (str): The name of the bridge
+
+        Returns:
+            (bool): True if the bridge is connected
+        """
+        return name in self._connected
+
+    def controller_states(self, names=None):
+        """Returns the number of bridges connected to every controller
+
+        Args:
+            names (set): The names of the bridges to count, None for all the
+                         bridges
+
+        Returns:
+            (dict): controller target (e.g. 'tcp:10.0.0.1:6653') - dict with
+                    the number of 'connected' bridges and of bridges whose
+                    'master' the controller is
+        """
+        states = {}
+        for name, controllers in list(self._bridges.values()):
+            if names is not None and name not in names:
+                continue
+            for controller in controllers:
+                target, role = self._controller_info.get(controller,
+                                                         [None, None])
+                if target is None:
+                    continue
+                state = states.setdefault(target, {'connected': 0,
+                                                   'master': 0})
+                if self._controllers.get(controller):
+                    state['connected'] += 1
+                if role == 'master':
+                    state['master'] += 1
+        return states
+
+    def _read_updates(self):
+        """
+        Read the updates of all the monitor processes until they exit. Every
+        update is a JSON object on a line of its own.
+        """
+        tables = dict((process.stdout.fileno(), table)
+                      for table, process in self._processes)
+        buffers = dict((fd, b'') for fd in tables)
+        while tables:
+            try:
+                readable, _, _ = select.select(list(tables), [], [])
+            except select.error as exc:
+                if exc.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in readable:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    logging.debug('[ovsdb_monitor] Monitor of the {0} table '
+                                  'exited'.format(tables[fd]))
+                    del tables[fd]
+                    continue
+                lines = (buffers[fd] + chunk).split(b'\n')
+                buffers[fd] = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        self._apply_update(tables[fd],
+                                           json.loads(line.decode('utf-8')))
+
+    def _apply_update(self, table, update):
+        """
+        Apply the rows of an update to the state of the bridges
+
+        Args:
+            table (str): The table of the update
+            update (dict): The 'headings' and 'data' of the update, as printed
+                           by 'ovsdb-client --format=json monitor'
+        """
+        headings = update['headings']
+        for cells in update['data']:
+            row = dict(zip(headings, cells))
+            uuid, action = row['row'], row['action']
+            if action == 'old':
+                # The 'new' row that follows holds all the columns
+                continue
+            if table == 'Bridge':
+                self._update_bridge(uuid, action, row)
+            else:
+                self._update_controller(uuid, action, row)
+
+    def _update_bridge(self, uuid, action, row):
+        """
+        Apply an inserted, modified or deleted Bridge row
+        """
+        old = self._bridges.pop(uuid, None)
+        if old is not None:
+            for controller in old[1]:
+                self._controller_bridge.pop(controller, None)
+        if action == 'delete':
+            if old is not None:
+                self._set_connected(old[0], False)
+            return
+        controllers = self._uuids(row['controller'])
+        self._bridges[uuid] = [row['name'], controllers]
+        for controller in controllers:
+            self._controller_bridge[controller] = uuid
+        self._refresh_bridge(uuid)
+
+    def _update_controller(self, uuid, action, row):
+        """
+        Apply an inserted, modified or deleted Controller row
+        """
+        if action == 'delete':
+            self._controllers.pop(uuid, None)
+            self._controller_info.pop(uuid, None)
+        else:
+            self._controllers[uuid] = row['is_connected'] is True
+            self._controller_info[uuid] = [row.get('target'),
+                                           row.get('role')]
+        bridge = self._controller_bridge.get(uuid)
+        if bridge is not None:
+            self._refresh_bridge(bridge)
+
+    def _refresh_bridge(self, uuid):
+        """
+        Recompute whether a bridge has a connected controller
+        """
+        name, controllers = self._bridges[uuid]
+        self._set_connected(name, any(self._controllers.get(controller)
+                                      for controller in controllers))
+
+    def _set_connected(self, name, connected):
+        """
+        Record the connection state of a bridge and report its changes
+        """
+        if connected == (name in self._connected):
+            return
+        if connected:
+            self._connected.add(name)
+        else:
+            self._connected.discard(name)
+        if self._on_change is not None:
+            self._on_change(name, connected, time.time())
+
+    @staticmethod
+    def _uuids(value):
+        """Returns the UUIDs of an OVSDB JSON value
+
+        Args:
+            value (list): An OVSDB 'uuid' atom or a 'set' of 'uuid' atoms
+
+        Returns:
+            (list): The UUIDs
+        """
+        if not value:
+            return []
+        if value[0] == 'uuid':
+            return [value[1]]
+        return [atom[1] for atom in value[1]]
@@ -0,0 +1,312 @@
+"""
+A lightweight OpenFlow 1.3 controller stand-in, for closed-loop benchmarks
+on a single machine without an external SDN controller
+"""
+
+import asyncore
+import errno
+import heapq
+import logging
+import select
+import socket
+import threading
+import time
+
+import net.openflow as of
+
+
+class SwitchConnection(asyncore.dispatcher):
+
+    """
+    The OpenFlow channel of a switch connected to the sink controller. It
+    completes the handshake, answers echo requests and hands every PacketIN
+    to the controller.
+    """
+
+    def __init__(self, sock, controller):
+        """
+        Args:
+            sock (socket.socket): The accepted connection
+            controller (SinkController): The controller of the connection
+        """
+        asyncore.dispatcher.__init__(self, sock, map=controller.channels)
+        self._controller = controller
+        self._in_buffer = b''
+        self._out_buffer = b''
+        self.dpid = None
+        self.send_message(of.hello(controller.next_xid()))
+
+    def send_message(self, data):
+        """
+        Queue an OpenFlow message, written as soon as the socket is writable
+
+        Args:
+            data (bytes): The message
+        """
+        self._out_buffer += data
+
+    def writable(self):
+        return bool(self._out_buffer)
+
+    def handle_write(self):
+        sent = self.send(self._out_buffer)
+        self._out_buffer = self._out_buffer[sent:]
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if not data:
+            return
+        messages, self._in_buffer = of.split_messages(self._in_buffer + data)
+        for _, msg_type, xid, msg in messages:
+            self._handle_message(msg_type, xid, msg)
+
+    def handle_close(self):
+        self._controller.switch_disconnected(self)
+        self.close()
+
+    def handle_error(self):
+        logging.exception('[sink_controller] Error on the connection of '
+                          'switch {0}'.format(self.dpid))
+        self.handle_close()
+
+    def _handle_message(self, msg_type, xid, msg):
+        """
+        Handle a message received from the switch
+
+        Args:
+            msg_type (int): The OpenFlow message type
+            xid (int): The transaction id
+            msg (bytes): The whole message
+        """
+        controller = self._controller
+        if msg_type == of.OFPT_HELLO:
+            self.send_message(of.features_request(controller.next_xid()))
+        elif msg_type == of.OFPT_ECHO_REQUEST:
+            self.send_message(of.echo_reply(xid, msg[of.OFP_HEADER.size:]))
+        elif msg_type == of.OFPT_FEATURES_REPLY:
+            self.dpid = of.parse_features_reply(msg)
+            self.send_message(of.set_config(controller.next_xid()))
+            if controller.table_miss:
+                # OpenFlow 1.3 switches drop unmatched packets unless a
+                # table-miss flow sends them to the controller
+                self.send_message(of.flow_mod(
+                    controller.next_xid(), {}, [of.OFPP_CONTROLLER]))
+            controller.switch_connected(self)
+        elif msg_type == of.OFPT_PACKET_IN:
+            controller.packet_in(self, of.parse_packet_in(msg))
+        elif msg_type == of.OFPT_ERROR:
+            logging.debug('[sink_controller] Error message from switch '
+                          '{0}'.format(self.dpid))
+
+
+class SinkController(asyncore.dispatcher):
+
+    """
+    Accepts the OpenFlow 1.3 connections of the switches on a single event
+    loop, counts the PacketINs they send and optionally answers each
+    PacketIN with a FlowMod after a configurable delay.
+
+    The flow mod policies are
+        'none': only count the PacketINs
+        'mac':  install a flow that matches the source and destination MAC
+                addresses of the packet and floods it, the flows the
+                PacketIN to FlowMod benchmark waits for
+    """
+
+    POLICIES = ['none', 'mac']
+    # Timeout in seconds of every iteration of the event loop, which bounds
+    # the lateness of the delayed FlowMods
+    LOOP_TIMEOUT = 0.01
+
+    def __init__(self, host='127.0.0.1', port=6653, policy='none',
+                 flowmod_delay_ms=0, priority=10, idle_timeout=0,
+                 table_miss=True):
+        """
+        Args:
+            host (str): The IP address to listen on
+            port (int): The port to listen on
+            policy (str): The flow mod policy, one of POLICIES
+            flowmod_delay_ms (float): The delay of every FlowMod after its
+                                      PacketIN, in milliseconds
+            priority (int): The priority of the installed flows
+            idle_timeout (int): The idle timeout of the installed flows in
+                                seconds, 0 for permanent flows
+            table_miss (bool): Install a table-miss flow that sends the
+                               unmatched packets to the controller on every
+                               switch that connects
+
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        if policy not in self.POLICIES:
+            raise ValueError('Unknown flow mod policy {0}, expected one of '
+                             '{1}'.format(policy, ', '.join(self.POLICIES)))
+        self.channels = {}
+        asyncore.dispatcher.__init__(self, map=self.channels)
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.set_reuse_addr()
+        self.bind((host, port))
+        self.listen(1024)
+        self.policy = policy
+        self.flowmod_delay = flowmod_delay_ms / 1000.0
+        self.priority = priority
+        self.idle_timeout = idle_timeout
+        self.table_miss = table_miss
+        self._xid = 0
+        # (due time, sequence, connection, message) heap of delayed FlowMods
+        self._timers = []
+        self._timer_seq = 0
+        self._running = False
+        self._thread = None
+        self.stats = {'connected_switches': 0, 'packet_ins': 0,
+                      'flow_mods': 0, 'start_time': time.time()}
+
+    def next_xid(self):
+        """Returns a new transaction id"""
+        self._xid = (self._xid + 1) & 0xffffffff
+        return self._xid
+
+    def handle_accept(self):
+        # Accept all the pending connections at once, a boot storm would
+        # otherwise take one loop iteration per switch
+        while True:
+            pair = self.accept()
+            if pair is None:
+                return
+            sock, _ = pair
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            SwitchConnection(sock, self)
+
+    def switch_connected(self, connection):
+        """
+        Called when a switch completes the handshake
+
+        Args:
+            connection (SwitchConnection): The channel of the switch
+        """
+        self.stats['connected_switches'] += 1
+        logging.debug('[sink_controller] Switch {0} connected'.
+                      format(connection.dpid))
+
+    def switch_disconnected(self, connection):
+        """
+        Called when the channel of a switch closes
+
+        Args:
+            connection (SwitchConnection): The channel of the switch
+        """
+        if connection.dpid is not None:
+            self.stats['connected_switches'] -= 1
+            connection.dpid = None
+
+    def packet_in(self, connection, packet):
+        """
+        Count a PacketIN and answer it according to the flow mod policy
+
+        Args:
+            connection (SwitchConnection): The channel of the switch
+            packet (dict): The decoded PacketIN, see of.parse_packet_in
+        """
+        self.stats['packet_ins'] += 1
+        if self.policy != 'mac' or packet['eth_src'] is None:
+            return
+        flow_mod = of.flow_mod(
+            self.next_xid(),
+            {'eth_src': packet['eth_src'], 'eth_dst': packet['eth_dst']},
+            [of.OFPP_FLOOD], priority=self.priority,
+            idle_timeout=self.idle_timeout, buffer_id=packet['buffer_id'])
+        if self.flowmod_delay:
+            self._timer_seq += 1
+            heapq.heappush(self._timers, (time.time() + self.flowmod_delay,
+                                          self._timer_seq, connection,
+                                          flow_mod))
+        else:
+            self._send_flow_mod(connection, flow_mod)
+
+    def _send_flow_mod(self, connection, flow_mod):
+        """
+        Send a FlowMod, unless the switch has disconnected in the meantime
+        """
+        if connection.connected:
+            connection.send_message(flow_mod)
+            self.stats['flow_mods'] += 1
+
+    def _run_timers(self):
+        """
+        Send the delayed FlowMods that are due
+        """
+        now = time.time()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, connection, flow_mod = heapq.heappop(self._timers)
+            self._send_flow_mod(connection, flow_mod)
+
+    def serve_forever(self, stats_interval=0):
+        """
+        Run the event loop until stop() is called
+
+        Args:
+            stats_interval (float): Interval in seconds of the statistics log
+                                    lines, 0 to disable them
+        """
+        self._running = True
+        next_stats = time.time() + stats_interval
+        while self._running:
+            try:
+                # poll() is not bounded by the FD_SETSIZE of select()
+                asyncore.loop(timeout=self.LOOP_TIMEOUT, map=self.channels,
+                              use_poll=True, count=1)
+            except (select.error, OSError) as exc:
+                if exc.args[0] != errno.EINTR:
+                    raise
+            self._run_timers()
+            if stats_interval and time.time() >= next_stats:
+                logging.info('[sink_controller] {0}'.format(
+                    self.format_stats()))
+                next_stats += stats_interval
+        asyncore.close_all(map=self.channels)
+
+    def start(self, stats_interval=0):
+        """
+        Run the event loop in a daemon thread
+
+        Args:
+            stats_interval (float): see serve_forever
+        """
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        args=(stats_interval,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the event loop and close all the connections
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self):
+        """Returns the statistics of the controller
+
+        Returns:
+            (dict): The connected switches, the received PacketINs, the sent
+                    FlowMods and their rates since the start
+        """
+        stats = dict(self.stats)
+        elapsed = max(time.time() - stats.pop('start_time'), 1e-9)
+        stats['elapsed'] = elapsed
+        stats['packet_in_rate'] = stats['packet_ins'] / elapsed
+        stats['flow_mod_rate'] = stats['flow_mods'] / elapsed
+        return stats
+
+    def format_stats(self):
+        """Returns the statistics of the controller as a log line"""
+        stats = self.get_stats()
+        return ('switches={0} packet_ins={1} ({2:.1f}/s) flow_mods={3} '
+                '({4:.1f}/s)'.format(stats['connected_switches'],
+                                     stats['packet_ins'],
+                                     stats['packet_in_rate'],
+                                     stats['flow_mods'],
+                                     stats['flow_mod_rate']))
+
@@ -1,10 +1,16 @@
 """
-Modified Topologies created with the High Level Mininet API
+Compact topologies of the workers and the naming of their switches and hosts
 """
-from mininet.topo import Topo
+import array
+import itertools
 import random
 import string
 
+"""
+Alphabet of the host name prefixes and the number of hosts sharing a prefix
+"""
+HOST_NAME_PREFIX_CHARS = string.ascii_lowercase + string.ascii_uppercase
+HOST_NAME_NUMERIC_RANGE = 1000
 
 
 def genHostName(i, j, dpid, n, k):
@@ -19,19 +25,27 @@ def genHostName(i, j, dpid, n, k):
     Returns:
         str: The host name
     """
-    name_prefix_list = list(string.ascii_lowercase + string.ascii_uppercase)
-    numeric_range = 1000
-    name_prefix = ''
     worker_id = dpid
-    host_index_offset = worker_id * k * n
-    alpharethmetic_range = (j + i*n + host_index_offset)//numeric_range
-    while alpharethmetic_range >= 0:
-        name_prefix += name_prefix_list[alpharethmetic_range % len(name_prefix_list)]
-        alpharethmetic_range = (alpharethmetic_range // len(name_prefix_list)) - 1
-    name_prefix = name_prefix[::-1]
-    return ('{0}{1}'.
-                     format(name_prefix,
-                            (j + i*n + host_index_offset)%numeric_range))
+    return genHostNameFromIndex(j + i*n + worker_id * k * n)
+
+
+def genHostNameFromIndex(host_index):
+    """Generate the host name from the global index of the host
+    Args:
+        host_index (int): The index of the host among the hosts of all workers
+
+    Returns:
+        str: The host name
+    """
+    # The prefix is the bijective base-52 representation of the host index
+    # divided by the numeric range
+    prefix_index = host_index // HOST_NAME_NUMERIC_RANGE
+    name_prefix = ''
+    while prefix_index >= 0:
+        name_prefix = (HOST_NAME_PREFIX_CHARS[
+            prefix_index % len(HOST_NAME_PREFIX_CHARS)] + name_prefix)
+        prefix_index = (prefix_index // len(HOST_NAME_PREFIX_CHARS)) - 1
+    return '{0}{1}'.format(name_prefix, host_index % HOST_NAME_NUMERIC_RANGE)
 
 def genSwitchName(i, dpid, k):
     """Generate the switch name
@@ -46,95 +60,420 @@ def genSwitchName(i, dpid, k):
     switch_id = (worker_id * k) + i
     return '{0}'.format(switch_id)
 
-class LinearTopo(Topo):
-    "Linear topology of k switches, with n hosts per switch."
 
-    def build(self, k=2, n=1, dpid=1, **_opts):
+class CompactTopo(object):
+    """
+    Compact topology of k switches, with n hosts per switch.
+
+    Instead of a graph of Python dicts, nodes are identified by their index
+    and their names are generated on demand. Every switch has its n hosts
+    attached to ports 1..n, unless a subclass overrides switchHosts() to
+    leave some switches without hosts, and the switch-to-switch links are
+    stored as
+    pairs of switch indices in integer arrays. Switches, hosts and links are
+    iterated as streams, in the same order and with the same names and port
+    numbers as a Topo built with genSwitchName and genHostName.
+
+    Implements the part of the mininet Topo API that Multinet uses.
+    Subclasses override build() and call addSwitchLink().
+    """
+
+    def __init__(self, k=2, n=1, dpid=1, switch_offset=None, **opts):
         """k: number of switches
-           n: number of hosts per switch"""
+           n: number of hosts per switch
+           dpid: the dpid offset
+           switch_offset: the global index of the first switch, when the
+                          workers have topologies of different sizes
+                          (default dpid * k)"""
         self.k = k
         self.n = n
+        self.dpid = dpid
+        self.switch_offset = (dpid * k if switch_offset is None
+                              else switch_offset)
+        self.num_switches = k
+        self._link_src = array.array('l')
+        self._link_dst = array.array('l')
+        self.build(k=k, n=n, dpid=dpid, **opts)
 
-        lastSwitch = None
-        for i in xrange(k):
-            # Add switch
-            switch = self.addSwitch(genSwitchName(i, dpid, k))
-            # Add hosts to switch
-            for j in xrange(n):
-                host = self.addHost(genHostName(i, j, dpid, n, k))
-                self.addLink(host, switch)
-            # Connect switch to previous
-            if lastSwitch:
-                self.addLink(switch, lastSwitch)
-            lastSwitch = switch
+    def build(self, *args, **opts):
+        "Override this method to add the switch-to-switch links"
+        pass
+
+    def addSwitchLink(self, src, dst):
+        """Add a link between two switches
+           src: index of the first switch
+           dst: index of the second switch"""
+        self._link_src.append(src)
+        self._link_dst.append(dst)
+
+    def switchName(self, i):
+        "Return the name of the switch with index i"
+        return '{0}'.format(self.switch_offset + i)
+
+    def hostName(self, i, j):
+        "Return the name of host j of the switch with index i"
+        return genHostNameFromIndex((self.switch_offset + i) * self.n + j)
+
+    def isSwitch(self, name):
+        "Returns true if node is a switch."
+        return name.isdigit()
+
+    def nodeInfo(self, name):
+        "Return the parameters of a node"
+        return {'isSwitch': True} if self.isSwitch(name) else {}
+
+    def numSwitches(self):
+        "Return the number of switches"
+        return self.num_switches
 
+    def switchHosts(self, i):
+        "Return the number of hosts of the switch with index i"
+        return self.n
 
-class RingTopo(Topo):
-    "Ring topology of k switches, with n hosts per switch."
+    def numHosts(self):
+        "Return the number of hosts"
+        return sum(self.switchHosts(i) for i in xrange(self.num_switches))
+
+    def numLinks(self):
+        "Return the number of links, including the host links"
+        return self.numHosts() + len(self._link_src)
+
+    def switches(self, sort=True):
+        """Return switches (iterator), in index order
+           sort: ignored, switches are always in natural order"""
+        return (self.switchName(i) for i in xrange(self.num_switches))
+
+    def hostIndices(self):
+        """Return the (switch index, host index) of every host (iterator),
+           in index order"""
+        return ((i, j) for i in xrange(self.num_switches)
+                for j in xrange(self.switchHosts(i)))
+
+    def hosts(self, sort=True):
+        """Return hosts (iterator), in index order
+           sort: ignored, hosts are always in natural order"""
+        return (self.hostName(i, j) for i, j in self.hostIndices())
+
+    def iterLinks(self, withInfo=False):
+        """Return links (iterator)
+           withInfo: return link info
+           returns: ( src, dst [, info ] ) tuples"""
+        for i, j in self.hostIndices():
+            switch = self.switchName(i)
+            host = self.hostName(i, j)
+            if withInfo:
+                yield (host, switch, {'node1': host, 'node2': switch,
+                                      'port1': 0, 'port2': j + 1})
+            else:
+                yield (host, switch)
+        # Switch ports after the host ports are assigned in link order
+        next_port = array.array('l', (self.switchHosts(i) + 1
+                                      for i in xrange(self.num_switches)))
+        for src, dst in itertools.izip(self._link_src, self._link_dst):
+            src_name = self.switchName(src)
+            dst_name = self.switchName(dst)
+            if withInfo:
+                src_port = next_port[src]
+                next_port[src] += 1
+                dst_port = next_port[dst]
+                next_port[dst] += 1
+                yield (src_name, dst_name, {'node1': src_name,
+                                            'node2': dst_name,
+                                            'port1': src_port,
+                                            'port2': dst_port})
+            else:
+                yield (src_name, dst_name)
+
+    def links(self, sort=False, withInfo=False):
+        """Return links
+           sort: ignored, links are always in creation order
+           withInfo: return link info
+           returns: list of ( src, dst [, info ] )"""
+        return list(self.iterLinks(withInfo=withInfo))
+
+
+class CompactLinearTopo(CompactTopo):
+    "Compact linear topology of k switches, with n hosts per switch."
 
     def build(self, k=2, n=1, dpid=1, **_opts):
         """k: number of switches
            n: number of hosts per switch"""
-        self.k = k
-        self.n = n
+        for i in xrange(1, k):
+            self.addSwitchLink(i, i - 1)
 
-        lastSwitch = None
-        firstSwitch = None
-        for i in xrange(k):
-            # Add switch
-            switch = self.addSwitch(genSwitchName(i, dpid, k))
-            if i == 0:
-                firstSwitch = switch
-            # Add hosts to switch
-            for j in xrange(n):
-                host = self.addHost(genHostName(i, j, dpid, n, k))
-                self.addLink(host, switch)
-            # Connect switch to previous
-            if lastSwitch:
-                self.addLink(switch, lastSwitch)
-            lastSwitch = switch
-        self.addLink(lastSwitch, firstSwitch)
-
-
-class DisconnectedTopo(Topo):
-    "Disconnected topology of k switches, with n hosts per switch."
+
+class CompactRingTopo(CompactTopo):
+    "Compact ring topology of k switches, with n hosts per switch."
 
     def build(self, k=2, n=1, dpid=1, **_opts):
         """k: number of switches
            n: number of hosts per switch"""
-        self.k = k
-        self.n = n
-
-        for i in xrange(k):
-            # Add switch
-            switch = self.addSwitch(genSwitchName(i, dpid, k))
-            # Add hosts to switch
-            for j in xrange(n):
-                host = self.addHost(genHostName(i, j, dpid, n, k))
-                self.addLink(host, switch)
+        for i in xrange(1, k):
+            self.addSwitchLink(i, i - 1)
+        # With less than 3 switches the closing link would be a self loop or
+        # a duplicate of the link between the two switches
+        if k > 2:
+            self.addSwitchLink(k - 1, 0)
 
 
-class MeshTopo(Topo):
-    "Mesh topology of k switches, with n hosts per switch."
+class CompactDisconnectedTopo(CompactTopo):
+    "Compact disconnected topology of k switches, with n hosts per switch."
 
     def build(self, k=2, n=1, dpid=1, **_opts):
         """k: number of switches
            n: number of hosts per switch"""
-        self.k = k
-        self.n = n
+        pass
 
-        prevSwitches = []
+
+class CompactMeshTopo(CompactTopo):
+    "Compact mesh topology of k switches, with n hosts per switch."
+
+    def build(self, k=2, n=1, dpid=1, **_opts):
+        """k: number of switches
+           n: number of hosts per switch"""
         for i in xrange(k):
-            # Add switch
-            switch = self.addSwitch(genSwitchName(i, dpid, k))
-            # Add hosts to switch
-            for j in xrange(n):
-                host = self.addHost(genHostName(i, j, dpid, n, k))
-                self.addLink(host, switch)
-            # Connect switch to previous
-            for prevSwitch in prevSwitches:
-                self.addLink(switch, prevSwitch)
-            prevSwitches.append(switch)
+            for prev in xrange(i):
+                self.addSwitchLink(i, prev)
 
 
+def fat_tree_size(arity):
+    """Returns the number of switches of a fat-tree
+    Args:
+        arity (int): The arity of the fat-tree
 
+    Returns:
+        int: The number of switches, 5*arity^2/4
+    """
+    return 5 * arity * arity // 4
+
+
+class FatTreeTopo(CompactTopo):
+    """
+    Compact k-ary fat-tree topology, with n hosts per edge switch.
+
+    A fat-tree of arity a has (a/2)^2 core switches and a pods of a/2
+    aggregation and a/2 edge switches, 5a^2/4 switches in total. The arity
+    is given with the 'arity' option, otherwise it is derived from the k
+    switches, which must then be the size of a fat-tree.
+    """
+
+    def build(self, k=2, n=1, dpid=1, arity=None, **_opts):
+        """k: number of switches
+           n: number of hosts per edge switch
+           arity: the arity of the fat-tree (even number)"""
+        if arity is None:
+            arity = 2
+            while fat_tree_size(arity) < k:
+                arity += 2
+            if fat_tree_size(arity) != k:
+                raise ValueError('There is no fat-tree of {0} switches, the '
+                                 'nearest sizes are {1} and {2}.'.format(
+                                     k, fat_tree_size(arity - 2),
+                                     fat_tree_size(arity)))
+        if arity < 2 or arity % 2 != 0:
+            raise ValueError('The arity of a fat-tree must be an even number, '
+                             'not {0}.'.format(arity))
+        if fat_tree_size(arity) != k:
+            raise ValueError('A fat-tree of arity {0} has {1} switches, not '
+                             '{2}.'.format(arity, fat_tree_size(arity), k))
+        half = arity // 2
+        num_core = half * half
+        self.arity = arity
+        self.num_switches = k
+
+        for pod in xrange(arity):
+            agg_base = num_core + pod * arity
+            edge_base = agg_base + half
+            for agg in xrange(half):
+                # Every aggregation switch connects to a/2 core switches
+                for core in xrange(agg * half, (agg + 1) * half):
+                    self.addSwitchLink(agg_base + agg, core)
+                # and to every edge switch of its pod
+                for edge in xrange(half):
+                    self.addSwitchLink(edge_base + edge, agg_base + agg)
+
+    def switchHosts(self, i):
+        """Return the number of hosts of the switch with index i: n for the
+           edge switches and the switches added at runtime, else 0"""
+        if i >= self.num_switches:
+            return self.n
+        pod_index = i - (self.arity // 2) ** 2
+        if pod_index >= 0 and pod_index % self.arity >= self.arity // 2:
+            return self.n
+        return 0
+
+
+def factorize(k, dimensions):
+    """Split k into the given number of factors, as equal as possible
+    Args:
+        k (int): The number to factorize
+        dimensions (int): The number of factors
+
+    Returns:
+        list: The factors in ascending order
+    """
+    if dimensions == 1:
+        return [k]
+    factor = 1
+    for candidate in xrange(1, k + 1):
+        if candidate ** dimensions > k:
+            break
+        if k % candidate == 0:
+            factor = candidate
+    return [factor] + factorize(k // factor, dimensions - 1)
+
+
+def is_torus_size(k, dimensions):
+    """Returns whether k switches form a torus of the given number of
+    dimensions, with at least 2 switches in every dimension
+    Args:
+        k (int): The number of switches
+        dimensions (int): The number of dimensions
+
+    Returns:
+        bool: True if the factors of k are all at least 2
+    """
+    return min(factorize(k, dimensions)) >= 2
+
+
+class TorusTopo(CompactTopo):
+    """
+    Compact 2D or 3D torus topology, with n hosts per switch.
+
+    The size of every dimension is given with the 'dims' option, otherwise
+    the k switches are split into 'dimensions' (2 or 3) sizes that are as
+    equal as possible, which must all be at least 2. Every switch connects
+    to its next neighbour in every dimension, wrapping around at the end of
+    the dimension.
+    """
+
+    def build(self, k=2, n=1, dpid=1, dims=None, dimensions=2, **_opts):
+        """k: number of switches
+           n: number of hosts per switch
+           dims: the size of every dimension
+           dimensions: the number of dimensions, if dims is not given"""
+        if dims is None:
+            if not is_torus_size(k, dimensions):
+                smaller = k - 1
+                while smaller > 0 and not is_torus_size(smaller, dimensions):
+                    smaller -= 1
+                larger = k + 1
+                while not is_torus_size(larger, dimensions):
+                    larger += 1
+                sizes = [str(size) for size in (smaller, larger) if size]
+                raise ValueError(
+                    'There is no {0}D torus of {1} switches, the nearest '
+                    'valid {2} {3}.'.format(
+                        dimensions, k,
+                        'sizes are' if len(sizes) > 1 else 'size is',
+                        ' and '.join(sizes)))
+            dims = factorize(k, dimensions)
+        if min(dims) < 2:
+            raise ValueError('Every dimension of a torus needs at least 2 '
+                             'switches, not {0}.'.format(dims))
+        num_switches = 1
+        for size in dims:
+            num_switches *= size
+        if num_switches != k:
+            raise ValueError('A torus of dimensions {0} has {1} switches, '
+                             'not {2}.'.format(dims, num_switches, k))
+        self.dims = dims
+        self.num_switches = num_switches
+
+        stride = 1
+        for size in dims:
+            for i in xrange(num_switches):
+                coord = (i // stride) % size
+                if coord + 1 < size:
+                    self.addSwitchLink(i, i + stride)
+                elif size > 2:
+                    # Wrap around, a dimension of 2 is already connected
+                    self.addSwitchLink(i, i - coord * stride)
+            stride *= size
+
+
+class RandomRegularTopo(CompactTopo):
+    """
+    Compact random regular topology of k switches, with n hosts per switch.
+
+    Every switch has exactly 'degree' switch links. The graph is generated
+    by randomly pairing the link ends of the switches, rejecting self loops
+    and duplicate links, with a random generator seeded with the 'seed'
+    option (the dpid offset by default), so that it is reproducible.
+    """
+
+    MAX_ATTEMPTS = 100
+    MAX_PAIRING_TRIES = 100
+
+    def build(self, k=2, n=1, dpid=1, degree=3, seed=None, **_opts):
+        """k: number of switches
+           n: number of hosts per switch
+           degree: number of switch links per switch
+           seed: seed of the random generator"""
+        if degree >= k or (k * degree) % 2 != 0:
+            raise ValueError('A random {0}-regular topology of {1} switches '
+                             'does not exist.'.format(degree, k))
+        rng = random.Random(dpid if seed is None else seed)
+
+        for _ in xrange(self.MAX_ATTEMPTS):
+            links = self.pairLinkEnds(rng, k, degree)
+            if links is not None:
+                for src, dst in links:
+                    self.addSwitchLink(src, dst)
+                return
+        raise ValueError('Could not generate a random {0}-regular topology '
+                         'of {1} switches.'.format(degree, k))
+
+    def pairLinkEnds(self, rng, k, degree):
+        """Randomly pair the link ends of the switches
+           rng: the random generator
+           k: number of switches
+           degree: number of switch links per switch
+           returns: list of (src, dst) switch index pairs, or None if the
+                    pairing got stuck"""
+        ends = array.array('l', range(k)) * degree
+        links = []
+        linked = set()
+        while ends:
+            for _ in xrange(self.MAX_PAIRING_TRIES):
+                a = rng.randrange(len(ends))
+                b = rng.randrange(len(ends))
+                src, dst = ends[a], ends[b]
+                key = min(src, dst) * k + max(src, dst)
+                if src != dst and key not in linked:
+                    break
+            else:
+                return None
+            linked.add(key)
+            links.append((src, dst))
+            # Remove both ends by moving the last ends in their place
+            for index in sorted((a, b), reverse=True):
+                ends[index] = ends[-1]
+                ends.pop()
+        return links
+
+
+class DegreeBoundedMeshTopo(CompactTopo):
+    """
+    Compact partial mesh topology of k switches, with n hosts per switch.
+
+    Unlike the full mesh, every switch links only to the next
+    'max_degree' / 2 switches (wrapping around), so that no switch has more
+    than 'max_degree' switch links and the number of links grows linearly
+    with the number of switches.
+    """
+
+    def build(self, k=2, n=1, dpid=1, max_degree=4, **_opts):
+        """k: number of switches
+           n: number of hosts per switch
+           max_degree: maximum number of switch links per switch"""
+        for distance in xrange(1, min(max_degree // 2, (k - 1) // 2) + 1):
+            for i in xrange(k):
+                self.addSwitchLink(i, (i + distance) % k)
+        # With an even number of switches, the opposite switch is reachable
+        # in both directions and is linked once
+        if k % 2 == 0 and k > 2 and max_degree >= k - 1:
+            for i in xrange(k // 2):
+                self.addSwitchLink(i, i + k // 2)
+        elif k == 2 and max_degree >= 1:
+            self.addSwitchLink(1, 0)
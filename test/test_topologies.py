@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import collections
+import net.topologies as topologies
+import pytest
+
+
+def switch_degrees(topo):
+    degrees = collections.Counter()
+    for src, dst in topo.iterLinks():
+        if topo.isSwitch(src) and topo.isSwitch(dst):
+            degrees[src] += 1
+            degrees[dst] += 1
+    return degrees
+
+
+def check_ports(topo):
+    # Every port of a switch is used by a single link
+    ports = collections.Counter()
+    for src, dst, info in topo.iterLinks(withInfo=True):
+        if topo.isSwitch(src):
+            ports[(src, info['port1'])] += 1
+        ports[(dst, info['port2'])] += 1
+    assert max(ports.values()) == 1
+
+
+@pytest.mark.parametrize('topo_class,switch_links', [
+    (topologies.CompactDisconnectedTopo, lambda k: 0),
+    (topologies.CompactLinearTopo, lambda k: k - 1),
+    (topologies.CompactRingTopo, lambda k: k),
+    (topologies.CompactMeshTopo, lambda k: k * (k - 1) // 2)])
+def test_basic_topologies(topo_class, switch_links):
+    topo = topo_class(k=10, n=2, dpid=1)
+    assert topo.numSwitches() == 10
+    assert list(topo.switches()) == [str(i) for i in range(10, 20)]
+    assert topo.numHosts() == 20
+    assert len(set(topo.hosts())) == 20
+    assert topo.numLinks() - topo.numHosts() == switch_links(10)
+    assert len(topo.links()) == topo.numLinks()
+    check_ports(topo)
+
+
+@pytest.mark.parametrize('arity', [2, 4, 6, 8])
+def test_fat_tree(arity):
+    k = 5 * arity * arity // 4
+    topo = topologies.FatTreeTopo(k=k, n=2, dpid=0)
+    assert topo.arity == arity
+    assert topo.numSwitches() == k
+    # a/2 core links per aggregation switch and a/2 edge links per pod
+    # aggregation switch
+    assert topo.numLinks() - topo.numHosts() == arity ** 3 // 2
+    # Only the a^2/2 edge switches have hosts
+    assert topo.numHosts() == 2 * arity * arity // 2
+    assert len(list(topo.hosts())) == topo.numHosts()
+    degrees = switch_degrees(topo)
+    assert set(degrees.values()) == set([arity, arity // 2])
+    check_ports(topo)
+
+
+@pytest.mark.parametrize('k,opts', [(10, {}), (100, {}), (3, {}),
+                                    (20, {'arity': 2}), (20, {'arity': 3})])
+def test_fat_tree_invalid_size(k, opts):
+    with pytest.raises(ValueError):
+        topologies.FatTreeTopo(k=k, n=1, dpid=0, **opts)
+
+
+@pytest.mark.parametrize('k,opts,dims', [
+    (12, {}, [3, 4]), (100, {}, [10, 10]), (27, {'dimensions': 3}, [3, 3, 3]),
+    (60, {'dims': [3, 4, 5]}, [3, 4, 5])])
+def test_torus(k, opts, dims):
+    topo = topologies.TorusTopo(k=k, n=1, dpid=0, **opts)
+    assert topo.dims == dims
+    assert topo.numSwitches() == k
+    # A link to the next switch of every dimension, with wrap around
+    assert topo.numLinks() - topo.numHosts() == k * len(dims)
+    assert set(switch_degrees(topo).values()) == set([2 * len(dims)])
+    check_ports(topo)
+
+
+@pytest.mark.parametrize('k,opts', [(7, {}), (13, {}), (13, {'dimensions': 3}),
+                                    (12, {'dims': [1, 12]}),
+                                    (12, {'dims': [3, 3]})])
+def test_torus_invalid_size(k, opts):
+    with pytest.raises(ValueError):
+        topologies.TorusTopo(k=k, n=1, dpid=0, **opts)
+
+
+def test_random_regular():
+    topo = topologies.RandomRegularTopo(k=100, n=1, dpid=0, degree=4, seed=1)
+    assert topo.numSwitches() == 100
+    assert topo.numLinks() - topo.numHosts() == 200
+    assert set(switch_degrees(topo).values()) == set([4])
+    check_ports(topo)
+
+
+def test_degree_bounded_mesh():
+    topo = topologies.DegreeBoundedMeshTopo(k=100, n=1, dpid=0, max_degree=6)
+    assert topo.numSwitches() == 100
+    assert topo.numLinks() - topo.numHosts() == 300
+    assert max(switch_degrees(topo).values()) <= 6
+    check_ports(topo)
@@ -13,6 +13,13 @@ def config():
     return data
 
 
+def test_health(config):
+    res = m_util.make_get_request(config['master_ip'],
+                                  config['master_port'],
+                                  'health')
+    assert res['status_code'] == 200
+    assert json.loads(res['text'])['ready']
+
 def test_init(config):
     res = m_util.master_cmd(config['master_ip'],
                             config['master_port'],
@@ -42,6 +49,78 @@ def test_get_switches(config):
             i += 1
     assert i == len(config['worker_ip_list'])
 
+def test_get_connect_times(config):
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'get_connect_times')
+    assert res['status_code'] == 200
+
+    report = json.loads(res['text'])
+    assert report['started_switches'] == (int(config['topo']['topo_size']) *
+                                          len(config['worker_ip_list']))
+
+def test_get_switch_events(config):
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'get_switch_events',
+                            {'since': {}})
+    assert res['status_code'] == 200
+
+    for d in json.loads(res['text']):
+        worker_events = json.loads(d)
+        assert [e[0] for e in worker_events['events']] == \
+            sorted(e[0] for e in worker_events['events'])
+
+def test_add_switches(config):
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'add_switches',
+                            {'count': config['scale']['switch_count'],
+                             'rate': config['scale']['switch_rate']})
+    assert res['status_code'] == 200
+
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'get_switches')
+    for d in json.loads(res['text']):
+        for k, v in json.loads(d).items():
+            assert int(v) == (int(config['topo']['topo_size']) +
+                              config['scale']['switch_count'])
+
+def test_remove_switches(config):
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'remove_switches',
+                            {'count': config['scale']['switch_count'],
+                             'rate': config['scale']['switch_rate']})
+    assert res['status_code'] == 200
+
+    res = m_util.master_cmd(config['master_ip'],
+                            config['master_port'],
+                            'get_switches')
+    for d in json.loads(res['text']):
+        for k, v in json.loads(d).items():
+            assert int(v) == int(config['topo']['topo_size'])
+
+def test_metrics(config):
+    res = m_util.make_get_request(config['worker_ip_list'][0],
+                                  config['worker_port_list'][0],
+                                  'metrics')
+    assert res['status_code'] == 200
+    assert 'multinet_switches{state="started"} ' in res['text']
+
+def test_dump_flows(config):
+    client = m_util.MasterClient(config['master_ip'], config['master_port'])
+    chunks = [json.loads(line.decode('utf-8'))
+              for line in client.post_stream('dump_flows',
+                                             {'filters': {'table': 0}})]
+    client.close()
+    assert all('error' not in chunk for chunk in chunks)
+    switches = set((chunk['dpid_offset'], chunk['switch'])
+                   for chunk in chunks)
+    assert len(switches) == (int(config['topo']['topo_size']) *
+                             len(config['worker_ip_list']))
+
 def test_stop(config):
     res = m_util.master_cmd(config['master_ip'],
                             config['master_port'],
@@ -0,0 +1,300 @@
+"""
+In-memory counters, gauges and histograms, exposed in the Prometheus text
+format
+"""
+
+import bisect
+import threading
+
+# The upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, float('inf'))
+
+
+def format_value(value):
+    """Returns a sample value in the Prometheus text format
+
+    Args:
+      value (float): The value
+
+    Returns:
+      str: The formatted value
+    """
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def format_labels(labels):
+    """Returns the labels of a sample in the Prometheus text format
+
+    Args:
+      labels (list): The (name, value) pairs of the labels
+
+    Returns:
+      str: The formatted labels, an empty string without labels
+    """
+    if not labels:
+        return ''
+    return '{{{0}}}'.format(','.join(
+        '{0}="{1}"'.format(name, value.replace('\\', r'\\').
+                           replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels))
+
+
+class Registry(object):
+
+    """
+    The metrics of a process, in the order of their registration
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """
+        Add a metric to the exposition
+
+        Args:
+          metric (Metric): The metric
+        """
+        self._metrics.append(metric)
+
+    def expose(self):
+        """Returns all the metrics in the Prometheus text format
+
+        Returns:
+          str: The exposition
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append('# HELP {0} {1}'.format(metric.name,
+                                                 metric.documentation))
+            lines.append('# TYPE {0} {1}'.format(metric.name, metric.TYPE))
+            for suffix, labels, value in metric.samples():
+                lines.append('{0}{1}{2} {3}'.format(
+                    metric.name, suffix, format_labels(labels),
+                    format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric(object):
+
+    """
+    A metric with a value for every combination of its label values. A
+    metric without labels has a single value, updated through the metric
+    itself. The values are plain numbers updated without locking, so an
+    update costs no more than an addition.
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        """
+        Args:
+          name (str): The name of the metric
+          documentation (str): The help text of the metric
+          labelnames (list): The names of the labels of the metric
+          registry (Registry): The registry of the metric, None to keep it
+          out of the exposition
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        """Returns the value holder of a combination of label values"""
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Returns the value holder of a combination of label values
+
+        Args:
+          values (str): The values of the labels, in the order of the label
+          names
+
+        Returns:
+          The value holder, created on first use
+
+        Raises:
+          ValueError: If the number of values does not match the labels
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError('Metric {0} expects the labels {1}'.format(
+                self.name, ', '.join(self.labelnames)))
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """Returns the samples of the metric
+
+        Returns:
+          list: The (name suffix, labels, value) of every sample
+        """
+        samples = []
+        for values, child in sorted(self._children.items()):
+            labels = list(zip(self.labelnames, values))
+            for suffix, extra_labels, value in child.samples():
+                samples.append((suffix, labels + extra_labels, value))
+        return samples
+
+
+class _Value(object):
+
+    """
+    The value of a counter or a gauge, or a function that reads it at
+    exposition time
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set_function(self, function):
+        """
+        Read the value from a function at exposition time, so that values
+        that are already kept elsewhere cost nothing to track
+
+        Args:
+          function (callable): Returns the value
+        """
+        self.function = function
+
+    def samples(self):
+        value = self.function() if self.function is not None else self.value
+        return [('', [], value)]
+
+
+class _GaugeValue(_Value):
+
+    """
+    The value of a gauge
+    """
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class _HistogramValue(object):
+
+    """
+    The bucket counts, the sum and the count of the observations of a
+    histogram
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append(('_bucket', [('le', format_value(float(bound)))],
+                            cumulative))
+        samples.append(('_sum', [], self.sum))
+        samples.append(('_count', [], self.count))
+        return samples
+
+
+class Counter(Metric):
+
+    """
+    A value that only increases
+    """
+
+    TYPE = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Gauge(Metric):
+
+    """
+    A value that goes up and down
+    """
+
+    TYPE = 'gauge'
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Histogram(Metric):
+
+    """
+    The distribution of observed values over cumulative buckets
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=REGISTRY, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+          buckets (list): The increasing upper bounds of the buckets. An
+          infinite bound is added if missing.
+
+        See Metric for the other arguments.
+        """
+        self._buckets = tuple(sorted(buckets))
+        if self._buckets[-1] != float('inf'):
+            self._buckets += (float('inf'),)
+        super(Histogram, self).__init__(name, documentation, labelnames,
+                                        registry)
+
+    def _new_child(self):
+        return _HistogramValue(self._buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
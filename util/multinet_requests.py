@@ -9,10 +9,23 @@ import json
 import time
 import logging
 import argparse
+import math
+import threading
+import util.tracing
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 
 logging.getLogger().setLevel(logging.DEBUG)
 
+# The number of workers a streamed broadcast reads at once
+STREAM_CONCURRENCY = 4
+# The number of lines a streamed broadcast buffers ahead of its consumer
+STREAM_QUEUE_SIZE = 1000
+
 def parse_arguments():
     """Reads the arguments passed from command line.
 
@@ -77,7 +90,7 @@ def dpid_offset_range(num_vms):
     return [i for i in xrange(0, num_vms)]
 
 
-def make_post_request(host_ip, host_port, route, data=None):
+def make_post_request(host_ip, host_port, route, data=None, timeout=None):
     """Make a POST request
     Make a POST request to a remote REST server and log the response
 
@@ -86,6 +99,7 @@ def make_post_request(host_ip, host_port, route, data=None):
       host_port (int): The port of the remote REST server
       route (str): The REST API endpoint
       data (dict): A dictionary or a list with any additional data
+      timeout (float): Optional. The timeout of the request in seconds
 
     Returns:
       requests.models.Response: The HTTP response for the performed request
@@ -97,13 +111,13 @@ def make_post_request(host_ip, host_port, route, data=None):
     route_name = route.split('/')[0]
     logging.info('[{0}_topology_handler][url] {1}'.format(route_name, url))
     if data is None:
-        post_call = session.post(url, timeout=None)
+        post_call = session.post(url, timeout=timeout)
     else:
         headers = {'Content-type': 'application/json', 'Accept': 'text/plain'}
         post_call = session.post(
             url,
             data=json.dumps(data),
-            headers=headers, timeout=None)
+            headers=headers, timeout=timeout)
     logging.info('[{0}_topology_handler][response status code] {1}'.
           format(route_name, post_call.status_code))
     logging.info('[{0}_topology_handler][response data] {1}'.
@@ -113,7 +127,166 @@ def make_post_request(host_ip, host_port, route, data=None):
     return responce
 
 
-def make_post_request_runner(host_ip, host_port, route, data, queue):
+class MasterClient(object):
+
+    """
+    A client of the master REST API that sends all its requests through one
+    HTTP session, so that a sequence of commands runs from a single process
+    without a new session and without logging every response body.
+    """
+
+    def __init__(self, master_ip, master_port, timeout=None):
+        """
+        Args:
+          master_ip (str): The IP address of the master
+          master_port (int): The port of the master
+          timeout (float): Optional. The timeout of every request in seconds
+        """
+        self._session = requests.Session()
+        self._session.trust_env = False
+        self._base_url = 'http://{0}:{1}/'.format(master_ip, master_port)
+        self._timeout = timeout
+
+    def post(self, opcode, data=None):
+        """Send a command to the master
+
+        Args:
+          opcode (str): The REST API endpoint
+          data (dict): Optional. The JSON data of the command
+
+        Returns:
+          dict: The status code and the text of the HTTP response, and the
+          elapsed time of the request in seconds
+        """
+        start_time = time.time()
+        if data is None:
+            post_call = self._session.post(self._base_url + opcode,
+                                           timeout=self._timeout)
+        else:
+            post_call = self._session.post(
+                self._base_url + opcode, data=json.dumps(data),
+                headers={'Content-type': 'application/json',
+                         'Accept': 'text/plain'},
+                timeout=self._timeout)
+        response = {'status_code': post_call.status_code,
+                    'text': post_call.text,
+                    'elapsed': time.time() - start_time}
+        post_call.close()
+        logging.debug('[master_client][{0}] {1} in {2:.3f} [sec]'.format(
+            opcode, response['status_code'], response['elapsed']))
+        return response
+
+    def get(self, route):
+        """Send a GET request to the master
+
+        Args:
+          route (str): The REST API endpoint
+
+        Returns:
+          dict: The status code and the text of the HTTP response, and the
+          elapsed time of the request in seconds
+        """
+        start_time = time.time()
+        get_call = self._session.get(self._base_url + route,
+                                     timeout=self._timeout)
+        response = {'status_code': get_call.status_code,
+                    'text': get_call.text,
+                    'elapsed': time.time() - start_time}
+        get_call.close()
+        return response
+
+    def post_stream(self, opcode, data=None):
+        """Send a command whose response the master streams as lines
+
+        Args:
+          opcode (str): The REST API endpoint
+          data (dict): Optional. The JSON data of the command
+
+        Returns:
+          generator: The non-empty lines of the response
+
+        Raises:
+          requests.exceptions.HTTPError: If the status code is not 200
+        """
+        post_call = self._session.post(
+            self._base_url + opcode, data=json.dumps(data or {}),
+            headers={'Content-type': 'application/json',
+                     'Accept': 'text/plain'},
+            timeout=self._timeout, stream=True)
+        try:
+            post_call.raise_for_status()
+            for line in post_call.iter_lines():
+                if line:
+                    yield line
+        finally:
+            post_call.close()
+
+    def close(self):
+        """
+        Close the HTTP session
+        """
+        self._session.close()
+
+
+def make_get_request(host_ip, host_port, route, timeout=None):
+    """Make a GET request
+    Make a GET request to a remote REST server
+
+    Args:
+      host_ip (str): The ip of the remote REST server
+      host_port (int): The port of the remote REST server
+      route (str): The REST API endpoint
+      timeout (float): Optional. The timeout of the request in seconds
+
+    Returns:
+      dict: The status code and the text of the HTTP response
+    """
+    session = requests.Session()
+    session.trust_env = False
+
+    url = 'http://{0}:{1}/{2}'.format(host_ip, host_port, route)
+    get_call = session.get(url, timeout=timeout)
+    response = {'status_code': get_call.status_code, 'text': get_call.text}
+    get_call.close()
+    return response
+
+
+def wait_until_healthy(host_ip, host_port, timeout, initial_delay=0.1,
+                       max_delay=2.0):
+    """Poll the 'health' endpoint of a master or worker until it reports
+    that it is ready, backing off exponentially between the attempts
+
+    Args:
+      host_ip (str): The IP address of the REST server
+      host_port (int): The port of the REST server
+      timeout (float): The time in seconds to wait for readiness
+      initial_delay (float): The delay in seconds after the first attempt
+      max_delay (float): The maximum delay in seconds between two attempts
+
+    Returns:
+      tuple: (bool) whether the server became ready, (float) the time it
+      took in seconds, (str) the reason of the last failed attempt
+    """
+    t_start = time.time()
+    delay = initial_delay
+    reason = None
+    while True:
+        try:
+            res = make_get_request(host_ip, host_port, 'health',
+                                   timeout=max_delay)
+            if res['status_code'] == 200 and json.loads(res['text'])['ready']:
+                return True, time.time() - t_start, None
+            reason = 'not ready: {0}'.format(res['text'])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            reason = str(e)
+        if time.time() - t_start + delay > timeout:
+            return False, time.time() - t_start, reason
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def make_post_request_runner(host_ip, host_port, route, data, queue,
+                             index=0):
     """Wrapper function to create a new job for each POST request.
     Make a POST request and put the response in a queue.
     Used for multiprocessing.
@@ -124,8 +297,9 @@ def make_post_request_runner(host_ip, host_port, route, data, queue):
       route (str): The REST API endpoint
       data (str): Any additional JSON data
       queue (multiprocessing.Queue): The queue where all the responses are stored
+      index (int): The index of the request, stored along with the response
     """
-    queue.put(make_post_request(host_ip, host_port, route, data))
+    queue.put((index, make_post_request(host_ip, host_port, route, data)))
     return 0
 
 
@@ -145,7 +319,8 @@ def handle_post_request(post_call, exit_on_fail=True):
         logging.debug(post_call['text'])
 
 
-def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None):
+def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None,
+                  per_worker_data=None):
     """Broadcast a POST request to all the workers
     Use multiple processes to send POST requests to a specified
     endpoint of all the workers simultaneously.
@@ -156,9 +331,23 @@ def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None):
       opcode (str): The REST API endpoint
       topo_size (int): The number of topology switches
       data (dict): JSON data to go with the request
+      per_worker_data (list): Optional. Extra JSON data for every worker, in
+      the order of the workers, merged with data
 
     Returns:
-      list: A list of responses for all the POST requests performed
+      list: A list of responses for all the POST requests performed, in the
+      order of the workers
+    """
+    with util.tracing.span('broadcast_cmd', opcode=opcode,
+                           workers=len(worker_ip_list)):
+        return _broadcast_cmd(worker_ip_list, worker_port_list, opcode, data,
+                              per_worker_data)
+
+
+def _broadcast_cmd(worker_ip_list, worker_port_list, opcode, data,
+                   per_worker_data):
+    """
+    Send the requests of broadcast_cmd
     """
 
     if data is not None and 'is_serial' in data:
@@ -175,16 +364,22 @@ def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None):
     processes = []
     result_queue = multiprocessing.Queue()
 
-    for worker_ip, worker_port in zip(worker_ip_list, worker_port_list):
+    for worker_idx, (worker_ip, worker_port) in enumerate(
+            zip(worker_ip_list, worker_port_list)):
         if opcode == 'init':
             data['dpid_offset'] = dpid_offset_list[offset_idx]
             offset_idx += 1
 
+        worker_data = data
+        if per_worker_data is not None:
+            worker_data = dict(data)
+            worker_data.update(per_worker_data[worker_idx])
+
         if is_serial:
             # Serial send REST requests to workers
             logging.info('[{0}] is running in serial mode'.format(opcode))
             processes.append(make_post_request(worker_ip, worker_port, opcode,
-                                               data))
+                                               worker_data))
         else:
             # Parallel send REST requests to workers
             logging.info('[{0}] is running in parallel mode'.format(opcode))
@@ -192,8 +387,9 @@ def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None):
                                               args=(worker_ip,
                                                     worker_port,
                                                     opcode,
-                                                    data,
-                                                    result_queue,))
+                                                    worker_data,
+                                                    result_queue,
+                                                    worker_idx,))
             processes.append(process)
             process.start()
 
@@ -202,10 +398,100 @@ def broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None):
     else:
         for process in processes:
             process.join()
-        return [result_queue.get() for _ in processes]
+        # The responses arrive in completion order
+        return [response for _, response in
+                sorted(result_queue.get() for _ in processes)]
 
 
 
+def stream_broadcast_cmd(worker_ip_list, worker_port_list, opcode, data=None,
+                         concurrency=STREAM_CONCURRENCY,
+                         queue_size=STREAM_QUEUE_SIZE):
+    """Broadcast a POST request to the workers whose responses are streamed
+    as lines, and yield the lines as they arrive. Up to concurrency threads
+    read one worker at a time each, and at most queue_size lines wait for
+    the consumer, so a slow consumer slows the workers down instead of
+    filling the memory. The lines of a worker keep their order, the lines of
+    different workers interleave.
+
+    Args:
+      worker_ip_list (list): A list of IP addresses to broadcast the POST request
+      worker_port_list (list): The ports of the workers
+      opcode (str): The REST API endpoint
+      data (dict): JSON data to go with the request
+      concurrency (int): The number of workers read at once
+      queue_size (int): The number of lines buffered ahead of the consumer
+
+    Returns:
+      generator: The lines of the responses, ending with a newline, and a
+      JSON line with the 'worker' address and the 'error' of every worker
+      whose request failed
+    """
+    workers = queue.Queue()
+    for worker in zip(worker_ip_list, worker_port_list):
+        workers.put(worker)
+    lines = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def read_workers():
+        session = requests.Session()
+        session.trust_env = False
+        while not stopped.is_set():
+            try:
+                worker_ip, worker_port = workers.get_nowait()
+            except queue.Empty:
+                break
+            address = '{0}:{1}'.format(worker_ip, worker_port)
+            try:
+                response = session.post(
+                    'http://{0}/{1}'.format(address, opcode),
+                    data=json.dumps(data),
+                    headers={'Content-type': 'application/json',
+                             'Accept': 'text/plain'},
+                    stream=True)
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(
+                        'status code {0}'.format(response.status_code))
+                for line in response.iter_lines():
+                    if stopped.is_set():
+                        break
+                    if line:
+                        lines.put(line + b'\n')
+                response.close()
+            except requests.exceptions.RequestException as e:
+                logging.error('[{0}] Streaming from worker {1} failed: '
+                              '{2}'.format(opcode, address, e))
+                lines.put(json.dumps({'worker': address,
+                                      'error': str(e)}).encode() + b'\n')
+        session.close()
+        lines.put(None)
+
+    threads = [threading.Thread(target=read_workers)
+               for _ in range(max(min(concurrency, len(worker_ip_list)), 1))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    with util.tracing.span('stream_broadcast_cmd', opcode=opcode,
+                           workers=len(worker_ip_list)):
+        finished = 0
+        try:
+            while finished < len(threads):
+                line = lines.get()
+                if line is None:
+                    finished += 1
+                else:
+                    yield line
+        finally:
+            # Unblock the readers of an abandoned stream
+            stopped.set()
+            for thread in threads:
+                while thread.is_alive():
+                    try:
+                        lines.get_nowait()
+                    except queue.Empty:
+                        thread.join(0.1)
+
+
 def aggregate_broadcast_response(responses):
     """Perform an aggregation on a list of HTTP responses
     If all the responses status code is successful return 200 else return 500
@@ -224,6 +510,329 @@ def aggregate_broadcast_response(responses):
     return status, body
 
 
+def partition_switches(total_switches, weights):
+    """Split a global number of switches among the workers in proportion to
+    their weights, using the largest remainder method, so that the sizes sum
+    up to the global number of switches.
+    Every worker topology starts at the global index where the topology of
+    the previous worker ends, which keeps switch names, dpids and host names
+    globally unique.
+
+    Args:
+      total_switches (int): The global number of switches
+      weights (list): The weight of every worker, in dpid offset order
+
+    Returns:
+      list: The 'topo_size' and 'switch_offset' of every worker
+    """
+    total_weight = float(sum(weights))
+    if total_weight <= 0:
+        raise ValueError('The sum of the worker weights must be positive.')
+    shares = [total_switches * w / total_weight for w in weights]
+    sizes = [int(share) for share in shares]
+    by_remainder = sorted(xrange(len(weights)),
+                          key=lambda w: shares[w] - sizes[w], reverse=True)
+    for w in by_remainder[:total_switches - sum(sizes)]:
+        sizes[w] += 1
+
+    partition = []
+    switch_offset = 0
+    for size in sizes:
+        partition.append({'topo_size': size, 'switch_offset': switch_offset})
+        switch_offset += size
+    return partition
+
+
+def capacity_weights(worker_stats):
+    """Compute the weight of every worker from its reported resources.
+    The weight is the smallest of the worker shares in CPU cores and in
+    memory, since the scarcer resource limits the topology size.
+
+    Args:
+      worker_stats (list): The 'get_stats' responses of the workers, with
+      their 'cpu_count' and 'mem_total_kb'
+
+    Returns:
+      list: The weight of every worker
+    """
+    total_cpus = float(sum(s['cpu_count'] for s in worker_stats))
+    total_mem = float(sum(s['mem_total_kb'] for s in worker_stats))
+    return [min(s['cpu_count'] / total_cpus, s['mem_total_kb'] / total_mem)
+            for s in worker_stats]
+
+
+def stitching_neighbours(tunnel_ip_list, pattern='linear'):
+    """Returns the pairs of neighbouring worker topologies that are stitched
+    with a tunnel. Both ends of a tunnel get the same port name, so the
+    workers of a tunnel must have different tunnel IP addresses.
+
+    Args:
+      tunnel_ip_list (list): The IP addresses of the tunnel endpoints of the
+      workers, in dpid offset order
+      pattern (str): The stitching pattern, 'linear' or 'ring'
+
+    Returns:
+      list: The (source, destination) dpid offsets of every tunnel
+
+    Raises:
+      ValueError: If the pattern is unknown or two neighbouring workers have
+      the same tunnel IP address
+    """
+    if pattern not in ('linear', 'ring'):
+        raise ValueError('Unknown stitching pattern {0}'.format(pattern))
+    num_workers = len(tunnel_ip_list)
+    neighbours = [(w, w + 1) for w in xrange(num_workers - 1)]
+    if pattern == 'ring' and num_workers > 2:
+        neighbours.append((num_workers - 1, 0))
+    for src, dst in neighbours:
+        if tunnel_ip_list[src] == tunnel_ip_list[dst]:
+            raise ValueError(
+                'Workers {0} and {1} are stitched with a tunnel but share the '
+                'tunnel IP address {2}. Set a distinct tunnel_ip_list entry '
+                'for every worker, or stitch workers of different '
+                'machines.'.format(src, dst, tunnel_ip_list[src]))
+    return neighbours
+
+
+def tunnel_stitching_plan(tunnel_ip_list, edge_switches, pattern='linear',
+                          tunnel_type='vxlan'):
+    """Compute the tunnels that stitch the topologies of the workers
+    The last switch of every worker topology is connected to the first switch
+    of the next worker topology. With the ring pattern, the last worker
+    topology is also connected to the first one.
+
+    Args:
+      tunnel_ip_list (list): The IP addresses of the tunnel endpoints of the
+      workers, in dpid offset order
+      edge_switches (list): The [first, last] switch names of every worker
+      topology, in dpid offset order
+      pattern (str): The stitching pattern, 'linear' or 'ring'
+      tunnel_type (str): The type of the tunnels, 'vxlan' or 'gre'
+
+    Returns:
+      dict: The list of tunnels of every worker, keyed by dpid offset
+
+    Raises:
+      ValueError: See stitching_neighbours, or if the tunnel type is unknown
+    """
+    if tunnel_type not in ('vxlan', 'gre'):
+        raise ValueError('Unknown tunnel type {0}'.format(tunnel_type))
+    neighbours = stitching_neighbours(tunnel_ip_list, pattern)
+
+    plan = dict((str(w), []) for w in xrange(len(tunnel_ip_list)))
+    for key, (src, dst) in enumerate(neighbours, 1):
+        if not edge_switches[src] or not edge_switches[dst]:
+            continue
+        plan[str(src)].append({'switch': edge_switches[src][-1],
+                               'remote_ip': tunnel_ip_list[dst],
+                               'key': key,
+                               'tunnel_type': tunnel_type})
+        plan[str(dst)].append({'switch': edge_switches[dst][0],
+                               'remote_ip': tunnel_ip_list[src],
+                               'key': key,
+                               'tunnel_type': tunnel_type})
+    return plan
+
+
+def percentile(sorted_values, percent):
+    """Compute a percentile of a sorted list with the nearest-rank method
+
+    Args:
+      sorted_values (list): The values in ascending order
+      percent (float): The percentile to compute, in (0, 100]
+
+    Returns:
+      float: The percentile, or None if the list is empty
+    """
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def connect_latency_report(worker_connect_times):
+    """Aggregate the controller connection times of the switches of all the
+    workers into a latency distribution. The connect latency of a switch is
+    the time from its start until it was first seen connected. The workers
+    boot their topologies at the same time, so the time until all the
+    switches are connected is the largest connect time of any worker,
+    relative to the start of its bootup.
+
+    Args:
+      worker_connect_times (list): The 'get_connect_times' responses of the
+      workers, with the [name, start time, connect time] of every switch
+
+    Returns:
+      dict: The number of started and connected switches, the p50, p95,
+      p99 and max connect latency and the time until all the switches are
+      connected (None while some switch is not connected), in seconds
+    """
+    latencies = []
+    connect_times = []
+    total = 0
+    for worker in worker_connect_times:
+        for _, start_time, connect_time in worker['switches']:
+            total += 1
+            if connect_time is not None:
+                latencies.append(connect_time - start_time)
+                connect_times.append(connect_time)
+    latencies.sort()
+    all_connected = total > 0 and len(latencies) == total
+    return {'started_switches': total,
+            'connected_switches': len(latencies),
+            'p50_connect_latency': percentile(latencies, 50),
+            'p95_connect_latency': percentile(latencies, 95),
+            'p99_connect_latency': percentile(latencies, 99),
+            'max_connect_latency': latencies[-1] if latencies else None,
+            'time_to_all_connected': (max(connect_times) if all_connected
+                                      else None)}
+
+
+def controller_distribution_report(worker_distributions):
+    """Aggregate the distribution of the switches of all the workers over the
+    controllers. A count is None in the cluster when some worker cannot
+    report it, e.g. without the OVSDB monitor.
+
+    Args:
+      worker_distributions (list): The 'get_controller_distribution'
+      responses of the workers
+
+    Returns:
+      dict: The 'workers' responses and the 'cluster' list with the number of
+      assigned, connected and mastered switches of every controller
+    """
+    cluster = []
+    positions = {}
+    for worker in worker_distributions:
+        for entry in worker['controllers']:
+            if entry['controller'] not in positions:
+                positions[entry['controller']] = len(cluster)
+                cluster.append({'controller': entry['controller'],
+                                'assigned': 0, 'connected': 0, 'master': 0})
+            total = cluster[positions[entry['controller']]]
+            for key in ('assigned', 'connected', 'master'):
+                if total[key] is None or entry[key] is None:
+                    total[key] = None
+                else:
+                    total[key] += entry[key]
+    return {'workers': worker_distributions, 'cluster': cluster}
+
+
+def flowmod_latency_report(worker_flow_latencies):
+    """Aggregate the results of the PacketIN to FlowMod benchmark of all the
+    workers. The latency of a flow is the time from the send of the packet
+    that triggered it until the flow was seen on the switch. The throughput
+    of a worker is the number of flows installed from its first send until
+    its last install. The workers run on separate clocks, so the cluster
+    throughput is the sum of the worker throughputs.
+
+    Args:
+      worker_flow_latencies (list): The 'get_flow_latencies' responses of the
+      workers, with the number of 'sent' packets and the [send time, install
+      time] of every installed flow
+
+    Returns:
+      dict: The number of sent packets and installed flows, the p50, p95,
+      p99 and max latency and the FlowMod throughput (flows per second) of
+      every worker and of the cluster
+    """
+    def summary(latencies, sent):
+        latencies.sort()
+        return {'sent_packets': sent,
+                'installed_flows': len(latencies),
+                'p50_latency': percentile(latencies, 50),
+                'p95_latency': percentile(latencies, 95),
+                'p99_latency': percentile(latencies, 99),
+                'max_latency': latencies[-1] if latencies else None}
+
+    workers = []
+    cluster_latencies = []
+    cluster_throughput = 0.0
+    for worker in worker_flow_latencies:
+        flows = worker['flows']
+        latencies = [install - send for send, install in flows]
+        cluster_latencies.extend(latencies)
+        report = summary(latencies, worker['sent'])
+        report['dpid_offset'] = worker['dpid_offset']
+        throughput = None
+        if flows:
+            duration = (max(install for _, install in flows) -
+                        min(send for send, _ in flows))
+            if duration > 0:
+                throughput = len(flows) / duration
+                cluster_throughput += throughput
+        report['flowmod_throughput'] = throughput
+        workers.append(report)
+    cluster = summary(cluster_latencies,
+                      sum(w['sent'] for w in worker_flow_latencies))
+    cluster['flowmod_throughput'] = cluster_throughput
+    return {'workers': workers, 'cluster': cluster}
+
+
+def churn_report(worker_churns):
+    """Aggregate the results of the connection churn of all the workers. The
+    reconnect latency of a switch is the time from its reconnect until it
+    was seen connected again.
+
+    Args:
+      worker_churns (list): The 'churn_switches' responses of the workers
+
+    Returns:
+      dict: The number of churned switches, disconnects, skipped
+      disconnects and pending reconnects, the p50, p95, p99 and max
+      reconnect latency and the number of booted and connected switches of
+      every worker and of the cluster
+    """
+    keys = ('churned_switches', 'disconnects', 'skipped', 'pending',
+            'booted', 'connected')
+
+    def summary(latencies, counts):
+        latencies.sort()
+        report = dict(counts)
+        report.update({'reconnects': len(latencies),
+                       'p50_reconnect_latency': percentile(latencies, 50),
+                       'p95_reconnect_latency': percentile(latencies, 95),
+                       'p99_reconnect_latency': percentile(latencies, 99),
+                       'max_reconnect_latency': (latencies[-1] if latencies
+                                                 else None)})
+        return report
+
+    workers = []
+    cluster_latencies = []
+    for worker in worker_churns:
+        cluster_latencies.extend(worker['latencies'])
+        report = summary(list(worker['latencies']),
+                         dict((key, worker[key]) for key in keys))
+        report['dpid_offset'] = worker['dpid_offset']
+        workers.append(report)
+    cluster = summary(cluster_latencies,
+                      dict((key, sum(worker[key] for worker in worker_churns))
+                           for key in keys))
+    return {'workers': workers, 'cluster': cluster}
+
+
+def link_flap_report(worker_flaps):
+    """Aggregate the link flap events of all the workers. The times of the
+    events of a worker are relative to its boot start time, so every event
+    also gets its absolute time, to be compared with the time the controller
+    converged.
+
+    Args:
+      worker_flaps (list): The 'flap_links' responses of the workers
+
+    Returns:
+      dict: The 'workers' responses, with the absolute 'time' of every event
+      appended, and the number of links, link downs and skipped events of
+      the 'cluster'
+    """
+    for worker in worker_flaps:
+        for event in worker['events']:
+            event.append(worker['boot_start_time'] + event[1])
+    return {'workers': worker_flaps,
+            'cluster': dict((key, sum(worker[key] for worker in worker_flaps))
+                            for key in ('links', 'link_downs', 'skipped'))}
+
+
 def master_cmd(master_ip, master_port, opcode, data=None):
     """Wrapper function to send a command to the master
 
@@ -236,3 +845,36 @@ def master_cmd(master_ip, master_port, opcode, data=None):
       requests.models.Response: The HTTP response for the performed request
     """
     return make_post_request(master_ip, master_port, opcode, data)
+
+
+def format_value(value):
+    """Format a value for a results table
+
+    Args:
+      value: An int, a float, a str or None
+
+    Returns:
+      str: The formatted value
+    """
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return '{0:.4f}'.format(value)
+    return str(value)
+
+
+def format_table(columns, rows):
+    """Format rows as a text table, with right aligned columns
+
+    Args:
+      columns (list): The names of the columns
+      rows (list): The formatted values of every row
+
+    Returns:
+      str: The table
+    """
+    rows = [columns] + rows
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join(' | '.join(cell.rjust(width)
+                                for cell, width in zip(row, widths))
+                     for row in rows)
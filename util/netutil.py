@@ -6,10 +6,13 @@
 
 """ General network utilities """
 
+import hashlib
+import io
 import logging
 import os
 import paramiko
 import stat
+import tarfile
 import time
 
 def ssh_connect_or_return(ipaddr, user, passwd, maxretries, remote_port=22):
@@ -103,28 +106,98 @@ def copy_directory_to_target(ipaddr, user, passwd, local_path, remote_path,
     :type remote_path: str
     :type remote_port: int
     """
-    #  recursively upload a full directory
-    if local_path.endswith('/'):
-        local_path = local_path[:-1]
-
     transport_layer = paramiko.Transport((ipaddr, remote_port))
     transport_layer.connect(username=user, password=passwd)
     sftp = paramiko.SFTPClient.from_transport(transport_layer)
-    os.chdir(os.path.split(local_path)[0])
-    parent = os.path.split(local_path)[1]
+    sftp_copy_directory(sftp, local_path, remote_path)
+    sftp.close()
+    transport_layer.close()
+
+
+def sftp_copy_directory(sftp, local_path, remote_path):
+    """Copy a local directory on a remote machine over an open sftp session.
+    The directory is copied under remote_path with the same name. Does not
+    change the working directory, so it can run in parallel for many hosts.
+
+    :param sftp: An open sftp session to the remote machine
+    :param local_path: directory path from local machine to copy, full location
+           required
+    :param remote_path: remote destination, full location required
+    :type sftp: paramiko.SFTPClient
+    :type local_path: str
+    :type remote_path: str
+    """
+    #  recursively upload a full directory
+    if local_path.endswith('/'):
+        local_path = local_path[:-1]
+    local_root = os.path.dirname(local_path) or os.curdir
 
-    for walker in os.walk(parent):
+    for walker in os.walk(local_path):
+        relative_dir = os.path.relpath(walker[0], local_root)
         try:
-            folder_to_make = os.path.join(remote_path, walker[0])
-            sftp.mkdir(folder_to_make)
-        except:
+            sftp.mkdir(os.path.join(remote_path, relative_dir))
+        except IOError:
             pass
         for curr_file in walker[2]:
             local_file = os.path.join(walker[0], curr_file)
-            remote_file = os.path.join(remote_path, walker[0], curr_file)
+            remote_file = os.path.join(remote_path, relative_dir, curr_file)
             sftp.put(local_file, remote_file)
-    sftp.close()
-    transport_layer.close()
+
+
+def create_directory_archive(local_path, exclude_dirs=()):
+    """Packs a local directory in an in-memory compressed tar archive, and
+    computes a hash of its content. The archive members are stored under the
+    name of the directory. Compiled python files are never included.
+
+    :param local_path: directory path from local machine to pack
+    :param exclude_dirs: names of the directories to leave out
+    :returns: the archive and the hex digest of the content hash
+    :rtype: tuple (bytes, str)
+    :type local_path: str
+    :type exclude_dirs: list
+    """
+    if local_path.endswith('/'):
+        local_path = local_path[:-1]
+    local_root = os.path.dirname(local_path) or os.curdir
+
+    content_hash = hashlib.sha1()
+    archive = io.BytesIO()
+    tar = tarfile.open(fileobj=archive, mode='w:gz')
+    for dirpath, dirnames, filenames in os.walk(local_path):
+        # Walk in a stable order, so that the hash does not depend on it
+        dirnames[:] = sorted(d for d in dirnames
+                             if d not in exclude_dirs and d != '__pycache__')
+        for filename in sorted(filenames):
+            if filename.endswith(('.pyc', '.pyo')):
+                continue
+            local_file = os.path.join(dirpath, filename)
+            arcname = os.path.relpath(local_file, local_root)
+            content_hash.update(arcname.encode('utf-8'))
+            with open(local_file, 'rb') as file_handle:
+                content_hash.update(file_handle.read())
+            tar.add(local_file, arcname=arcname, recursive=False)
+    tar.close()
+    return archive.getvalue(), content_hash.hexdigest()
+
+
+def ssh_extract_archive(ssh_session, archive, remote_path):
+    """Streams a compressed tar archive over an SSH channel and extracts it on
+    the remote machine.
+
+    :param ssh_session: SSH session provided by paramiko
+    :param archive: the compressed tar archive
+    :param remote_path: the remote directory to extract the archive in
+    :returns: the exit status of the remote tar command
+    :rtype: int
+    :type ssh_session: paramiko.SSHClient
+    :type archive: bytes
+    :type remote_path: str
+    """
+    stdin, stdout, _ = ssh_session.exec_command(
+        'mkdir -p {0} && tar -xzf - -C {0}'.format(remote_path))
+    stdin.write(archive)
+    stdin.channel.shutdown_write()
+    return stdout.channel.recv_exit_status()
 
 
 def make_remote_file_executable(ipaddr, user, passwd, remote_file,
@@ -169,15 +242,26 @@ def create_remote_directory(ipaddr, user, passwd, remote_path, remote_port=22):
     transport_layer = paramiko.Transport((ipaddr, remote_port))
     transport_layer.connect(username=user, password=passwd)
     sftp = paramiko.SFTPClient.from_transport(transport_layer)
+    sftp_create_directory(sftp, remote_path)
+    sftp.close()
+    transport_layer.close()
+
+
+def sftp_create_directory(sftp, remote_path):
+    """Creates a directory on a remote machine over an open sftp session, if
+    it does not exist.
+
+    :param sftp: An open sftp session to the remote machine
+    :param remote_path: the directory to create
+    :type sftp: paramiko.SFTPClient
+    :type remote_path: str
+    """
     try:
         # Test if remote_path exists
-        sftp.chdir(remote_path)
+        sftp.stat(remote_path)
     except IOError:
         # Create remote_path
         sftp.mkdir(remote_path)
-        sftp.chdir(remote_path)
-    sftp.close()
-    transport_layer.close()
 
 
 def isdir(path, sftp):
@@ -248,6 +332,23 @@ def ssh_run_command(ssh_session, command_to_run):
     #    raise RuntimeError('[ssh_run_command] SSH command fail to execute.')
 
 
+def ssh_run_command_and_wait(ssh_session, command_to_run):
+    """Runs the specified command on a remote machine and waits for it to
+    exit. Commands that start servers in the background return as soon as the
+    server process has been spawned.
+
+    :param ssh_session : SSH session provided by paramiko to run the command
+    :param command_to_run: Command to execute
+    :returns: the exit status and the output of the remotely executed command
+    :rtype: tuple (int, str)
+    :type ssh_session: paramiko.SSHClient
+    :type command_to_run: str
+    """
+    _, stdout, _ = ssh_session.exec_command(command_to_run)
+    exit_status = stdout.channel.recv_exit_status()
+    return exit_status, stdout.read().decode()
+
+
 def ssh_delete_file_if_exists(ipaddr, user, passwd, remote_file,
                               remote_port=22):
     """Deletes the file on e remote machine, if it exists
@@ -0,0 +1,116 @@
+"""
+On-demand profiling of a single operation, with cProfile or with a stack
+sampler
+"""
+
+import collections
+import cProfile
+import pstats
+import sys
+import threading
+import time
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class Profiler(object):
+
+    """
+    Profiles the code a thread runs between start() and stop().
+
+    The modes are
+        'cprofile': deterministic profiling of every call, reported as the
+                    pstats table of the top functions
+        'sampling': samples the stack of the thread at an interval from a
+                    separate thread, reported as folded stacks ready for
+                    flamegraph.pl. It slows the profiled code down much less
+                    than cProfile.
+    """
+
+    MODES = ['cprofile', 'sampling']
+
+    def __init__(self, mode='cprofile', interval=0.005, sort='cumulative',
+                 limit=50):
+        """
+        Args:
+          mode (str): The profiling mode, one of MODES
+          interval (float): The sampling interval in seconds
+          sort (str): The pstats sort key of the cProfile report
+          limit (int): The number of functions of the cProfile report
+
+        Raises:
+          ValueError: If the mode is unknown
+        """
+        if mode not in self.MODES:
+            raise ValueError('Unknown profiling mode {0}, expected one of '
+                             '{1}'.format(mode, ', '.join(self.MODES)))
+        self.mode = mode
+        self._interval = interval
+        self._sort = sort
+        self._limit = limit
+        self._profile = None
+        self._sampler = None
+        self._sampling = False
+        self._samples = collections.Counter()
+        self._start_time = None
+        self.running = False
+
+    def start(self):
+        """
+        Start profiling the calling thread
+        """
+        self._start_time = time.time()
+        self.running = True
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+        self._sampling = True
+        self._sampler = threading.Thread(
+            target=self._sample, args=(threading.current_thread().ident,))
+        self._sampler.daemon = True
+        self._sampler.start()
+
+    def stop(self):
+        """Stop profiling and returns the report
+
+        Returns:
+          dict: The 'mode', the 'duration' in seconds and the 'profile' text
+        """
+        if self.mode == 'cprofile':
+            self._profile.disable()
+            stream = StringIO()
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats(self._sort).print_stats(self._limit)
+            profile = stream.getvalue()
+        else:
+            self._sampling = False
+            self._sampler.join()
+            profile = ''.join('{0} {1}\n'.format(stack, count)
+                              for stack, count in
+                              self._samples.most_common())
+        self.running = False
+        return {'mode': self.mode,
+                'duration': time.time() - self._start_time,
+                'profile': profile}
+
+    def _sample(self, ident):
+        """
+        Count the stacks of a thread until sampling stops
+
+        Args:
+          ident (int): The identifier of the thread
+        """
+        while self._sampling:
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{0}:{1}'.format(code.co_filename, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self._samples[';'.join(reversed(stack))] += 1
+            time.sleep(self._interval)
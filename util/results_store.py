@@ -0,0 +1,343 @@
+"""
+Local SQLite database of the results of the scenario runs, and the summary
+metrics the runs are compared on
+"""
+
+import json
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    label TEXT,
+    version TEXT,
+    start_time REAL,
+    end_time REAL,
+    duration REAL,
+    passed INTEGER,
+    config TEXT,
+    scenario TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seq INTEGER NOT NULL,
+    name TEXT,
+    command TEXT,
+    start REAL,
+    end REAL,
+    duration REAL,
+    elapsed REAL,
+    status_code INTEGER,
+    passed INTEGER
+);
+CREATE TABLE IF NOT EXISTS series (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    phase TEXT,
+    time REAL,
+    metric TEXT,
+    worker INTEGER,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    phase TEXT,
+    worker INTEGER,
+    response TEXT
+);
+CREATE TABLE IF NOT EXISTS summary (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    metric TEXT,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS runs_name ON runs (name, id);
+CREATE INDEX IF NOT EXISTS series_run ON series (run_id, metric);
+CREATE INDEX IF NOT EXISTS summary_run ON summary (run_id);
+"""
+
+# Whether a higher value of a summary metric is better. The metrics of
+# command latency are named 'command_latency.<command>'.
+HIGHER_IS_BETTER = {'boot_rate': True, 'flow_install_rate': True,
+                    'run_duration': False, 'command_latency': False}
+
+
+def higher_is_better(metric):
+    """Returns whether a higher value of a summary metric is better
+
+    Args:
+      metric (str): The name of the summary metric
+
+    Returns:
+      bool: True for rates, False for durations and latencies
+    """
+    return HIGHER_IS_BETTER.get(metric.split('.')[0], False)
+
+
+def _cluster_series(results, metric):
+    """Returns the (time, value) samples of a cluster series of a run, in
+    time order"""
+    return sorted((sample[0], sample[3])
+                  for phase in results['phases']
+                  for sample in phase.get('series', [])
+                  if sample[1] == metric and sample[2] is None)
+
+
+def _rate_to_max(series, start_time, start_value=0):
+    """Returns the rate a series reached its maximum at, from a start time
+    and value, None if it never grew"""
+    if not series:
+        return None
+    max_value = max(value for _, value in series)
+    max_time = min(t for t, value in series if value == max_value)
+    if max_time <= start_time or max_value <= start_value:
+        return None
+    return (max_value - start_value) / (max_time - start_time)
+
+
+def summarize_run(results):
+    """Returns the summary metrics of a scenario run
+
+    The metrics are
+        run_duration: The duration of the run in seconds
+        boot_rate: The switches per second, from the start of the first
+                   'start' phase until the 'switches' series reached its
+                   maximum
+        flow_install_rate: The flows per second, the cluster FlowMod
+                           throughput of a 'get_flow_latencies' phase if
+                           any, else the growth rate of the 'flows' series
+                           until its maximum
+        command_latency.<command>: The mean response time of the requests of
+                                   a command in seconds
+
+    Args:
+      results (dict): The results of the run, as written by run_scenario
+
+    Returns:
+      dict: The summary metrics the run has data for
+    """
+    summary = {'run_duration': results['duration']}
+    start_phases = [phase for phase in results['phases']
+                    if phase.get('command') == 'start']
+    boot_start = (start_phases[0]['start'] if start_phases
+                  else results['start_time'])
+    boot_rate = _rate_to_max(_cluster_series(results, 'switches'), boot_start)
+    if boot_rate is not None:
+        summary['boot_rate'] = boot_rate
+
+    flows = _cluster_series(results, 'flows')
+    flow_install_rate = (_rate_to_max(flows, flows[0][0], flows[0][1])
+                         if flows else None)
+    for phase in results['phases']:
+        if (phase.get('command') == 'get_flow_latencies' and
+                isinstance(phase.get('response'), dict)):
+            cluster = phase['response'].get('cluster', {})
+            if cluster.get('flowmod_throughput') is not None:
+                flow_install_rate = cluster['flowmod_throughput']
+    if flow_install_rate is not None:
+        summary['flow_install_rate'] = flow_install_rate
+
+    latencies = {}
+    for phase in results['phases']:
+        if phase.get('command') is None:
+            continue
+        elapsed = [sample['elapsed'] for sample in phase.get('samples', [])]
+        if not elapsed and 'elapsed' in phase:
+            elapsed = [phase['elapsed']]
+        latencies.setdefault(phase['command'], []).extend(elapsed)
+    for command, elapsed in latencies.items():
+        if elapsed:
+            summary['command_latency.' + command] = (sum(elapsed) /
+                                                     len(elapsed))
+    return summary
+
+
+def compare_summaries(baseline, run, threshold):
+    """Compare the summary metrics of a run against a baseline run
+
+    Args:
+      baseline (dict): The summary metrics of the baseline run
+      run (dict): The summary metrics of the compared run
+      threshold (float): The relative change that counts as a regression or
+      an improvement, e.g. 0.1 for 10%
+
+    Returns:
+      list: The metric, the baseline value, the run value, the relative
+      change and the status ('regression', 'improvement', 'ok' or 'missing')
+      of every metric of either run, sorted by metric
+    """
+    rows = []
+    for metric in sorted(set(baseline) | set(run)):
+        base_value, value = baseline.get(metric), run.get(metric)
+        if base_value is None or value is None or base_value == 0:
+            rows.append((metric, base_value, value, None, 'missing'))
+            continue
+        change = (value - base_value) / abs(base_value)
+        better = change if higher_is_better(metric) else -change
+        if better < -threshold:
+            status = 'regression'
+        elif better > threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((metric, base_value, value, change, status))
+    return rows
+
+
+class ResultsStore(object):
+
+    """
+    The results of the scenario runs, kept in a SQLite database file: the
+    configuration and the scenario of every run, the timings of its phases,
+    the series of values recorded from the responses, the response of every
+    worker to the broadcast commands and the summary metrics of the run
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+          path (str): The path of the database file, created if missing
+        """
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def add_run(self, results, config, scenario, version=None, label=None):
+        """Store the results of a scenario run
+
+        Args:
+          results (dict): The results of the run, as written by run_scenario
+          config (dict): The JSON configuration of the run
+          scenario (dict): The scenario of the run
+          version (str): The Multinet version of the master
+          label (str): A free text label of the run, e.g. the controller
+          version
+
+        Returns:
+          int: The id of the run
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO runs (name, label, version, start_time, '
+                'end_time, duration, passed, config, scenario) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (results['scenario'], label, version, results['start_time'],
+                 results['end_time'], results['duration'],
+                 int(results['passed']), json.dumps(config),
+                 json.dumps(scenario)))
+            run_id = cursor.lastrowid
+            for seq, phase in enumerate(results['phases']):
+                self._conn.execute(
+                    'INSERT INTO phases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, seq, phase['name'], phase.get('command'),
+                     phase['start'], phase['end'], phase['duration'],
+                     phase.get('elapsed'), phase.get('status_code'),
+                     int(phase['passed'])))
+                self._conn.executemany(
+                    'INSERT INTO series VALUES (?, ?, ?, ?, ?, ?)',
+                    [(run_id, phase['name']) + tuple(sample)
+                     for sample in phase.get('series', [])])
+                if isinstance(phase.get('response'), list):
+                    self._conn.executemany(
+                        'INSERT INTO workers VALUES (?, ?, ?, ?)',
+                        [(run_id, phase['name'], worker,
+                          response if isinstance(response, type(u''))
+                          else json.dumps(response))
+                         for worker, response in
+                         enumerate(phase['response'])])
+            self._conn.executemany(
+                'INSERT INTO summary VALUES (?, ?, ?)',
+                [(run_id, metric, value)
+                 for metric, value in summarize_run(results).items()])
+        return run_id
+
+    def runs(self, name=None, limit=20):
+        """Returns the latest runs, newest first
+
+        Args:
+          name (str): Optional. Return only the runs of this scenario
+          limit (int): The number of runs
+
+        Returns:
+          list: The id, name, label, version, start time, duration and
+          passed flag of every run
+        """
+        query = ('SELECT id, name, label, version, start_time, duration, '
+                 'passed FROM runs')
+        args = ()
+        if name is not None:
+            query += ' WHERE name = ?'
+            args = (name,)
+        query += ' ORDER BY id DESC LIMIT ?'
+        return self._conn.execute(query, args + (limit,)).fetchall()
+
+    def run(self, run_id):
+        """Returns a run
+
+        Args:
+          run_id (int): The id of the run
+
+        Returns:
+          tuple: The id, name, label, version, start time, duration and
+          passed flag of the run, None if there is no such run
+        """
+        return self._conn.execute(
+            'SELECT id, name, label, version, start_time, duration, passed '
+            'FROM runs WHERE id = ?', (run_id,)).fetchone()
+
+    def latest_run(self, name=None):
+        """Returns the id of the latest run, None if there is none
+
+        Args:
+          name (str): Optional. Consider only the runs of this scenario
+        """
+        runs = self.runs(name, limit=1)
+        return runs[0][0] if runs else None
+
+    def previous_run(self, run_id, passed=True):
+        """Returns the id of the run of the same scenario before a run, None
+        if there is none
+
+        Args:
+          run_id (int): The id of the run
+          passed (bool): Consider only the runs that passed
+        """
+        query = ('SELECT id FROM runs WHERE id < ? AND '
+                 'name = (SELECT name FROM runs WHERE id = ?)')
+        if passed:
+            query += ' AND passed = 1'
+        row = self._conn.execute(query + ' ORDER BY id DESC LIMIT 1',
+                                 (run_id, run_id)).fetchone()
+        return row[0] if row else None
+
+    def summary(self, run_id):
+        """Returns the summary metrics of a run
+
+        Args:
+          run_id (int): The id of the run
+
+        Returns:
+          dict: The value of every summary metric of the run
+        """
+        return dict(self._conn.execute(
+            'SELECT metric, value FROM summary WHERE run_id = ?',
+            (run_id,)).fetchall())
+
+    def series(self, run_id, metric):
+        """Returns a series of a run
+
+        Args:
+          run_id (int): The id of the run
+          metric (str): The name of the series
+
+        Returns:
+          list: The time, worker and value of every sample, in time order.
+          The worker is None for the cluster values.
+        """
+        return self._conn.execute(
+            'SELECT time, worker, value FROM series WHERE run_id = ? AND '
+            'metric = ? ORDER BY time', (run_id, metric)).fetchall()
+
+    def close(self):
+        """
+        Close the database
+        """
+        self._conn.close()
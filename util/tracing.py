@@ -0,0 +1,142 @@
+"""
+Span-based tracing of the phases of the topology operations, exported as
+Chrome trace events
+"""
+
+import collections
+import contextlib
+import functools
+import itertools
+import os
+import threading
+import time
+
+# The number of completed spans kept in memory
+MAX_SPANS = 100000
+
+
+class Tracer(object):
+
+    """
+    Records the spans of the phases of a process. A span is kept as a Chrome
+    'complete' trace event when it ends, so it costs two clock reads and an
+    append. Spans are meant for phases, not for the iterations of hot loops.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        """
+        Args:
+          max_spans (int): The number of completed spans kept in memory
+        """
+        # [sequence number, trace event] of the completed spans
+        self._events = collections.deque(maxlen=max_spans)
+        self._seq = itertools.count(1)
+        self.enabled = True
+
+    def add_span(self, name, start, end, category='multinet', args=None):
+        """
+        Record a completed span
+
+        Args:
+          name (str): The name of the span
+          start (float): The start time of the span
+          end (float): The end time of the span
+          category (str): The category of the span
+          args (dict): Extra values shown with the span
+        """
+        if not self.enabled:
+            return
+        event = {'name': name, 'cat': category, 'ph': 'X',
+                 'ts': int(start * 1e6), 'dur': int((end - start) * 1e6),
+                 'pid': os.getpid(), 'tid': threading.current_thread().ident}
+        if args:
+            event['args'] = args
+        self._events.append([next(self._seq), event])
+
+    @contextlib.contextmanager
+    def span(self, name, category='multinet', **args):
+        """
+        Record the code of a with block as a span, even if it raises
+
+        Args:
+          name (str): The name of the span
+          category (str): The category of the span
+          args: Extra values shown with the span
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.time(), category, args)
+
+    def events(self, since=0):
+        """Returns the trace events of the completed spans
+
+        Args:
+          since (int): Return only the spans after this sequence number
+
+        Returns:
+          tuple: The sequence number of the last span and the trace events
+          of the spans after the given sequence number, oldest first
+        """
+        spans = [span for span in list(self._events) if span[0] > since]
+        last = spans[-1][0] if spans else since
+        return last, [event for _, event in spans]
+
+    def clear(self):
+        """
+        Forget the completed spans
+        """
+        self._events.clear()
+
+
+TRACER = Tracer()
+
+
+def span(name, category='multinet', **args):
+    """Returns a context manager that records a span on the process tracer,
+    see Tracer.span"""
+    return TRACER.span(name, category, **args)
+
+
+def traced(name=None):
+    """Returns a decorator that records every call of a function as a span
+    on the process tracer
+
+    Args:
+      name (str): The name of the span, the name of the function by default
+
+    Returns:
+      callable: The decorator
+    """
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def chrome_trace(processes):
+    """Merge the trace events of several processes into a Chrome trace, with
+    a process for every source. The timestamps are wall clock times, so the
+    machines should be synchronized.
+
+    Args:
+      processes (list): The (name, trace events) of every process
+
+    Returns:
+      dict: The Chrome trace-event JSON object
+    """
+    trace_events = []
+    for pid, (name, events) in enumerate(processes):
+        trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                             'tid': 0, 'args': {'name': name}})
+        for event in events:
+            event = dict(event)
+            event['pid'] = pid
+            trace_events.append(event)
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}